@@ -0,0 +1,333 @@
+"""
+bench_cleaners.py
+Benchmarks for the CSV cleaners on the bundled Kaggle files and on synthetic
+dirty scale-ups of them.
+
+Each case runs in a fresh process and records wall time, rows/sec, input
+MB/sec, peak RSS and the time spent in each stage (from csv_cleaner.profile.StageProfiler). Results are
+written as JSON and can be checked against a stored baseline:
+
+    python benchmarks/bench_cleaners.py --quick --out bench.json
+    python benchmarks/bench_cleaners.py --quick --compare benchmarks/baseline.json
+    python benchmarks/bench_cleaners.py --quick --save-baseline benchmarks/baseline.json
+
+Synthetic files (1e5/1e6/1e7 rows by default) are sampled from the seed
+files with duplicate rows, currency-formatted numbers, three date formats
+and whitespace/case noise; they are generated once and cached. Files larger
+than ``--stream-above`` rows are cleaned with the chunked stream engine.
+``--compress gzip`` (or ``zstd``) adds cases that read compressed copies of
+the synthetic files.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Make the csv_cleaner package importable when this file runs as a script.
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from csv_cleaner.core import _clean_column_names, clean_sales_dataframe
+from csv_cleaner.encoding import FALLBACK_ERRORS, read_csv_sniffed, sniff_encoding
+from csv_cleaner.inputs import input_read_kwargs, require_zstandard
+from csv_cleaner.profile import StageProfiler
+from csv_cleaner.stream import clean_sales_stream, write_csv_stream
+
+SEEDS = tuple(PROJECT_ROOT / "data" / "raw" / f"{name}.csv" for name in (
+    "kaggle_test_1_sample_sales", "kaggle_test_2_retail_sales", "kaggle_test_3_sales_usa",
+))
+SIZES = (100_000, 1_000_000, 10_000_000)
+QUICK_SIZES = (100_000,)
+DEFAULT_STREAM_ABOVE = 1_000_000
+DEFAULT_TOLERANCE = 0.3
+# Stage slowdowns smaller than this are timer noise, not regressions.
+MIN_STAGE_DELTA = 0.05
+# Throughput of shorter runs is too noisy to compare.
+MIN_WALL = 0.5
+CACHE_DIR = Path(tempfile.gettempdir()) / "csv-cleaner-bench"
+
+_BLOCK_ROWS = 100_000
+_DUPLICATE_RATE = 0.05
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%d %b %Y")
+_CURRENCY = ("{:.2f}", "${:,.2f}", "USD {:.2f}", "{:,.2f} $")
+_MONEY_WORDS = ("price", "cost", "amount", "sales", "profit", "total", "msrp")
+
+
+# --- synthetic data -------------------------------------------------------
+
+def _text_variants(values: np.ndarray) -> np.ndarray:
+    """(distinct values, 4) table: as-is, padded, upper, lower."""
+    v = pd.Series(values, dtype=object).astype(str)
+    return np.column_stack([v, "  " + v + " ", v.str.upper(), v.str.lower()]).astype(object)
+
+
+def _date_variants(values: np.ndarray) -> np.ndarray:
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), format="mixed", errors="coerce")
+    cols = [parsed.dt.strftime(f).astype(object).where(parsed.notna(), pd.Series(values, dtype=object))
+            for f in _DATE_FORMATS]
+    return np.column_stack(cols)
+
+
+def _money(values: np.ndarray, styles: np.ndarray) -> np.ndarray:
+    out = np.empty(len(values), dtype=object)
+    for k, fmt in enumerate(_CURRENCY):
+        sel = styles == k
+        out[sel] = [fmt.format(abs(x)) if x >= 0 else f"({fmt.format(-x)})" for x in values[sel]]
+    out[np.isnan(values)] = "N/A"
+    return out
+
+
+def _money_cols(seed: pd.DataFrame) -> list:
+    names = _clean_column_names(seed.iloc[:0]).columns
+    return [raw for raw, c in zip(seed.columns, names)
+            if any(w in c for w in _MONEY_WORDS) and pd.api.types.is_numeric_dtype(seed[raw])]
+
+
+def make_synthetic(seed_path, rows: int, out_path, random_state: int = 0) -> Path:
+    """Write a dirty ``rows``-row CSV sampled from ``seed_path``; returns ``out_path``."""
+    seed = read_csv_sniffed(seed_path, low_memory=False)
+    rng = np.random.default_rng(random_state)
+    money_cols = _money_cols(seed)
+    tables = {}
+    for c in seed.columns:
+        if c in money_cols or seed[c].dtype != object:
+            continue
+        codes, uniques = pd.factorize(seed[c])
+        make = _date_variants if "date" in c.lower() else _text_variants
+        tables[c] = (codes, make(np.asarray(uniques, dtype=object)))
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8", newline="") as fh:
+        for lo in range(0, rows, _BLOCK_ROWS):
+            n = min(_BLOCK_ROWS, rows - lo)
+            idx = rng.integers(len(seed), size=n)
+            block = {}
+            for c in seed.columns:
+                if c in tables:
+                    codes, table = tables[c]
+                    picked = codes[idx]
+                    col = table[np.maximum(picked, 0), rng.integers(table.shape[1], size=n)]
+                    col[picked < 0] = None
+                    block[c] = col
+                elif c in money_cols:
+                    # Jittered so prices stay high-cardinality, as in real exports.
+                    values = seed[c].to_numpy(dtype=np.float64)[idx] * rng.uniform(0.9, 1.1, size=n)
+                    block[c] = _money(np.round(values, 2), rng.integers(len(_CURRENCY), size=n))
+                else:
+                    block[c] = seed[c].to_numpy()[idx]
+            frame = pd.DataFrame(block, columns=seed.columns)
+            take = np.arange(n)
+            dup = np.flatnonzero(rng.random(n) < _DUPLICATE_RATE)
+            take[dup] = rng.integers(n, size=len(dup))
+            frame.iloc[take].to_csv(fh, index=False, header=lo == 0)
+    return out_path
+
+
+def synthetic_path(seed_path, rows: int, cache_dir=CACHE_DIR) -> Path:
+    """Cached synthetic file for ``(seed, rows)``, generated on first use."""
+    path = Path(cache_dir) / f"{Path(seed_path).stem}_{rows}.csv"
+    if not path.exists():
+        tmp = path.with_suffix(".tmp")
+        make_synthetic(seed_path, rows, tmp)
+        tmp.replace(path)
+    return path
+
+
+def compressed_path(path, codec: str) -> Path:
+    """Cached ``gzip``/``zstd`` copy of ``path``, written on first use."""
+    path = Path(path)
+    out = path.with_name(path.name + {"gzip": ".gz", "zstd": ".zst"}[codec])
+    if not out.exists():
+        tmp = out.with_name(out.name + ".tmp")
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            if codec == "gzip":
+                import gzip
+                import shutil
+                with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, 1 << 20)
+            else:
+                require_zstandard("--compress zstd").ZstdCompressor(level=3).copy_stream(src, dst)
+        tmp.replace(out)
+    return out
+
+
+# --- measurement ----------------------------------------------------------
+
+def _peak_rss_mb() -> float | None:
+    # VmHWM is this process image's own peak; ru_maxrss survives fork+exec
+    # and would report the parent's.
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_core(path, out_path, profiler: StageProfiler) -> int:
+    with profiler.stage("read", 0) as rec:
+        df = read_csv_sniffed(path, low_memory=False)
+        rec["rows_in"] = rec["rows_out"] = len(df)
+    df = clean_sales_dataframe(df, inplace=True, profiler=profiler)
+    with profiler.stage("write", len(df)):
+        df.to_csv(out_path, index=False)
+    return rec["rows_in"]
+
+
+def _run_stream(path, out_path, profiler: StageProfiler) -> int:
+    stats = {}
+    encoding, _ = sniff_encoding(path)
+    chunks = clean_sales_stream(path, stats=stats, profiler=profiler, encoding=encoding,
+                                encoding_errors=FALLBACK_ERRORS, **input_read_kwargs(path))
+    write_csv_stream(chunks, out_path)
+    return stats.get("rows_in", 0)
+
+
+def _run_script(path, out_path, profiler: StageProfiler) -> int:
+    from scripts.clean_sales_data import clean_sales_data
+    with contextlib.redirect_stdout(io.StringIO()):
+        clean_sales_data(path, out_path, profiler=profiler)
+    return profiler.records[("read", None)]["rows_in"]
+
+
+_RUNNERS = {"core": _run_core, "stream": _run_stream, "script": _run_script}
+
+
+def run_case(cleaner: str, path) -> dict:
+    """Run one cleaner on one file in this process; returns its measurements."""
+    profiler = StageProfiler()
+    size_mb = Path(path).stat().st_size / 1e6
+    with tempfile.TemporaryDirectory(prefix="csv-cleaner-bench-") as tmp:
+        t0 = time.perf_counter()
+        rows = _RUNNERS[cleaner](path, Path(tmp) / "out.csv", profiler)
+        wall = time.perf_counter() - t0
+    stages: dict = {}
+    for r in profiler.rows():
+        # Column stages are summed per kind (text, date, numeric).
+        stages[r["stage"]] = stages.get(r["stage"], 0.0) + r["wall_s"]
+    return {
+        "cleaner": cleaner,
+        "input": Path(path).name,
+        "rows": rows,
+        "wall_s": round(wall, 4),
+        "rows_per_s": round(rows / wall) if wall else None,
+        # On-disk bytes: for compressed inputs this is the compressed size.
+        "mb_per_s": round(size_mb / wall, 1) if wall else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": {k: round(v, 4) for k, v in stages.items()},
+    }
+
+
+def _isolated(cleaner: str, path) -> dict:
+    # A fresh interpreter per case, so peak RSS is that case's own.
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(run_case, cleaner, str(path)).result()
+
+
+def plan_cases(sizes=SIZES, seeds=SEEDS, stream_above: int = DEFAULT_STREAM_ABOVE, compress=None) -> list:
+    """``[(case name, cleaner, path)]``: both cleaners on each seed, then the scale-ups.
+
+    With ``compress`` (``gzip``/``zstd``) each scale-up case is repeated on a
+    compressed copy, named ``<case>+<codec>``.
+    """
+    cases = []
+    for seed in seeds:
+        cases += [(f"{c}:{seed.stem}", c, seed) for c in ("core", "script")]
+    for rows in sizes:
+        for seed in seeds:
+            path = synthetic_path(seed, rows)
+            cleaners = ("stream",) if rows > stream_above else ("core", "script")
+            cases += [(f"{c}:{seed.stem}_{rows}", c, path) for c in cleaners]
+            if compress:
+                packed = compressed_path(path, compress)
+                cases += [(f"{c}:{seed.stem}_{rows}+{compress}", c, packed) for c in cleaners]
+    return cases
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """Regressions of ``results`` against ``baseline`` (both ``{case: measurements}``)."""
+    problems = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        timed = min(now["wall_s"], before["wall_s"]) >= MIN_WALL
+        if timed and now["rows_per_s"] < before["rows_per_s"] * (1 - tolerance):
+            problems.append(f"{name}: {now['rows_per_s']} rows/s vs {before['rows_per_s']} baseline")
+        if now["peak_rss_mb"] and before["peak_rss_mb"] and now["peak_rss_mb"] > before["peak_rss_mb"] * (1 + tolerance):
+            problems.append(f"{name}: peak RSS {now['peak_rss_mb']} MB vs {before['peak_rss_mb']} MB baseline")
+        for stage, t in now["stages"].items():
+            old = before["stages"].get(stage)
+            if old is not None and t > old * (1 + tolerance) and t - old > MIN_STAGE_DELTA:
+                problems.append(f"{name}: stage {stage} {t:.3f}s vs {old:.3f}s baseline")
+    return problems
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark the CSV cleaners.")
+    p.add_argument("--sizes", type=lambda v: int(float(v)), nargs="*", default=None,
+                   help="Synthetic row counts (default: 1e5 1e6 1e7; none with --sizes and no values)")
+    p.add_argument("--quick", action="store_true", help="Bundled files and the 1e5-row scale-ups only")
+    p.add_argument("--stream-above", type=int, default=DEFAULT_STREAM_ABOVE,
+                   help="Clean larger synthetic files with the stream engine")
+    p.add_argument("--compress", choices=("gzip", "zstd"), default=None,
+                   help="Also benchmark compressed copies of the synthetic files")
+    p.add_argument("--out", default=None, help="Write the results JSON here (default: stdout)")
+    p.add_argument("--compare", default=None, metavar="BASELINE", help="Fail on regressions against this JSON")
+    p.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                   help="Allowed slowdown/growth as a fraction (default: 0.3)")
+    p.add_argument("--save-baseline", default=None, metavar="PATH", help="Store the results as the new baseline")
+    args = p.parse_args(argv)
+    sizes = args.sizes if args.sizes is not None else QUICK_SIZES if args.quick else SIZES
+
+    results = {}
+    for name, cleaner, path in plan_cases(sizes, stream_above=args.stream_above, compress=args.compress):
+        results[name] = _isolated(cleaner, path)
+        r = results[name]
+        print(f"{name}: {r['wall_s']:.2f}s, {r['rows_per_s']} rows/s, {r['mb_per_s']} MB/s, peak {r['peak_rss_mb']} MB", file=sys.stderr)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(text + "\n")
+    if args.compare:
+        problems = compare(results, json.loads(Path(args.compare).read_text())["results"], args.tolerance)
+        for line in problems:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Arrow-backed read/clean/write path (``engine="arrow"``).
+
+Frames read with ``engine="pyarrow", dtype_backend="pyarrow"`` keep their
+strings in Arrow buffers. The text stages run as ``pyarrow.compute`` kernels
+over each column's dictionary-encoded distinct values instead of on Python
+``str`` objects, numbers are parsed from the same distinct values, and
+:func:`write_csv_arrow` writes the table with Arrow's CSV writer, so no
+column is ever converted to object dtype.
+
+Differences from the default engine: missing text stays missing (the pandas
+path writes ``astype(str)``'s ``nan``/``Nan``), integer columns with gaps stay
+integers, string fields are always quoted and floats are formatted by Arrow
+(``2001`` and ``0.00001`` rather than ``2001.0`` and ``1e-05``).
+
+pyarrow is optional: ``pip install "csv-cleaner-pro[arrow]"``.
+"""
+from __future__ import annotations
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
+from .encoding import FALLBACK_ERRORS
+from .numeric import parse_numeric
+
+# Python's str.split()/\s whitespace, spelled for RE2.
+_WHITESPACE_RUN = r"[\s\x0b\x1c-\x1f\x85\p{Z}]+"
+
+
+def require_pyarrow(feature: str = 'engine="arrow"'):
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError as e:
+        raise ImportError(f'{feature} requires pyarrow: pip install "csv-cleaner-pro[arrow]"') from e
+    return pa, pc
+
+
+def is_arrow_string(dtype) -> bool:
+    if not isinstance(dtype, pd.ArrowDtype):
+        return False
+    pa, _ = require_pyarrow()
+    return pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+
+
+def to_arrow_dtypes(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
+    """Arrow-backed version of ``df`` (floats stay floats, as the pandas path keeps them)."""
+    require_pyarrow()
+    if all(isinstance(d, pd.ArrowDtype) for d in df.dtypes):
+        return df.copy() if copy else df
+    return df.convert_dtypes(dtype_backend="pyarrow", convert_integer=False)
+
+
+def _wrap(s: pd.Series, arr) -> pd.Series:
+    return pd.Series(pd.arrays.ArrowExtensionArray(arr), index=s.index, name=s.name)
+
+
+def _strip_collapse(arr):
+    _, pc = require_pyarrow()
+    return pc.replace_substring_regex(pc.utf8_trim_whitespace(arr), _WHITESPACE_RUN, " ")
+
+
+def _strip_title(arr):
+    _, pc = require_pyarrow()
+    return pc.utf8_title(pc.utf8_trim_whitespace(arr))
+
+
+# Arrow kernels standing in for the csv_cleaner.text transforms of the same name.
+_KERNELS = {"strip_collapse": _strip_collapse, "strip_title": _strip_title}
+
+
+def map_text_arrow(s: pd.Series, funcs) -> pd.Series:
+    """Apply the :mod:`csv_cleaner.text` transforms ``funcs`` to an Arrow string column.
+
+    Arrow's counterpart of :func:`csv_cleaner.text.map_unique`: the column is
+    dictionary-encoded, the kernels run over the distinct strings and the
+    result is taken back by index. Nulls stay null.
+    """
+    pa, pc = require_pyarrow()
+    kernels = [_KERNELS[f.__name__] for f in funcs]
+    arr = s.array.__arrow_array__()
+    # String offsets are 32-bit: past 2 GiB encode chunk by chunk instead.
+    parts = [arr.combine_chunks()] if arr.nbytes < 2 ** 31 - 1 else arr.chunks
+    out = []
+    for part in parts:
+        enc = part.dictionary_encode()
+        values = enc.dictionary
+        for kernel in kernels:
+            values = kernel(values)
+        out.append(pc.take(values, enc.indices))
+    return _wrap(s, pa.chunked_array(out, type=arr.type))
+
+
+def parse_numeric_arrow(s: pd.Series, decimal: str = ".") -> tuple[pd.Series, int]:
+    """:func:`csv_cleaner.numeric.parse_numeric` returning an Arrow-backed column.
+
+    Factorizing an Arrow column is Arrow's ``dictionary_encode``, so only the
+    distinct strings are ever decoded.
+    """
+    pa, _ = require_pyarrow()
+    if isinstance(s.dtype, pd.ArrowDtype) and not is_arrow_string(s.dtype):
+        return s, 0
+    values, failures = parse_numeric(s, decimal)
+    return _wrap(s, pa.array(values.to_numpy(), from_pandas=True)), failures
+
+
+def read_csv_arrow(path, encoding: str = "utf-8", **read_kwargs) -> pd.DataFrame:
+    """Read ``path`` into Arrow-backed columns.
+
+    Arrow reads UTF-8 itself and leaves a column holding invalid UTF-8 as
+    binary; such columns are decoded here, stray bytes going through the
+    :data:`csv_cleaner.encoding.FALLBACK_ERRORS` handler.
+    """
+    pa, _ = require_pyarrow()
+    df = pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow", encoding=encoding, **read_kwargs)
+    for c in df.columns:
+        dtype = df[c].dtype
+        if not (isinstance(dtype, pd.ArrowDtype) and pa.types.is_binary(dtype.pyarrow_dtype)):
+            continue
+        enc = df[c].array.__arrow_array__().combine_chunks().dictionary_encode()
+        text = [None if v is None else v.decode(encoding, FALLBACK_ERRORS) for v in enc.dictionary.to_pylist()]
+        df[c] = _wrap(df[c], pa.DictionaryArray.from_arrays(enc.indices, pa.array(text, pa.string()))
+                      .dictionary_decode())
+    return df
+
+
+def write_csv_arrow(df: pd.DataFrame, out_path) -> int:
+    """Write ``df`` with Arrow's CSV writer; returns the number of rows written.
+
+    ``out_path`` may also be a binary file object (e.g. from ``gzip.open``).
+
+    Datetime columns holding only midnights are written as dates, the others
+    to the second, as the default engine writes them.
+    """
+    pa, pc = require_pyarrow()
+    import pyarrow.csv as pa_csv
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, c in enumerate(df.columns):
+        s, col = df[c], table.column(i)
+        if not is_datetime64_any_dtype(s.dtype) or pa.types.is_date(col.type):
+            continue
+        v = s.dropna()
+        target = pa.date32() if (v == v.dt.normalize()).all() else pa.timestamp("s")
+        table = table.set_column(i, table.field(i).name, pc.cast(col, target, safe=False))
+    pa_csv.write_csv(table, out_path)
+    return table.num_rows
@@ -0,0 +1,238 @@
+"""Batch mode: clean every CSV under a directory on a bounded pool of workers.
+
+One Python process (and its pool) handles the whole batch, so pandas is
+imported once rather than once per file. Files run on a thread or process
+pool of ``workers``. Threads overlap one file's reads and writes with another
+file's parsing, because pandas' C parser and file I/O release the GIL.
+Processes also spread the Python-level cleaning stages over the cores.
+
+A file whose output is up to date is skipped:
+
+* ``"mtime"`` (like make): the output is newer than the input;
+* ``"hash"``: the input's hash and the cleaning configuration match the
+  previous manifest.
+
+Outputs are written under a temporary name and renamed into place, so an
+interrupted or failed file never looks up to date. A failure is recorded in
+the manifest and the batch carries on. A process worker that dies (killed
+for memory, a crash in native code) breaks the whole process pool; the files
+it had not finished are then retried one process each, so only the file that
+killed its worker is marked failed.
+
+The manifest is JSON. For each file it lists the input, output, status
+(``ok``, ``skipped`` or ``error``), rows in/out, wall time and error.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable
+import pandas as pd
+from .arrow import read_csv_arrow
+from .core import clean_sales_dataframe
+from .encoding import FALLBACK_ERRORS, sniff_encoding
+from .inputs import INPUT_COMPRESSIONS, input_read_kwargs
+from .incremental import cleaner_fingerprint
+from .options import EXECUTORS, MANIFEST_NAME, SKIP_MODES
+from .output import write_frame, write_stream
+from .stream import clean_sales_stream
+
+_FORMAT_SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+_CSV_COMPRESSION_SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
+
+def output_name(rel, fmt: str = "csv", compression: str | None = None) -> Path:
+    """``rel`` with its extension replaced by the output format's (``a/b.txt`` -> ``a/b.csv.gz``)."""
+    rel = Path(rel)
+    if rel.suffix.lower() in INPUT_COMPRESSIONS:
+        rel = rel.with_suffix("")
+    suffix = _FORMAT_SUFFIXES[fmt]
+    if fmt == "csv":
+        suffix += _CSV_COMPRESSION_SUFFIXES.get(compression, "")
+    return rel.with_suffix(suffix)
+
+
+def plan_batch(input_dir, output_dir, pattern: str = "*.csv", fmt: str = "csv",
+               compression: str | None = None) -> list:
+    """``(input, output)`` pairs for the files matching ``pattern``, mirroring subdirectories."""
+    input_dir, output_dir = Path(input_dir), Path(output_dir)
+    out_root = output_dir.resolve()
+    pairs = []
+    for src in sorted(input_dir.glob(pattern)):
+        # An output directory inside the input directory is not re-cleaned.
+        if src.is_file() and out_root not in src.resolve().parents:
+            pairs.append((src, output_dir / output_name(src.relative_to(input_dir), fmt, compression)))
+    return pairs
+
+
+def file_digest(path, block: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for data in iter(lambda: fh.read(block), b""):
+            h.update(data)
+    return h.hexdigest()
+
+
+def batch_config(*parts) -> str:
+    """Fingerprint of the cleaning code plus ``parts`` (options, extra sources) for ``skip="hash"``."""
+    h = hashlib.blake2b(cleaner_fingerprint().encode(), digest_size=16)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else repr(p).encode())
+    return h.hexdigest()
+
+
+def clean_file(src, dst, output_format: str | None = None, compression: str | None = None,
+               engine: str = "pandas", chunksize: int | None = None, date_formats: dict | None = None,
+               headers=None, rules=None) -> dict:
+    """Clean one file with the packaged pipeline (streamed when ``chunksize`` is set)."""
+    encoding, _ = sniff_encoding(src)
+    read_kwargs = {"encoding": encoding, "encoding_errors": FALLBACK_ERRORS, **input_read_kwargs(src)}
+    if rules is not None and rules.columns is not None:
+        read_kwargs["usecols"] = rules.usecols(pd.read_csv(src, nrows=0, **read_kwargs).columns, headers)
+    stats = {}
+    if chunksize:
+        chunks = clean_sales_stream(src, chunksize=chunksize, date_formats=dict(date_formats or {}),
+                                    stats=stats, headers=headers, rules=rules, **read_kwargs)
+        write_stream(chunks, dst, output_format, compression)
+        return {"rows_in": stats["rows_in"], "rows_out": stats["rows_out"], "encoding": encoding}
+    if engine == "arrow":
+        df = read_csv_arrow(src, encoding=encoding)
+    else:
+        df = pd.read_csv(src, low_memory=False, **read_kwargs)
+    rows_in = len(df)
+    cleaned = clean_sales_dataframe(df, date_formats=dict(date_formats or {}), inplace=True, engine=engine,
+                                    headers=headers, rules=rules)
+    write_frame(cleaned, dst, output_format, compression, engine=engine)
+    return {"rows_in": rows_in, "rows_out": len(cleaned), "encoding": encoding}
+
+
+def _up_to_date(src: Path, dst: Path, skip: str, digest: str | None, config: str, previous: dict | None) -> bool:
+    if skip == "off" or not dst.exists():
+        return False
+    if skip == "mtime":
+        return dst.stat().st_mtime >= src.stat().st_mtime
+    return (previous is not None and previous.get("status") in ("ok", "skipped")
+            and previous.get("input_hash") == digest and previous.get("config") == config)
+
+
+def _run_one(clean: Callable, src: Path, dst: Path, skip: str, config: str, previous: dict | None) -> dict:
+    t0 = time.perf_counter()
+    digest = file_digest(src) if skip == "hash" else None
+    rec = {"input_hash": digest, "config": config}
+    if _up_to_date(src, dst, skip, digest, config, previous):
+        rows = {k: previous[k] for k in ("rows_in", "rows_out") if previous and k in previous}
+        return {"status": "skipped", **rows, **rec, "wall_s": time.perf_counter() - t0, "error": None}
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    # Keeps the suffixes, which carry the output format and CSV compression.
+    tmp = dst.with_name(f".tmp-{os.getpid()}-{threading.get_ident()}-{dst.name}")
+    try:
+        rec.update(clean(src, tmp) or {})
+        os.replace(tmp, dst)
+        rec.update(status="ok", error=None)
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        rec.update(status="error", error=f"{type(e).__name__}: {e}")
+    rec["wall_s"] = time.perf_counter() - t0
+    return rec
+
+
+def load_manifest(path) -> dict:
+    """``{input: record}`` from a previous manifest (empty if missing or unreadable)."""
+    try:
+        files = json.loads(Path(path).read_text())["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    return {r["input"]: r for r in files}
+
+
+def write_manifest(path, records: list) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    counts = {s: sum(r["status"] == s for r in records) for s in ("ok", "skipped", "error")}
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps({**counts, "files": records}, indent=2) + "\n")
+    os.replace(tmp, path)
+
+
+def _crashed(e: BaseException) -> dict:
+    """Record of a file whose worker died (e.g. killed for memory) before returning one."""
+    return {"status": "error", "error": f"{type(e).__name__}: {e}", "wall_s": None}
+
+
+def _run_isolated(fn, *args):
+    """``fn(*args)`` in a fresh process of its own; raises ``BrokenProcessPool`` if that process dies."""
+    with ProcessPoolExecutor(max_workers=1) as solo:
+        return solo.submit(fn, *args).result()
+
+
+def run_batch(
+    pairs: list,
+    clean: Callable = clean_file,
+    workers: int | None = None,
+    executor: str = "process",
+    skip: str = "mtime",
+    manifest=None,
+    config: str = "",
+    progress: Callable[[dict], None] | None = None,
+) -> list:
+    """Run ``clean(input, output)`` over ``pairs`` on a pool; returns one record per pair, in order.
+
+    ``clean`` must be picklable for the process executor (a module-level
+    function or a ``functools.partial`` of one) and may return a dict of
+    extra fields (``rows_in``, ``rows_out``...). ``config`` identifies the
+    cleaning settings for ``skip="hash"``. ``progress`` is called with each
+    finished record. The manifest is written to ``manifest`` when given.
+    """
+    if skip not in SKIP_MODES:
+        raise ValueError(f"skip must be one of {SKIP_MODES}, got {skip!r}")
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {EXECUTORS}, got {executor!r}")
+    previous = load_manifest(manifest) if manifest is not None and skip == "hash" else {}
+    pool_type = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    max_workers = min(workers or os.cpu_count() or 1, len(pairs)) if pairs else 1
+    records: list = [None] * len(pairs)
+
+    def job(n):
+        src, dst = pairs[n]
+        return _run_one, clean, Path(src), Path(dst), skip, config, previous.get(str(src))
+
+    def finish(n, rec):
+        records[n] = {"input": str(pairs[n][0]), "output": str(pairs[n][1]), **rec}
+        if progress is not None:
+            progress(records[n])
+
+    lost = []
+    if pairs:
+        with pool_type(max_workers=max_workers) as pool:
+            futures = {pool.submit(*job(n)): n for n in range(len(pairs))}
+            for fut in as_completed(futures):
+                try:
+                    finish(futures[fut], fut.result())
+                except BrokenProcessPool:
+                    # Every unfinished file gets this, not just the one whose worker died.
+                    lost.append(futures[fut])
+                except Exception as e:
+                    finish(futures[fut], _crashed(e))
+    if lost:
+        # Which file killed the worker is unknown: retry each in a process of its own,
+        # so only that file fails.
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(lost))) as pool:
+            futures = {pool.submit(_run_isolated, *job(n)): n for n in sorted(lost)}
+            for fut in as_completed(futures):
+                n = futures[fut]
+                try:
+                    finish(n, fut.result())
+                except Exception as e:
+                    dst = Path(pairs[n][1])
+                    # The dead worker's partial output (named after its pid).
+                    for tmp in dst.parent.glob(f".tmp-*-{dst.name}"):
+                        tmp.unlink(missing_ok=True)
+                    finish(n, _crashed(e))
+    if manifest is not None:
+        write_manifest(manifest, records)
+    return records
@@ -1,28 +1,407 @@
 ﻿import argparse
+import contextlib
+import functools
+import json
+import os
 from pathlib import Path
+import shlex
 import sys
-import pandas as pd
-from .core import clean_sales_dataframe
+import time
+from .headers import HeaderResolver
+from .rules import load_rules
+from .options import (COMPRESSIONS, DEFAULT_NEAR_DUP_THRESHOLD, DEFAULT_SORT_MEMORY, ENGINES, EXECUTORS,
+                      FORMAT_NAMES, MANIFEST_NAME, NEAR_DUP_ACTIONS, OUTPUT_FORMATS, SKIP_MODES, output_format)
 
-def main():
-    p = argparse.ArgumentParser(prog="csv-cleaner", description="Clean, validate, and standardize messy sales CSVs.")
-    p.add_argument("--input", required=True, help="Path to input CSV")
-    p.add_argument("--output", required=True, help="Path to write cleaned CSV")
-    args = p.parse_args()
+# Everything that imports pandas is imported inside the functions that clean,
+# after the arguments and paths have been checked: --help, usage errors and
+# missing inputs exit without loading it.
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="csv-cleaner", description="Clean, validate, and standardize messy sales CSVs.",
+                                epilog="csv-cleaner serve [--socket PATH] runs jobs (JSON lines of these arguments) "
+                                       "in one warm process; see csv-cleaner serve --help.")
+    p.add_argument("--input", help="Path to input CSV (.csv, or compressed: .csv.gz, .bz2, .xz, .zst)")
+    p.add_argument("--output", help="Path to write cleaned data (.csv, .csv.gz, .parquet, .feather)")
+    p.add_argument("--output-format", choices=OUTPUT_FORMATS, default=None,
+                   help="Output format (default: from the --output extension, else csv)")
+    p.add_argument("--compression", default=None,
+                   help="csv: gzip|bz2|xz; parquet: snappy|zstd|gzip|brotli|lz4|none; feather: lz4|zstd|uncompressed")
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument("--chunksize", type=int, default=None,
+                      help="Stream the input N rows at a time to keep memory bounded")
+    mode.add_argument("--workers", type=int, default=None,
+                      help="Clean byte-range partitions of the input on N processes")
+    p.add_argument("--cache-dir", default=None, metavar="DIR",
+                   help="Reuse cleaned chunks cached in DIR; only new or changed parts of the input are re-cleaned")
+    p.add_argument("--cache-size", type=int, default=1024, metavar="MB",
+                   help="Size bound of --cache-dir; least recently used chunks are evicted (default: 1024)")
+    p.add_argument("--engine", choices=ENGINES, default="pandas",
+                   help="arrow: read, clean and write with pyarrow (in-memory runs only; needs pyarrow)")
+    p.add_argument("--resolve-headers", action="store_true",
+                   help="Map raw headers onto canonical names (Unit Price ($) -> unit_price), incl. fuzzy matches")
+    p.add_argument("--header-aliases", default=None, metavar="PATH",
+                   help="JSON of canonical name -> extra aliases for --resolve-headers (implies it)")
+    p.add_argument("--rules", default=None, metavar="PATH",
+                   help="JSON/YAML cleaning rules: title_case, dates, numeric, strip_text, compute_sales and "
+                        "columns to keep (others are not read)")
+    p.add_argument("--infer-schema", action="store_true",
+                   help="Sample the file first and read with compact dtypes (category text, typed numbers)")
+    p.add_argument("--schema", default=None, metavar="PATH",
+                   help="Read with a schema saved by --save-schema instead of inferring one")
+    p.add_argument("--save-schema", default=None, metavar="PATH",
+                   help="Write the inferred schema as JSON for reuse with --schema (implies --infer-schema)")
+    p.add_argument("--sort-by", default=None, metavar="COL",
+                   help="Sort the output by this cleaned column (stable, missing values last), e.g. order_date")
+    p.add_argument("--sort-memory", type=int, default=DEFAULT_SORT_MEMORY // 2**20, metavar="MB",
+                   help="Memory for --sort-by on streamed runs; more data is sorted in runs spilled to disk (default: 256)")
+    p.add_argument("--near-dup", default=None, metavar="COLS",
+                   help="Find near-duplicate rows on these cleaned columns (comma-separated), e.g. "
+                        "customer_name,product,order_date: text ignores case, spacing, punctuation and typos")
+    p.add_argument("--near-dup-action", choices=NEAR_DUP_ACTIONS, default="label",
+                   help="label: add a near_dup_cluster column; collapse: keep the first row of each cluster "
+                        "(default: label)")
+    p.add_argument("--near-dup-threshold", type=float, default=DEFAULT_NEAR_DUP_THRESHOLD, metavar="J",
+                   help=f"Minimum Jaccard similarity of the text keys' 3-grams (default: {DEFAULT_NEAR_DUP_THRESHOLD})")
+    p.add_argument("--date-format", action="append", default=[], metavar="COL=FMT",
+                   help="strptime format for a date column, skipping inference (repeatable)")
+    p.add_argument("--profile", action="store_true",
+                   help="Print time, rows, memory and coerced values per cleaning stage")
+    p.add_argument("--metrics-json", default=None, metavar="PATH",
+                   help="Write the per-stage metrics of this run as JSON")
+    p.add_argument("--quality-json", default=None, metavar="PATH",
+                   help="Write a data-quality profile of the cleaned data (nulls, coerced values, min/max/mean, "
+                        "distinct counts, sales formula check) as JSON")
+    p.add_argument("--quarantine", default=None, metavar="PATH",
+                   help="Skip lines with too many fields into PATH (CSV of record, line, reason, text) "
+                        "instead of failing; not with --workers, --cache-dir or --engine arrow")
+    p.add_argument("--profile-allocations", action="store_true",
+                   help="Also trace bytes allocated per stage (tracemalloc; slows object-heavy stages)")
+    batch = p.add_argument_group("batch mode", "clean every matching file under --input-dir into --output-dir")
+    batch.add_argument("--input-dir", default=None, help="Directory of input CSVs (instead of --input)")
+    batch.add_argument("--glob", default="*.csv", help="Input file pattern, e.g. '**/*.csv' (default: *.csv)")
+    batch.add_argument("--output-dir", default=None, help="Directory for the cleaned files (instead of --output)")
+    batch.add_argument("--jobs", type=int, default=None, help="Files cleaned at once (default: CPU count)")
+    batch.add_argument("--executor", choices=EXECUTORS, default="process", help="Pool for --jobs (default: process)")
+    batch.add_argument("--skip-unchanged", choices=SKIP_MODES, default="mtime",
+                       help="Skip files whose output is newer (mtime) or whose input and settings match "
+                            "the previous manifest (hash); off re-cleans everything (default: mtime)")
+    batch.add_argument("--manifest", default=None, metavar="PATH",
+                       help=f"Per-file summary JSON (default: OUTPUT_DIR/{MANIFEST_NAME})")
+    return p
+
+def main(argv=None):
+    """Run the command line (``argv`` defaults to ``sys.argv[1:]``); returns the exit code.
+
+    ``csv-cleaner serve ...`` starts :mod:`csv_cleaner.serve` instead.
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["serve"]:
+        from .serve import main as serve_main
+        return serve_main(argv[1:])
+    p = build_parser()
+    args = p.parse_args(argv)
+    date_formats = {}
+    for spec in args.date_format:
+        col, sep, fmt = spec.partition("=")
+        if not sep or not fmt:
+            p.error(f"--date-format expects COL=FMT, got {spec!r}")
+        date_formats[col] = date_formats.get(col, ()) + (fmt,)
+    if args.chunksize is not None and args.chunksize < 1:
+        p.error("--chunksize must be a positive integer")
+    if args.workers is not None and args.workers < 1:
+        p.error("--workers must be a positive integer")
+    if args.sort_memory < 1:
+        p.error("--sort-memory must be a positive integer")
+    near_dup = [c.strip() for c in args.near_dup.split(",") if c.strip()] if args.near_dup is not None else None
+    if near_dup is not None and not near_dup:
+        p.error("--near-dup expects one or more column names")
+    if not 0 < args.near_dup_threshold <= 1:
+        p.error("--near-dup-threshold must be in (0, 1]")
+    if args.engine == "arrow" and (args.chunksize or args.workers):
+        p.error("--engine arrow cannot be combined with --chunksize or --workers")
+    if args.cache_dir and (args.chunksize or args.engine == "arrow"):
+        p.error("--cache-dir cannot be combined with --chunksize or --engine arrow")
+    if args.quarantine and (args.workers or args.cache_dir or args.engine == "arrow"):
+        p.error("--quarantine cannot be combined with --workers, --cache-dir or --engine arrow")
+    if args.cache_size < 1:
+        p.error("--cache-size must be a positive integer")
+    if args.engine == "arrow" and (args.infer_schema or args.schema or args.save_schema):
+        p.error("--engine arrow cannot be combined with schema options")
+    try:
+        headers = _header_resolver(args)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: --header-aliases: {e}", file=sys.stderr)
+        return 2
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except (OSError, ValueError, ImportError) as e:
+        print(f"ERROR: --rules: {e}", file=sys.stderr)
+        return 2
+    if args.input_dir or args.output_dir:
+        if args.sort_by or near_dup:
+            p.error("--sort-by and --near-dup cannot be combined with batch mode")
+        return _main_batch(p, args, date_formats, headers, rules)
+    if not args.input or not args.output:
+        p.error("--input and --output are required (or --input-dir and --output-dir)")
 
     in_path = Path(args.input)
     out_path = Path(args.output)
+    out_format = output_format(out_path, args.output_format)
+    if args.compression is not None and args.compression not in COMPRESSIONS[out_format]:
+        p.error(f"--compression for {out_format} must be one of: {', '.join(COMPRESSIONS[out_format])}")
 
     if not in_path.exists():
         print(f"ERROR: Input file not found: {in_path}", file=sys.stderr)
         return 2
+    return _clean_one(args, in_path, out_path, out_format, date_formats, headers, rules, near_dup)
+
+def _clean_one(args, in_path, out_path, out_format, date_formats, headers, rules, near_dup=None):
+    import pandas as pd
+    from .arrow import read_csv_arrow, require_pyarrow
+    from .core import clean_sales_dataframe
+    from .encoding import FALLBACK_ERRORS, ascii_compatible, sniff_encoding, straggler_count
+    from .incremental import clean_sales_incremental
+    from .inputs import input_read_kwargs, is_compressed
+    from .neardup import near_duplicates, near_duplicates_stream
+    from .output import write_frame, write_stream
+    from .parallel import clean_sales_parallel
+    from .profile import StageProfiler, profiled
+    from .quality import QualityProfile
+    from .quarantine import Quarantine
+    from .schema import infer_schema, load_schema, read_csv_schema, save_schema, schema_matches
+    from .schema import date_formats as schema_date_formats
+    from .sort import external_sort, sort_frame
+    from .stream import clean_sales_stream
+
+    if args.engine == "arrow" or out_format != "csv":
+        try:
+            require_pyarrow("--engine arrow" if args.engine == "arrow" else f"{out_format} output")
+        except ImportError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+
+    try:
+        input_kwargs = input_read_kwargs(in_path)
+    except ImportError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    if (args.workers or args.cache_dir) and is_compressed(in_path):
+        print("ERROR: --workers and --cache-dir need an uncompressed input (they seek to byte offsets)",
+              file=sys.stderr)
+        return 2
+    encoding, detected_by = sniff_encoding(in_path)
+    if args.workers and not ascii_compatible(encoding):
+        print(f"ERROR: --workers cannot split {encoding} input; use --chunksize", file=sys.stderr)
+        return 2
+    if args.cache_dir and not ascii_compatible(encoding):
+        print(f"ERROR: --cache-dir cannot split {encoding} input", file=sys.stderr)
+        return 2
 
-    df = pd.read_csv(in_path, low_memory=False)
-    cleaned = clean_sales_dataframe(df)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    cleaned.to_csv(out_path, index=False)
-    print(f"✅ Cleaned CSV written to: {out_path}")
+    stats = {}
+    near_stats = {}
+    profiling = args.profile or args.metrics_json or args.profile_allocations
+    profiler = StageProfiler(allocations=args.profile_allocations) if profiling else None
+    quality = QualityProfile() if args.quality_json else None
+    started = time.perf_counter()
+    read_kwargs = {"encoding": encoding, "encoding_errors": FALLBACK_ERRORS}
+    if not (args.workers or args.cache_dir):
+        # Partitions and cached chunks are read from byte ranges, not by file name.
+        read_kwargs.update(input_kwargs)
+    quarantine = Quarantine() if args.quarantine else None
+    if quarantine is not None:
+        # The C parser skips (and reports) lines with too many fields.
+        read_kwargs["on_bad_lines"] = "warn"
+        quarantine.encoding = encoding
+    if rules is not None and rules.columns is not None and quarantine is None:
+        # Columns the rules drop are never parsed. (Not when quarantining: with
+        # usecols the parser no longer reports lines with too many fields.)
+        read_kwargs["usecols"] = rules.usecols(pd.read_csv(in_path, nrows=0, **read_kwargs).columns, headers)
+    with quarantine.capture() if quarantine is not None else contextlib.nullcontext():
+        schema = None
+        if args.infer_schema or args.schema or args.save_schema:
+            if args.schema:
+                try:
+                    schema = load_schema(args.schema)
+                except (OSError, ValueError) as e:
+                    print(f"ERROR: --schema: {e}", file=sys.stderr)
+                    return 2
+                if schema_matches(schema, pd.read_csv(in_path, nrows=0, **read_kwargs).columns):
+                    schema_source = args.schema
+                else:
+                    print(f"WARNING: {args.schema} was saved for other columns; inferring a new schema",
+                          file=sys.stderr)
+                    schema = None
+            if schema is None:
+                with profiled(profiler, "schema", 0):
+                    schema = infer_schema(in_path, headers=headers, rules=rules, **read_kwargs)
+                schema_source = f"{schema['sample_rows']} sampled rows"
+            if args.save_schema:
+                save_schema(schema, args.save_schema)
+            for c, fmts in schema_date_formats(schema).items():
+                date_formats.setdefault(c, fmts)
+        if args.cache_dir:
+            chunks = clean_sales_incremental(in_path, args.cache_dir, max_cache_bytes=args.cache_size * 2**20,
+                                             workers=args.workers or 1, date_formats=date_formats, stats=stats,
+                                             profiler=profiler, headers=headers, quality=quality, rules=rules,
+                                             **read_kwargs)
+        elif args.workers:
+            chunks = clean_sales_parallel(in_path, workers=args.workers, date_formats=date_formats, stats=stats,
+                                          profiler=profiler, headers=headers, quality=quality, rules=rules,
+                                          **read_kwargs)
+        elif args.chunksize:
+            chunks = clean_sales_stream(in_path, chunksize=args.chunksize, date_formats=date_formats, stats=stats,
+                                        profiler=profiler, headers=headers, quality=quality, rules=rules,
+                                        **read_kwargs)
+        if args.cache_dir or args.workers or args.chunksize:
+            if near_dup:
+                # Clusters span the whole input: this reads every chunk before the first is written.
+                try:
+                    chunks = near_duplicates_stream(chunks, near_dup, args.near_dup_action, args.near_dup_threshold,
+                                                    profiler=profiler, stats=near_stats)
+                except KeyError as e:
+                    print(f"ERROR: --near-dup: {e.args[0]}", file=sys.stderr)
+                    return 2
+            if args.sort_by:
+                chunks = external_sort(chunks, args.sort_by, args.sort_memory * 2**20, profiler=profiler)
+            try:
+                write_stream(chunks, out_path, out_format, args.compression)
+            except KeyError as e:
+                print(f"ERROR: --sort-by: {e.args[0]}", file=sys.stderr)
+                return 2
+        else:
+            failures = {}
+            before = straggler_count()
+            with profiled(profiler, "read", 0) as rec:
+                if args.engine == "arrow":
+                    df = read_csv_arrow(in_path, encoding=encoding)
+                elif schema is not None:
+                    df = read_csv_schema(in_path, schema, stats, **read_kwargs)
+                else:
+                    df = pd.read_csv(in_path, low_memory=False, **read_kwargs)
+                rec["rows_in"] = rec["rows_out"] = len(df)
+            stats["stragglers"] = straggler_count() - before
+            cleaned = clean_sales_dataframe(df, date_formats=date_formats, numeric_failures=failures,
+                                            inplace=True, engine=args.engine, profiler=profiler, headers=headers,
+                                            quality=quality, rules=rules)
+            if near_dup:
+                try:
+                    cleaned = near_duplicates(cleaned, near_dup, args.near_dup_action, args.near_dup_threshold,
+                                              profiler=profiler, stats=near_stats)
+                except KeyError as e:
+                    print(f"ERROR: --near-dup: {e.args[0]}", file=sys.stderr)
+                    return 2
+            if args.sort_by:
+                if args.sort_by not in cleaned.columns:
+                    print(f"ERROR: --sort-by: cannot sort by {args.sort_by!r}: no such column", file=sys.stderr)
+                    return 2
+                with profiled(profiler, "sort", len(cleaned)):
+                    cleaned = sort_frame(cleaned, args.sort_by)
+            with profiled(profiler, "write", len(cleaned)):
+                write_frame(cleaned, out_path, out_format, args.compression, engine=args.engine)
+            stats["date_formats"] = date_formats
+            stats["numeric_failures"] = failures
+    print(f"✅ Cleaned {FORMAT_NAMES[out_format]} written to: {out_path}")
+    print(f"Encoding: {encoding} ({detected_by})")
+    if schema is not None:
+        kinds = {}
+        for spec in schema["columns"].values():
+            kinds[spec["kind"]] = kinds.get(spec["kind"], 0) + 1
+        print(f"Schema ({schema_source}): " + ", ".join(f"{n} {k}" for k, n in kinds.items()))
+        if stats.get("hints_rejected"):
+            print(f"Schema dtypes did not fit the whole file, read without them: {stats['hints_rejected']}")
+    if headers is not None:
+        mapped = headers.resolve(pd.read_csv(in_path, nrows=0, **read_kwargs).columns).describe()
+        if mapped:
+            print(f"Headers: {'; '.join(mapped)}")
+    if stats.get("stragglers"):
+        print(f"Stray bytes decoded as cp1252: {stats['stragglers']}")
+    if stats["date_formats"]:
+        flags = " ".join(
+            f"--date-format {shlex.quote(f'{c}={f}')}" for c, fs in stats["date_formats"].items() for f in fs
+        )
+        print(f"Date formats: {flags}")
+    if stats["numeric_failures"]:
+        counts = ", ".join(f"{c}={n}" for c, n in stats["numeric_failures"].items())
+        print(f"Unparsable numbers (set to empty): {counts}")
+    if "chunks" in stats:
+        print(f"Chunks: {stats['chunks']} | {stats['chunks_reused']} reused from {args.cache_dir}")
+    if "rows_in" in stats:
+        print(f"Rows: {stats['rows_in']} in | {stats['rows_out']} out | "
+              f"{stats['duplicates_dropped']} duplicates removed")
+    if near_stats:
+        print(f"Near duplicates ({', '.join(near_dup)}): {near_stats['clusters']} clusters of "
+              f"{near_stats['clustered_rows']} rows | {near_stats['matched_pairs']} of "
+              f"{near_stats['candidate_pairs']} candidate pairs matched | {near_stats['rows_removed']} rows removed")
+    if quarantine is not None:
+        n = quarantine.write(args.quarantine, in_path)
+        detail = f" ({quarantine.summary()})" if n else ""
+        print(f"Quarantined: {n} malformed lines -> {args.quarantine}{detail}")
+    if quality is not None:
+        Path(args.quality_json).write_text(json.dumps(quality.to_dict(), indent=2) + "\n")
+        print(f"Quality: {quality.summary()}")
+    if profiler is not None:
+        wall = time.perf_counter() - started
+        if args.profile:
+            print(profiler.report())
+            print(f"Total: {wall:.3f}s wall")
+        if args.metrics_json:
+            mode = "incremental" if args.cache_dir else "workers" if args.workers else "chunksize" if args.chunksize else "in-memory"
+            metrics = {"input": str(in_path), "output": str(out_path), "mode": mode, "engine": args.engine,
+                       "encoding": encoding, "wall_s": wall, **profiler.to_dict()}
+            Path(args.metrics_json).write_text(json.dumps(metrics, indent=2) + "\n")
     return 0
 
+def _header_resolver(args):
+    if args.header_aliases:
+        return HeaderResolver.from_file(args.header_aliases)
+    return HeaderResolver() if args.resolve_headers else None
+
+def _main_batch(p, args, date_formats, headers, rules):
+    if not args.input_dir or not args.output_dir or args.input or args.output:
+        p.error("batch mode takes --input-dir and --output-dir instead of --input and --output")
+    if (args.workers or args.cache_dir or args.profile or args.metrics_json or args.profile_allocations
+            or args.quality_json or args.quarantine):
+        p.error("batch mode cannot be combined with --workers, --cache-dir, profiling, --quality-json or --quarantine")
+    if args.jobs is not None and args.jobs < 1:
+        p.error("--jobs must be a positive integer")
+    fmt = args.output_format or "csv"
+    if args.compression is not None and args.compression not in COMPRESSIONS[fmt]:
+        p.error(f"--compression for {fmt} must be one of: {', '.join(COMPRESSIONS[fmt])}")
+    in_dir = Path(args.input_dir)
+    if not in_dir.is_dir():
+        print(f"ERROR: Input directory not found: {in_dir}", file=sys.stderr)
+        return 2
+    from .arrow import require_pyarrow
+    from .batch import batch_config, clean_file, plan_batch, run_batch
+    if args.engine == "arrow" or fmt != "csv":
+        try:
+            require_pyarrow("--engine arrow" if args.engine == "arrow" else f"{fmt} output")
+        except ImportError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 2
+
+    pairs = plan_batch(in_dir, args.output_dir, args.glob, fmt, args.compression)
+    options = {"output_format": fmt, "compression": args.compression, "engine": args.engine,
+               "chunksize": args.chunksize, "date_formats": date_formats, "headers": headers,
+               "rules": rules}
+    manifest = Path(args.manifest or Path(args.output_dir) / MANIFEST_NAME)
+    icons = {"ok": "✅", "skipped": "⏭️", "error": "❌"}
+
+    def progress(rec):
+        detail = rec["error"] if rec["status"] == "error" else f"{rec.get('rows_out', '?')} rows"
+        wall = f"{rec['wall_s']:.2f}s" if rec["wall_s"] is not None else "-"
+        print(f"{icons[rec['status']]} {rec['input']} -> {rec['output']} ({detail}, {wall})")
+
+    started = time.perf_counter()
+    records = run_batch(pairs, functools.partial(clean_file, **options), workers=args.jobs or os.cpu_count(),
+                        executor=args.executor, skip=args.skip_unchanged, manifest=manifest,
+                        config=batch_config(sorted(options.items())), progress=progress)
+    counts = {s: sum(r["status"] == s for r in records) for s in icons}
+    print(f"Batch: {len(records)} files | {counts['ok']} cleaned | {counts['skipped']} up to date | "
+          f"{counts['error']} failed | {time.perf_counter() - started:.2f}s")
+    print(f"Manifest: {manifest}")
+    return 1 if counts["error"] else 0
+
 if __name__ == "__main__":
     raise SystemExit(main())
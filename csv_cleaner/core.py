@@ -1,45 +1,106 @@
 ﻿from __future__ import annotations
 import re
 import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+from .arrow import is_arrow_string, map_text_arrow, parse_numeric_arrow, to_arrow_dtypes
+from .dates import parse_date_column
+from .numeric import parse_numeric
+from .options import ENGINES
+from .profile import coerced, profiled
+from .quality import sales_formula
+from .rules import DATE_COLS, DEFAULT_RULES, NUMERIC_COLS, TITLECASE_COLS  # noqa: F401 (re-exported)
+from .text import map_codes, map_unique, strip_collapse, strip_title
 
-def _clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.rename(columns=lambda c: re.sub(r"\s+", "_", c.strip().lower()))
+def _clean_column_names(df: pd.DataFrame, headers=None) -> pd.DataFrame:
+    if headers is not None:
+        return df.rename(columns=headers.resolve(df.columns).mapping, copy=False)
+    df = df.rename(columns=lambda c: re.sub(r"\s+", "_", c.strip().lower()), copy=False)
     return df
 
-def _strip_object_cols(df: pd.DataFrame) -> pd.DataFrame:
+def _strip_object_cols(df: pd.DataFrame, categorical: bool = False) -> pd.DataFrame:
     obj_cols = df.select_dtypes(include=["object"]).columns
     for c in obj_cols:
-        df[c] = df[c].astype(str).str.strip()
-        df[c] = df[c].str.replace(r"\s+", " ", regex=True)
+        df[c] = map_unique(df[c], strip_collapse, categorical=categorical)
     return df
 
-def _titlecase_if_present(df: pd.DataFrame, cols=("customer_name","city")) -> pd.DataFrame:
-    for c in cols:
-        if c in df.columns:
-            df[c] = df[c].astype(str).str.strip().str.title()
-    return df
+def _is_text(dtype) -> bool:
+    # Text read as ``category`` (schema hints) is cleaned like object text.
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories.dtype == object
+    return dtype == object or is_arrow_string(dtype)
 
-def _parse_dates(df: pd.DataFrame, cols=("order_date",)) -> pd.DataFrame:
-    for c in cols:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce", utc=False)
-    return df
+def _column_plan(df: pd.DataFrame, rules=None) -> dict:
+    """Column -> (text transforms, parser) the row-local stages apply to it, in order."""
+    rules = rules or DEFAULT_RULES
+    compiled = rules.plan(df.columns)
+    plan = {}
+    for c in df.columns:
+        text = (strip_collapse,) if rules.strip_text and _is_text(df[c].dtype) else ()
+        title, parse = compiled.get(c, (False, None))
+        if title:
+            text += (strip_title,)
+        if text or parse:
+            plan[c] = (text, parse)
+    return plan
 
-def _to_numeric(df: pd.DataFrame, col: str) -> pd.Series:
-    s = df[col].astype(str)
-    s = s.str.replace(r"[^\d\.\-]", "", regex=True)
-    return pd.to_numeric(s, errors="coerce")
+def _compose(funcs):
+    if len(funcs) == 1:
+        return funcs[0]
+    def run(u):
+        for f in funcs:
+            u = f(u)
+        return u
+    return run
 
-def _ensure_numeric(df: pd.DataFrame) -> pd.DataFrame:
-    for c in ("quantity","unit_price","price","amount","sales"):
-        if c in df.columns:
-            df[c] = _to_numeric(df, c)
-    return df
+def _clean_column(s: pd.Series, text, parse, categorical=False, date_formats=None, numeric_failures=None) -> pd.Series:
+    # All text transforms run as one function over the distinct values; a
+    # column that is parsed next stays as codes until the parser's output.
+    c = s.name
+    arrow = is_arrow_string(s.dtype)
+    if arrow and text:
+        s = map_text_arrow(s, text)
+    elif text and parse:
+        codes, categories = map_codes(s, _compose(text))
+        s = pd.Series(pd.Categorical.from_codes(codes, categories=categories), index=s.index, name=c)
+    elif text:
+        s = map_unique(s, _compose(text), categorical=categorical)
+    if parse == "date":
+        # Known formats skip inference; newly inferred ones are written back
+        # so callers can report/reuse them.
+        known = None if date_formats is None else date_formats.get(c)
+        s, used = parse_date_column(s, known)
+        if date_formats is not None and c not in date_formats and used:
+            date_formats[c] = used
+    elif parse == "numeric":
+        s, n = parse_numeric_arrow(s) if arrow else parse_numeric(s)
+        if numeric_failures is not None and n:
+            numeric_failures[c] = numeric_failures.get(c, 0) + n
+    return s
+
+def _sales_inputs(columns) -> tuple:
+    """``(quantity column, price column)`` that sales is computed from (``None`` if absent)."""
+    q_col = next((c for c in ("quantity","qty") if c in columns), None)
+    p_col = next((c for c in ("unit_price","price","unitprice") if c in columns), None)
+    return q_col, p_col
+
+def _is_number(s: pd.Series) -> bool:
+    return is_numeric_dtype(s.dtype) and not is_bool_dtype(s.dtype)
+
+def _check_formula(df: pd.DataFrame, formula: dict) -> None:
+    """Add the source rows' :func:`csv_cleaner.quality.sales_formula` counts to ``formula``."""
+    q_col, p_col = _sales_inputs(df.columns)
+    if q_col and p_col and "sales" in df.columns:
+        for k, n in sales_formula(df[q_col], df[p_col], df["sales"]).items():
+            formula[k] = formula.get(k, 0) + n
 
 def _compute_sales(df: pd.DataFrame) -> pd.DataFrame:
-    q_col = next((c for c in ("quantity","qty") if c in df.columns), None)
-    p_col = next((c for c in ("unit_price","price","unitprice") if c in df.columns), None)
-    if q_col and p_col:
+    """Fill missing ``sales`` with quantity * price; skipped unless all of them are numeric.
+
+    (Rules may leave a price column unparsed: its text is not multiplied.)
+    """
+    q_col, p_col = _sales_inputs(df.columns)
+    if (q_col and p_col and _is_number(df[q_col]) and _is_number(df[p_col])
+            and ("sales" not in df.columns or _is_number(df["sales"]) or df["sales"].isna().all())):
         computed = df[q_col].fillna(0) * df[p_col].fillna(0)
         if "sales" in df.columns:
             df["sales"] = df["sales"].fillna(computed)
@@ -53,14 +114,86 @@ def _drop_full_empty_cols(df: pd.DataFrame) -> pd.DataFrame:
 def _dedupe(df: pd.DataFrame) -> pd.DataFrame:
     return df.drop_duplicates(ignore_index=True)
 
-def clean_sales_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df = _clean_column_names(df)
-    df = _strip_object_cols(df)
-    df = _titlecase_if_present(df, cols=("customer_name","city","category","product"))
-    df = _parse_dates(df, cols=("order_date",))
-    df = _ensure_numeric(df)
-    df = _compute_sales(df)
-    df = _drop_full_empty_cols(df)
-    df = _dedupe(df)
+def _clean_rows(df: pd.DataFrame, date_formats=None, categorical: bool = False,
+                numeric_failures=None, profiler=None, headers=None, coercions=None, rules=None,
+                formula=None) -> pd.DataFrame:
+    """Row-local stages: safe to run on any slice of a file independently.
+
+    Whitespace, title case, date and number parsing are fused per column (see
+    :func:`_column_plan`), so each column is read and replaced once.
+    ``coercions`` (a dict) receives, per parsed column, the values the parser
+    turned into NaN/NaT. ``formula`` (a dict) receives the sales formula check
+    of the source values, before sales is filled. ``rules`` (a :class:`csv_cleaner.rules.CleaningRules`)
+    picks the columns each stage touches and the columns kept.
+    """
+    rules = rules or DEFAULT_RULES
+    with profiled(profiler, "columns", len(df)):
+        df = _clean_column_names(df, headers)
+        if rules.columns is not None:
+            df = df.drop(columns=df.columns.difference(rules.keep(df.columns)))
+    for c, (text, parse) in _column_plan(df, rules).items():
+        with profiled(profiler, parse or "text", len(df), column=c) as rec:
+            before = df[c]
+            df[c] = _clean_column(before, text, parse, categorical, date_formats, numeric_failures)
+            if parse and (profiler is not None or coercions is not None):
+                rec["coerced"] = n = coerced(before, df[c])
+                if coercions is not None:
+                    coercions[c] = coercions.get(c, 0) + n
+    if rules.compute_sales or formula is not None:
+        with profiled(profiler, "sales", len(df)):
+            if formula is not None:
+                _check_formula(df, formula)
+            if rules.compute_sales:
+                df = _compute_sales(df)
+    return df
+
+def clean_sales_dataframe(df: pd.DataFrame, date_formats=None, categorical: bool = False,
+                          numeric_failures=None, inplace: bool = False, engine: str = "pandas",
+                          profiler=None, headers=None, quality=None, rules=None) -> pd.DataFrame:
+    """Clean a raw sales frame; ``categorical=True`` returns low-cardinality text as ``category``.
+
+    Pass a dict as ``numeric_failures`` to collect, per numeric column, how
+    many non-empty values could not be parsed as numbers. ``inplace=True``
+    skips the defensive copy of ``df``, which must not be used afterwards.
+
+    ``engine="arrow"`` (requires pyarrow) cleans Arrow-backed columns with
+    ``pyarrow.compute``; frames not read with ``dtype_backend="pyarrow"`` are
+    converted first. ``categorical`` only applies to the pandas engine. See
+    :mod:`csv_cleaner.arrow` for how its output differs.
+
+    ``profiler`` (a :class:`csv_cleaner.profile.StageProfiler`) records time,
+    rows, memory and coerced values per stage.
+
+    ``headers`` (a :class:`csv_cleaner.headers.HeaderResolver`) maps raw
+    headers onto canonical names (``"Unit Price ($)"`` -> ``unit_price``);
+    by default they are only lower-cased with whitespace turned into ``_``.
+
+    ``quality`` (a :class:`csv_cleaner.quality.QualityProfile`) receives the
+    coerced values of each parse stage and a profile of the cleaned frame.
+
+    ``rules`` (a :class:`csv_cleaner.rules.CleaningRules`) replaces the
+    built-in title-case, date and numeric column lists; see :mod:`csv_cleaner.rules`.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+    with profiled(profiler, "prepare", len(df)):
+        if engine == "arrow":
+            df = to_arrow_dtypes(df, copy=not inplace)
+            categorical = False
+        elif not inplace:
+            df = df.copy()
+    coercions = None if quality is None else {}
+    formula = None if quality is None else {}
+    df = _clean_rows(df, date_formats=date_formats, categorical=categorical, numeric_failures=numeric_failures,
+                     profiler=profiler, headers=headers, coercions=coercions, rules=rules, formula=formula)
+    with profiled(profiler, "drop_empty", len(df)):
+        df = _drop_full_empty_cols(df)
+    with profiled(profiler, "dedupe", len(df)) as rec:
+        df = _dedupe(df)
+        rec["rows_out"] = len(df)
+    if quality is not None:
+        with profiled(profiler, "quality", len(df)):
+            quality.add_coerced(coercions)
+            quality.add_formula(formula)
+            quality.update(df)
     return df
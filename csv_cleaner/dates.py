@@ -0,0 +1,125 @@
+"""Date parsing with up-front format inference.
+
+Instead of letting pandas guess from the first value (and drop to per-value
+``dateutil`` when it can't), the formats of a column are inferred once from a
+sample of its distinct values: candidate strptime formats are scored by how
+many sample values they parse, picked greedily, and day/month ambiguity is
+settled by the order the column's unambiguous values use. Parsing then runs
+one vectorized ``format=`` pass per format over the *distinct* strings only
+(order dates repeat heavily) and maps the results back; values no format
+matched fall back to per-value parsing.
+
+The inferred formats are returned so callers can report them and pass them
+back in on later runs of the same feed to skip inference.
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_string_dtype
+
+DEFAULT_SAMPLE_SIZE = 1000
+MAX_FORMATS = 3
+
+NAT_STRINGS = frozenset(("", "NaT", "nat", "NAT", "nan", "NaN", "NAN", "None", "<NA>", "now", "today"))
+
+_YEAR_FIRST = ("%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d")
+# Month-first before day-first: ties go to the dateutil default.
+_ORDERED = tuple(
+    f"{a}{sep}{b}{sep}{y}"
+    for y in ("%Y", "%y")
+    for sep in "/-."
+    for a, b in (("%m", "%d"), ("%d", "%m"))
+)
+_NAMED = ("%d %b %Y", "%d-%b-%Y", "%d-%b-%y", "%b %d, %Y", "%d %B %Y", "%B %d, %Y")
+_TIMES = (" %H:%M:%S", " %H:%M", "T%H:%M:%S")
+
+
+def _candidates(sample: list[str]) -> list[str]:
+    # Prune by what the sample can contain so inference stays cheap.
+    joined = "".join(sample)
+    seps = {s for s in "/-." if s in joined}
+    dates = [f for f in _YEAR_FIRST + _ORDERED if f == "%Y%m%d" or f[2] in seps]
+    if any(ch.isalpha() for ch in joined.replace("T", "")):
+        dates += _NAMED
+    out = list(dates)
+    if ":" in joined:
+        out += [d + t for d in dates for t in _TIMES if t[0] != "T" or "T" in joined]
+    return out
+
+
+def _dayfirst(formats) -> bool | None:
+    for f in formats:
+        if "%d" in f and "%m" in f:
+            return f.index("%d") < f.index("%m")
+    return None
+
+
+def date_sample(values, sample_size: int = DEFAULT_SAMPLE_SIZE) -> list[str]:
+    """First ``sample_size`` distinct non-null strings of ``values``, in order."""
+    out = []
+    for v in pd.unique(np.asarray(values, dtype=object)):
+        if isinstance(v, str) and v not in NAT_STRINGS:
+            out.append(v)
+            if len(out) == sample_size:
+                break
+    return out
+
+
+def infer_date_formats(sample: list[str], max_formats: int = MAX_FORMATS) -> tuple[str, ...]:
+    """Greedily pick the strptime formats that parse the most of ``sample``."""
+    remaining = pd.Index(sample, dtype=object)
+    chosen: list[str] = []
+    candidates = _candidates(sample)
+    while len(remaining) and len(chosen) < max_formats:
+        order = _dayfirst(chosen)
+        best, best_key, best_hits = None, None, None
+        for i, f in enumerate(candidates):
+            hits = pd.to_datetime(remaining, format=f, errors="coerce").notna()
+            n = int(hits.sum())
+            if not n:
+                continue
+            key = (n, order is not None and _dayfirst([f]) == order, -i)
+            if best_key is None or key > best_key:
+                best, best_key, best_hits = f, key, hits
+        if best is None:
+            break
+        chosen.append(best)
+        candidates.remove(best)
+        remaining = remaining[~np.asarray(best_hits)]
+    return tuple(chosen)
+
+
+def parse_date_column(s: pd.Series, formats=None, sample_size: int = DEFAULT_SAMPLE_SIZE):
+    """Parse ``s`` to datetime64; returns ``(parsed, formats_used)``.
+
+    Text columns (object, category or Arrow strings) are parsed per distinct value;
+    ``formats_used`` is ``None`` for anything else (nothing inferred).
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        codes, uniques = s.cat.codes.to_numpy(), s.cat.categories
+    elif s.dtype == object or (isinstance(s.dtype, pd.ArrowDtype) and is_string_dtype(s.dtype)):
+        codes, uniques = pd.factorize(s)
+    else:
+        return pd.to_datetime(s, errors="coerce", utc=False), None
+    if formats is None:
+        formats = infer_date_formats(date_sample(uniques, sample_size))
+    formats = tuple(formats)
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype="datetime64[ns]")
+    values = pd.Series(uniques, dtype=object)
+    is_str = values.map(lambda v: isinstance(v, str)).to_numpy(bool)
+    todo = np.flatnonzero(is_str & ~values.isin(NAT_STRINGS).to_numpy())
+    for f in formats:
+        if not len(todo):
+            break
+        r = pd.to_datetime(values.iloc[todo], format=f, errors="coerce")
+        hit = r.notna().to_numpy()
+        parsed.iloc[todo[hit]] = r[hit].to_numpy()
+        todo = todo[~hit]
+    # Leftovers (and non-string values) go through per-value parsing.
+    todo = np.union1d(todo, np.flatnonzero(~is_str & values.notna().to_numpy()))
+    if len(todo):
+        r = pd.to_datetime(values.iloc[todo], format="mixed", errors="coerce",
+                           dayfirst=bool(_dayfirst(formats)))
+        parsed.iloc[todo] = r.to_numpy()
+    out = pd.Series(parsed.array.take(codes, allow_fill=True), index=s.index, name=s.name)
+    return out, formats
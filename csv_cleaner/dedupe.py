@@ -0,0 +1,156 @@
+"""Exact duplicate-row removal for data that doesn't fit in memory.
+
+Each row is fingerprinted with a 64-bit hash. Hashes (8 bytes) plus row
+numbers (8 bytes) are held in memory until ``memory_budget`` is exceeded,
+then partitioned by hash value into files on disk. After all chunks are
+added, every partition is scanned once for hashes that occur more than once;
+only those rows are candidates, and they are compared value by value when
+the chunks are replayed, so a hash collision can never drop a distinct row.
+
+Usage is two passes over the same chunks, in the same order::
+
+    dd = HashDeduper()
+    for chunk in chunks():
+        dd.add(chunk)
+    dd.finish()
+    for chunk in chunks():
+        out = dd.filter(chunk)       # first occurrences only
+    dd.dropped                       # rows removed
+"""
+from __future__ import annotations
+import shutil
+import tempfile
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+DEFAULT_PARTITIONS = 64
+
+# Stand-in for NaN/NaT/None inside row keys: drop_duplicates treats missing
+# values as equal, plain tuple comparison would not (nan != nan).
+_MISSING = object()
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash per row; equal rows hash equal even if int/float dtypes differ."""
+    casts = {
+        c: "float64" for c, d in df.dtypes.items()
+        if is_numeric_dtype(d) and not is_bool_dtype(d) and d != np.float64
+    }
+    if casts:
+        df = df.astype(casts)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def _candidates(h: np.ndarray, r: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Rows whose hash occurs more than once, as ``(rows, hashes)``."""
+    order = np.lexsort((r, h))
+    h, r = h[order], r[order]
+    same = h[1:] == h[:-1]
+    mask = np.zeros(len(h), dtype=bool)
+    mask[1:] |= same
+    mask[:-1] |= same
+    return r[mask], h[mask]
+
+
+class HashDeduper:
+    """Two-pass, exact, bounded-memory row de-duplication (see module docstring)."""
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, spill_dir=None,
+                 partitions: int = DEFAULT_PARTITIONS):
+        self.memory_budget = memory_budget
+        self.partitions = partitions
+        self.dropped = 0
+        self.spilled = False
+        self._parent_dir = spill_dir
+        self._dir: Path | None = None
+        self._buffer: list[np.ndarray] = []
+        self._buffered_rows = 0
+        self._rows = 0
+        self._pos = 0
+        self._cand_rows = np.empty(0, dtype=np.int64)
+        self._cand_hashes = np.empty(0, dtype=np.uint64)
+        self._last: dict = {}
+        self._reps: dict = {}
+
+    def add(self, chunk) -> None:
+        """Register the rows of ``chunk`` (a DataFrame or precomputed :func:`row_hashes`)."""
+        h = chunk if isinstance(chunk, np.ndarray) else row_hashes(chunk)
+        self._buffer.append(h)
+        self._buffered_rows += len(h)
+        self._rows += len(h)
+        if self._buffered_rows * 16 > self.memory_budget:
+            self._spill()
+
+    def _buffered(self) -> tuple[np.ndarray, np.ndarray]:
+        h = np.concatenate(self._buffer) if self._buffer else np.empty(0, dtype=np.uint64)
+        r = np.arange(self._rows - len(h), self._rows, dtype=np.int64)
+        self._buffer, self._buffered_rows = [], 0
+        return h, r
+
+    def _spill(self) -> None:
+        if self._dir is None:
+            self._dir = Path(tempfile.mkdtemp(prefix="dedupe-", dir=self._parent_dir))
+        h, r = self._buffered()
+        part = h % np.uint64(self.partitions)
+        order = np.argsort(part, kind="stable")
+        h, r, part = h[order], r[order], part[order]
+        bounds = np.searchsorted(part, np.arange(self.partitions + 1, dtype=np.uint64))
+        for p in range(self.partitions):
+            a, b = bounds[p], bounds[p + 1]
+            if a < b:
+                with open(self._dir / f"{p:04d}.bin", "ab") as fh:
+                    np.stack([h[a:b], r[a:b].view(np.uint64)], axis=1).tofile(fh)
+        self.spilled = True
+
+    def finish(self) -> None:
+        """Find candidate duplicate rows; call once after the last :meth:`add`."""
+        if self.spilled:
+            self._spill()
+            found = []
+            for f in sorted(self._dir.glob("*.bin")):
+                pairs = np.fromfile(f, dtype=np.uint64).reshape(-1, 2)
+                found.append(_candidates(pairs[:, 0], pairs[:, 1].view(np.int64)))
+                f.unlink()
+        else:
+            found = [_candidates(*self._buffered())]
+        rows = np.concatenate([f[0] for f in found])
+        hashes = np.concatenate([f[1] for f in found])
+        order = np.argsort(rows)
+        self._cand_rows, self._cand_hashes = rows[order], hashes[order]
+        self._last = pd.Series(self._cand_rows).groupby(self._cand_hashes).max().to_dict()
+
+    def filter(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Return ``chunk`` without rows already seen (chunks in :meth:`add` order)."""
+        start = self._pos
+        self._pos += len(chunk)
+        lo, hi = np.searchsorted(self._cand_rows, [start, self._pos])
+        if lo == hi:
+            return chunk
+        keep = np.ones(len(chunk), dtype=bool)
+        offsets = self._cand_rows[lo:hi] - start
+        rows = chunk.iloc[offsets].itertuples(index=False, name=None)
+        for i, h, values in zip(offsets, self._cand_hashes[lo:hi].tolist(), rows):
+            key = tuple(_MISSING if pd.isna(v) else v for v in values)
+            reps = self._reps.setdefault(h, [])
+            if key in reps:
+                keep[i] = False
+                self.dropped += 1
+            else:
+                reps.append(key)
+            if start + i == self._last[h]:
+                del self._reps[h]
+        return chunk[keep]
+
+    def close(self) -> None:
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
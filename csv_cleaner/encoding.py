@@ -0,0 +1,165 @@
+"""Pick a CSV file's text encoding once, before parsing it.
+
+:func:`sniff_encoding` trusts a byte-order mark when there is one. Otherwise
+it samples the head and tail of the file: if they are valid UTF-8, or hold at
+least as many well-formed multi-byte characters as invalid bytes, the file is
+read as UTF-8; else ``chardet`` (when installed) names the encoding,
+defaulting to cp1252. The file is then parsed exactly once.
+
+Files are not always one encoding: a UTF-8 export may carry a few rows pasted
+from a cp1252 spreadsheet. Reads use the :data:`FALLBACK_ERRORS` codec error
+handler, which decodes each such straggler byte as cp1252 (latin-1 for the
+five bytes cp1252 leaves undefined) where the parser meets it, instead of
+failing and re-reading the file.
+"""
+from __future__ import annotations
+import codecs
+import io
+import os
+import re
+import threading
+import pandas as pd
+from .inputs import input_read_kwargs, is_compressed, open_input
+
+# Bytes read from each end of the file.
+SAMPLE_BYTES = 64 * 1024
+# Name of the codec error handler; pass as ``encoding_errors`` to ``pd.read_csv``.
+FALLBACK_ERRORS = "csv_cleaner.fallback"
+DEFAULT_SINGLE_BYTE = "cp1252"
+# chardet's answer below this confidence is ignored.
+MIN_CONFIDENCE = 0.5
+
+# Longest first: the UTF-32 LE mark starts with the UTF-16 LE one.
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+# Browsers read latin-1 labelled text as cp1252; so do we (it only adds
+# printable characters in 0x80-0x9F, where latin-1 has control codes).
+_SUPERSETS = {"latin-1": "cp1252", "iso8859-1": "cp1252", "ascii": "cp1252"}
+_NON_ASCII_LINE = re.compile(rb"[^\n]*[\x80-\xff][^\n]*")
+
+
+def _straggler_char(b: int) -> str:
+    try:
+        return bytes([b]).decode(DEFAULT_SINGLE_BYTE)
+    except UnicodeDecodeError:
+        return chr(b)
+
+
+_STRAGGLER_CHARS = [_straggler_char(b) for b in range(256)]
+_counts = threading.local()
+
+
+def _fallback(e: UnicodeError):
+    if not isinstance(e, UnicodeDecodeError):
+        raise e
+    bad = e.object[e.start:e.end]
+    _counts.n = getattr(_counts, "n", 0) + len(bad)
+    return "".join(_STRAGGLER_CHARS[b] for b in bad), e.end
+
+
+codecs.register_error(FALLBACK_ERRORS, _fallback)
+
+
+def _utf8_counts(head: bytes, tail: bytes) -> tuple[int, int]:
+    """``(non-ASCII characters, invalid bytes)`` of the sample read as UTF-8."""
+    # The sample edges may cut a multi-byte character: drop a partial one at
+    # either end rather than count it as invalid.
+    skip = 0
+    while skip < min(3, len(tail)) and 0x80 <= tail[skip] <= 0xBF:
+        skip += 1
+    chars = invalid = 0
+    for part in (head, tail[skip:]):
+        dec = codecs.getincrementaldecoder("utf-8")("surrogateescape")
+        text = dec.decode(part, final=False)
+        bad = sum(1 for ch in text if "\udc80" <= ch <= "\udcff")
+        chars += sum(1 for ch in text if ch > "\x7f") - bad
+        invalid += bad
+    return chars, invalid
+
+
+def _single_byte(sample: bytes) -> tuple[str, str]:
+    try:
+        import chardet
+    except ImportError:
+        return DEFAULT_SINGLE_BYTE, "not UTF-8; default"
+    # ASCII lines tell chardet nothing and its cost grows with input size.
+    guess = chardet.detect(b"\n".join(_NON_ASCII_LINE.findall(sample)))
+    name, confidence = guess.get("encoding"), guess.get("confidence") or 0.0
+    if name and confidence >= MIN_CONFIDENCE:
+        try:
+            enc = _SUPERSETS.get(codecs.lookup(name).name, codecs.lookup(name).name)
+            # chardet sometimes names a CJK codec for mostly-ASCII Western
+            # text; only take an answer that decodes the whole sample.
+            sample.decode(enc)
+            return enc, f"chardet {confidence:.2f}"
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return DEFAULT_SINGLE_BYTE, "not UTF-8; chardet unsure"
+
+
+def sniff_encoding(path, sample_bytes: int = SAMPLE_BYTES) -> tuple[str, str]:
+    """Return ``(encoding, how)`` for a file, reading at most ``2 * sample_bytes``.
+
+    ``how`` says what decided it (``"BOM"``, ``"UTF-8 sample"``,
+    ``"chardet 0.73"`` ...), for reporting. Compressed files are sampled at
+    the head only (of the decompressed bytes): their tail can't be reached
+    without decompressing everything. ``path`` may also be the file's
+    contents as bytes (e.g. an upload).
+    """
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        data = memoryview(path)
+        head = bytes(data[:sample_bytes])
+        tail = bytes(data[max(sample_bytes, len(data) - sample_bytes):])
+    else:
+        size = None if is_compressed(path) else os.path.getsize(path)
+        with open_input(path) as fh:
+            head = fh.read(sample_bytes)
+            tail = b""
+            if size is not None and size > sample_bytes:
+                fh.seek(max(sample_bytes, size - sample_bytes))
+                tail = fh.read()
+    for bom, enc in _BOMS:
+        if head.startswith(bom):
+            return enc, "BOM"
+    chars, invalid = _utf8_counts(head, tail)
+    if not invalid:
+        return "utf-8", "UTF-8 sample"
+    if chars >= invalid:
+        # Mostly well-formed UTF-8: the bad bytes are stragglers.
+        return "utf-8", f"UTF-8 sample, {invalid} stray bytes"
+    return _single_byte(head + b"\n" + tail)
+
+
+def ascii_compatible(encoding: str) -> bool:
+    """Whether every ``\\n`` byte in the encoded file is a newline (not so in UTF-16/32)."""
+    return not codecs.lookup(encoding).name.startswith(("utf-16", "utf-32"))
+
+
+def straggler_count() -> int:
+    """Bytes the :data:`FALLBACK_ERRORS` handler has decoded in this thread so far."""
+    return getattr(_counts, "n", 0)
+
+
+def read_csv_sniffed(path, report: dict | None = None, **read_kwargs) -> pd.DataFrame:
+    """``pd.read_csv`` with the encoding from :func:`sniff_encoding`.
+
+    Compressed inputs are decompressed as a stream, plain ones memory-mapped
+    (see :mod:`csv_cleaner.inputs`); ``path`` may also be the CSV's bytes. If
+    ``report`` is a dict it receives ``encoding``, ``detected_by`` and
+    ``stragglers`` (bytes decoded by the fallback handler).
+    """
+    enc, how = sniff_encoding(path)
+    before = straggler_count()
+    if isinstance(path, (bytes, bytearray, memoryview)):
+        path = io.BytesIO(path)
+    else:
+        read_kwargs = {**input_read_kwargs(path), **read_kwargs}
+    df = pd.read_csv(path, encoding=enc, encoding_errors=FALLBACK_ERRORS, **read_kwargs)
+    if report is not None:
+        report.update(encoding=enc, detected_by=how, stragglers=straggler_count() - before)
+    return df
@@ -0,0 +1,187 @@
+"""Header resolution: map raw CSV headers onto canonical column names.
+
+A :class:`HeaderResolver` holds an alias index (canonical name -> known
+variants) built once. Each header is normalized (``"Unit Price ($)"`` ->
+``unit_price``) and then scored against the index, trying in turn:
+
+* ``exact``: the normalized header is a canonical name or an alias (1.0);
+* ``compact``: equal once underscores are dropped (``unitprice``, 0.95);
+* ``tokens``: the same words after dropping currency/unit noise, in any
+  order (``price_unit_usd``, 0.9);
+* ``fuzzy``: :mod:`difflib` similarity of the compact forms, for typos
+  (``quantiy``), accepted at ``min_score`` or above.
+
+Each canonical name goes to at most one header: the best-scoring one, then
+the one already named like it, then the earliest. The others keep their
+normalized name, so
+``City``, ``State`` and ``Region`` no longer all become ``city``.
+Resolutions are memoized per exact header tuple: a feed that keeps its
+layout is resolved once per process.
+
+Alias files are JSON objects of ``{"canonical": ["alias", ...]}``.
+"""
+from __future__ import annotations
+import difflib
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+# Canonical name -> variants, as found in the sales exports we receive.
+DEFAULT_ALIASES = {
+    # core customer/id/name mappings
+    "customer_id": ["user_id", "customer_id", "cust_id", "custid"],
+    "customer_name": ["cust_name", "custname", "customer", "customer_name", "client", "name"],
+    # dates
+    "order_date": [
+        "order_date", "orderdate", "date", "invoice_date", "purchase_date", "transaction_date"
+    ],
+    # quantities / order counts
+    "quantity": [
+        "quantity", "qty", "orders", "order_count", "qty_ordered", "quantityordered",
+        "quantity_ordered", "no_of_items", "units", "item_count", "quantity_purchased"
+    ],
+    # unit price variants
+    "unit_price": [
+        "unit_price", "unitprice", "price", "unit_cost", "priceeach", "price_each",
+        "price_per_unit", "price_per_item", "selling_price", "mrp", "priceperunit"
+    ],
+    # total/sales amount variants
+    "sales": [
+        "sales", "sales_amount", "salesvalue", "total", "amount", "revenue", "total_amount",
+        "totalamount", "invoice_amount", "amount_paid", "total_price", "order_amount", "grand_total",
+    ],
+    # product & category
+    "product": ["product", "product_id", "product_name", "item", "sku", "productcode"],
+    "category": ["category", "cat", "type", "product_category", "productcategory"],
+    # geography / other text fields
+    "city": ["city", "town", "region", "state", "location"],
+    "marital_status": ["marital_status", "maritalstatus", "marital", "married_status"],
+    "age_group": ["age_group", "age_group_1", "agegroup", "age_group1", "age_group.1"],
+    "occupation": ["occupation", "job", "profession"],
+    "gender": ["gender", "sex"],
+    "zone": ["zone", "region_zone", "geozone"],
+}
+DEFAULT_MIN_SCORE = 0.9
+# Words that qualify a header without changing what it holds.
+NOISE_TOKENS = frozenset({"usd", "inr", "eur", "gbp", "rs", "in", "of", "the", "value"})
+# Shorter headers are too ambiguous for fuzzy matching (msrp vs mrp).
+_MIN_FUZZY_LEN = 5
+_SCORES = {"exact": 1.0, "compact": 0.95, "tokens": 0.9}
+
+
+def normalize_header(h) -> str:
+    """Lower-case snake form: ``" Unit Price ($)"`` -> ``"unit_price"``."""
+    if h is None:
+        return ""
+    h = re.sub(r"[^\w]+", "_", str(h).strip().lower())
+    return re.sub(r"_+", "_", h).strip("_")
+
+
+def _tokens(name: str) -> frozenset:
+    return frozenset(t for t in name.split("_") if t and t not in NOISE_TOKENS)
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """Outcome for one header tuple: ``mapping`` (raw -> column name) plus, for
+    the headers matched to a canonical name, ``canonical``, ``scores`` and
+    ``methods`` (``exact``/``compact``/``tokens``/``fuzzy``)."""
+    mapping: dict
+    canonical: dict
+    scores: dict
+    methods: dict
+
+    def describe(self) -> list:
+        """``"raw -> name (method score)"`` for headers that changed beyond normalization."""
+        return [f"{raw} -> {self.mapping[raw]} ({self.methods[raw]} {self.scores[raw]:.2f})"
+                for raw in self.canonical if normalize_header(raw) != self.mapping[raw]]
+
+
+class HeaderResolver:
+    """Alias index plus a memo of resolved header tuples (see the module docstring)."""
+
+    def __init__(self, aliases: dict | None = None, min_score: float = DEFAULT_MIN_SCORE):
+        self.aliases = {k: list(v) for k, v in (DEFAULT_ALIASES if aliases is None else aliases).items()}
+        self.min_score = min_score
+        self._exact: dict = {}
+        self._compact: dict = {}
+        self._tokens: dict = {}
+        for canonical, variants in self.aliases.items():
+            for v in [canonical, *variants]:
+                name = normalize_header(v)
+                self._exact.setdefault(name, canonical)
+                self._compact.setdefault(name.replace("_", ""), canonical)
+                if len(_tokens(name)) > 1:
+                    self._tokens.setdefault(_tokens(name), canonical)
+        self._fuzzy_keys = [k for k in self._compact if len(k) >= _MIN_FUZZY_LEN]
+        self._memo: dict = {}
+        self.fingerprint = hashlib.blake2b(
+            json.dumps([self.aliases, min_score], sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+
+    @classmethod
+    def from_file(cls, path, extend: bool = True, min_score: float = DEFAULT_MIN_SCORE) -> "HeaderResolver":
+        """Load aliases from JSON; with ``extend`` they add to :data:`DEFAULT_ALIASES`."""
+        loaded = json.loads(Path(path).read_text(encoding="utf-8"))
+        if not isinstance(loaded, dict) or not all(isinstance(v, list) for v in loaded.values()):
+            raise ValueError(f"{path}: expected an object of canonical name -> list of aliases")
+        aliases = {k: list(v) for k, v in DEFAULT_ALIASES.items()} if extend else {}
+        for canonical, variants in loaded.items():
+            aliases[canonical] = aliases.get(canonical, []) + [str(v) for v in variants]
+        return cls(aliases, min_score)
+
+    def __repr__(self) -> str:
+        return f"HeaderResolver({self.fingerprint})"
+
+    def match(self, header) -> tuple:
+        """``(canonical, score, method)`` for one header, or ``(None, 0.0, None)``."""
+        name = normalize_header(header)
+        if name in self._exact:
+            return self._exact[name], _SCORES["exact"], "exact"
+        compact = name.replace("_", "")
+        if compact in self._compact:
+            return self._compact[compact], _SCORES["compact"], "compact"
+        tokens = _tokens(name)
+        joined = "_".join(t for t in name.split("_") if t in tokens)
+        if joined in self._exact:
+            return self._exact[joined], _SCORES["tokens"], "tokens"
+        if tokens in self._tokens:
+            return self._tokens[tokens], _SCORES["tokens"], "tokens"
+        if len(compact) >= _MIN_FUZZY_LEN:
+            close = difflib.get_close_matches(compact, self._fuzzy_keys, n=1, cutoff=self.min_score)
+            if close:
+                score = difflib.SequenceMatcher(None, compact, close[0]).ratio()
+                return self._compact[close[0]], score, "fuzzy"
+        return None, 0.0, None
+
+    def resolve(self, headers) -> Resolution:
+        """Resolve a header row; memoized on the exact tuple of headers."""
+        headers = tuple(headers)
+        cached = self._memo.get(headers)
+        if cached is not None:
+            return cached
+        matches = {h: self.match(h) for h in dict.fromkeys(headers)}
+        best: dict = {}
+        for pos, (h, (canonical, score, _)) in enumerate(matches.items()):
+            if canonical is None:
+                continue
+            # Higher score, then the header already named like the column, then the earliest.
+            rank = (score, normalize_header(h) == canonical, -pos)
+            if canonical not in best or rank > best[canonical][0]:
+                best[canonical] = (rank, h)
+        winners = {h: c for c, (_, h) in best.items()}
+        resolution = Resolution(
+            mapping={h: winners.get(h, normalize_header(h)) for h in matches},
+            canonical={h: winners[h] for h in matches if h in winners},
+            scores={h: matches[h][1] for h in winners},
+            methods={h: matches[h][2] for h in winners},
+        )
+        self._memo[headers] = resolution
+        return resolution
+
+    def rename(self, columns) -> list:
+        """Resolved names for ``columns`` (e.g. ``df.columns``), in order."""
+        mapping = self.resolve(columns).mapping
+        return [mapping[c] for c in columns]
@@ -0,0 +1,225 @@
+"""Incremental cleaning of append-mostly feeds with a cache of cleaned chunks.
+
+The file is cut into byte-range chunks at row boundaries (as
+:mod:`csv_cleaner.parallel` does). Boundaries only depend on the bytes
+before them, so when a feed grows at the end every chunk but the last keeps
+its bytes. Each chunk is fingerprinted by a hash of the header and its bytes.
+The chunk's cleaned rows are cached under that fingerprint, combined with
+everything else that shapes them, together with the facts the global stages
+need (row hashes, dtypes...). "Everything else" means the package version
+and source (cleaning rules and column lists included), the pinned dtypes,
+date formats and read options. Only new or changed chunks are cleaned, then
+cached and fresh chunks are replayed in file order through the usual
+whole-file stages (empty columns, dtype unification, de-duplication). The
+output is the same as a from-scratch run.
+
+The cache is a directory bounded by ``max_bytes``; least recently used
+entries are evicted after each run.
+"""
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+import pandas as pd
+from . import __version__
+from .dedupe import DEFAULT_MEMORY_BUDGET
+from .encoding import ascii_compatible
+from .parallel import _clean_range, _range_dtypes, split_csv
+from .profile import profiled
+from .stream import _common_dtype, _input_stats, _replay_spills, infer_stream_date_formats
+
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+DEFAULT_CACHE_BYTES = 1024 * 1024 * 1024
+# Bump when the layout of cache entries changes.
+_CACHE_FORMAT = 1
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+def _digest(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p if isinstance(p, (bytes, memoryview)) else repr(p).encode())
+    return h.hexdigest()
+
+
+def cleaner_fingerprint() -> str:
+    """Version and source of the cleaning code: any rule change gives a new fingerprint."""
+    sources = [(f.name, f.read_bytes()) for f in sorted(_PACKAGE_DIR.glob("*.py"))]
+    return _digest(_CACHE_FORMAT, __version__, *[b for pair in sources for b in (pair[0].encode(), pair[1])])
+
+
+class ChunkCache:
+    """Directory of cache entries, evicted least-recently-used beyond ``max_bytes``.
+
+    An entry is one or more files named ``<key>.<kind>.pkl``; reading an entry
+    refreshes its modification time, which is what eviction orders by.
+    """
+
+    def __init__(self, directory, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def path(self, key: str, kind: str) -> Path:
+        return self.dir / f"{key}.{kind}.pkl"
+
+    def has(self, key: str, *kinds: str) -> bool:
+        return all(self.path(key, k).exists() for k in kinds)
+
+    def touch(self, key: str, *kinds: str) -> None:
+        for k in kinds:
+            os.utime(self.path(key, k))
+
+    def load(self, key: str, kind: str):
+        path = self.path(key, kind)
+        try:
+            with open(path, "rb") as fh:
+                value = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return value
+
+    def store(self, key: str, kind: str, value) -> None:
+        tmp = self.path(key, f"{kind}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path(key, kind))
+
+    def adopt(self, key: str, kind: str, src: Path) -> None:
+        """Move a file written elsewhere (e.g. a spilled chunk) into the cache."""
+        os.replace(src, self.path(key, kind))
+
+    def size(self) -> int:
+        return sum(f.stat().st_size for f in self.dir.glob("*.pkl"))
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits; returns bytes freed."""
+        entries: dict = {}
+        for f in self.dir.glob("*.pkl"):
+            st = f.stat()
+            size, mtime, files = entries.get(f.name.split(".", 1)[0], (0, 0.0, []))
+            entries[f.name.split(".", 1)[0]] = (size + st.st_size, max(mtime, st.st_mtime), files + [f])
+        total = sum(e[0] for e in entries.values())
+        freed = 0
+        for size, _, files in sorted(entries.values(), key=lambda e: e[1]):
+            if total - freed <= self.max_bytes:
+                break
+            for f in files:
+                f.unlink(missing_ok=True)
+            freed += size
+        return freed
+
+
+def _chunk_ids(path, header_end: int, ranges: list, read_kwargs: dict) -> list:
+    opts = sorted(read_kwargs.items())
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            header = view[:header_end]
+            return [_digest(opts, header, view[a:b]) for a, b in ranges]
+        finally:
+            header = None
+            view.release()
+
+
+def clean_sales_incremental(
+    path,
+    cache_dir,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+    max_cache_bytes: int = DEFAULT_CACHE_BYTES,
+    workers: int = 1,
+    dtype: dict | None = None,
+    date_formats: dict | None = None,
+    categorical: bool = False,
+    dedupe_memory: int = DEFAULT_MEMORY_BUDGET,
+    stats: dict | None = None,
+    profiler=None,
+    headers=None,
+    quality=None,
+    rules=None,
+    **read_kwargs,
+) -> Iterator[pd.DataFrame]:
+    """Clean a CSV file reusing cached chunks, yielding cleaned chunks in file order.
+
+    Yields the same rows as :func:`csv_cleaner.stream.clean_sales_stream`
+    (``dtype``, ``date_formats``, ``categorical``, ``dedupe_memory``,
+    ``stats``, ``profiler``, ``headers``, ``quality`` and ``rules`` as there). New or changed chunks
+    are cleaned on ``workers`` processes. ``stats`` also receives ``chunks`` and
+    ``chunks_reused``. ``read_kwargs`` are restricted as for
+    :func:`csv_cleaner.parallel.clean_sales_parallel`.
+    """
+    if not ascii_compatible(read_kwargs.get("encoding") or "utf-8"):
+        raise ValueError(f"byte-range chunks need an ASCII-compatible encoding, got {read_kwargs['encoding']!r}")
+    cache = ChunkCache(cache_dir, max_cache_bytes)
+    with profiled(profiler, "fingerprint", 0):
+        header_end, ranges = split_csv(path, chunk_bytes)
+        ids = _chunk_ids(path, header_end, ranges, read_kwargs)
+    if not ranges:
+        return
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(ranges))) if workers > 1 else None
+    run = pool.map if pool is not None else map
+    try:
+        if dtype is None:
+            # Per-chunk dtypes only depend on the chunk's bytes: cached too.
+            with profiled(profiler, "scan", 0):
+                found = {i: cache.load(i, "dtypes") for i in ids}
+                todo = [(i, r) for i, r in zip(ids, ranges) if found[i] is None]
+                if todo:
+                    spans = list(zip(*[r for _, r in todo]))
+                    n = len(todo)
+                    for (i, _), d in zip(todo, run(_range_dtypes, [path] * n, [header_end] * n, *spans,
+                                                   [read_kwargs] * n)):
+                        found[i] = d
+                        cache.store(i, "dtypes", d)
+                seen: dict = {}
+                for i in ids:
+                    for c, d in found[i].items():
+                        seen.setdefault(c, set()).add(d)
+                dtype = {c: _common_dtype(ds) for c, ds in seen.items() if len(ds) > 1}
+        with profiled(profiler, "date_inference", 0):
+            date_formats = infer_stream_date_formats(path, dtype, date_formats, headers, rules, **read_kwargs)
+        if stats is not None:
+            stats["date_formats"] = date_formats
+
+        config = _digest(cleaner_fingerprint(), sorted((c, str(d)) for c, d in dtype.items()),
+                         sorted(date_formats.items()), categorical, headers, rules, sorted(read_kwargs.items()))
+        keys = [_digest(config, i) for i in ids]
+        facts: list = [None] * len(keys)
+        for n, key in enumerate(keys):
+            if cache.has(key, "chunk", "facts"):
+                facts[n] = cache.load(key, "facts")
+                cache.touch(key, "chunk")
+        fresh = [n for n, f in enumerate(facts) if f is None]
+        with tempfile.TemporaryDirectory(prefix="csv-cleaner-", dir=cache.dir) as tmp:
+            if fresh:
+                m = len(fresh)
+                spans = list(zip(*[ranges[n] for n in fresh]))
+                spills = [Path(tmp) / f"{n:08d}.pkl" for n in fresh]
+                allocations = None if profiler is None else profiler.allocations
+                results = run(_clean_range, [path] * m, [header_end] * m, *spans, [dtype] * m,
+                              [date_formats] * m, [categorical] * m, spills, [read_kwargs] * m,
+                              [allocations] * m, [headers] * m, [rules] * m)
+                for n, spill, f in zip(fresh, spills, results):
+                    if profiler is not None:
+                        profiler.merge(f.pop("profile"))
+                    cache.adopt(keys[n], "chunk", spill)
+                    cache.store(keys[n], "facts", f)
+                    facts[n] = f
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if stats is not None:
+        stats.update(_input_stats(facts), chunks=len(keys), chunks_reused=len(keys) - len(fresh))
+    with tempfile.TemporaryDirectory(prefix="csv-cleaner-") as work:
+        spills = [cache.path(k, "chunk") for k in keys]
+        yield from _replay_spills(spills, facts, dedupe_memory, stats, profiler, keep_spills=True, work_dir=work,
+                                  quality=quality)
+    cache.evict()
@@ -0,0 +1,56 @@
+"""Opening CSV inputs: compressed files as streams, plain files memory-mapped.
+
+Inputs ending in ``.gz``, ``.bz2``, ``.xz`` or ``.zst`` are decompressed as a
+stream by pandas (and by :func:`open_input` for encoding sniffing), so only
+the parser's buffers are ever in memory, never the whole decompressed file.
+Plain files are read with ``memory_map=True``: the parser reads the page
+cache directly instead of copying the file through read() buffers.
+
+Features that seek to byte offsets (``--workers`` partitions, the
+incremental chunk cache, mid-file schema samples) need plain files: see
+:func:`is_compressed`. ``.zst`` needs ``zstandard``:
+``pip install "csv-cleaner-pro[zstd]"``.
+"""
+from __future__ import annotations
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import BinaryIO
+
+INPUT_COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def input_compression(path) -> str | None:
+    """Codec implied by the file name (``None`` for plain files)."""
+    return INPUT_COMPRESSIONS.get(Path(path).suffix.lower())
+
+
+def is_compressed(path) -> bool:
+    return input_compression(path) is not None
+
+
+def require_zstandard(feature: str = ".zst input"):
+    """Import zstandard or raise ImportError with the install hint."""
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(f'{feature} needs zstandard: pip install "csv-cleaner-pro[zstd]"') from e
+    return zstandard
+
+
+def open_input(path) -> BinaryIO:
+    """Binary stream of the file's (decompressed) bytes."""
+    codec = input_compression(path)
+    if codec == "zstd":
+        return require_zstandard().open(path, "rb")
+    opener = {None: open, "gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}[codec]
+    return opener(path, "rb")
+
+
+def input_read_kwargs(path) -> dict:
+    """Extra ``pd.read_csv`` arguments for reading ``path`` by name."""
+    codec = input_compression(path)
+    if codec == "zstd":
+        require_zstandard()
+    return {"compression": codec} if codec else {"memory_map": True}
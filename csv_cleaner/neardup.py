@@ -0,0 +1,322 @@
+"""Near-duplicate rows: records that differ only in case, spacing, punctuation or a typo.
+
+Exact duplicates are already removed by the dedupe stage. This optional stage
+clusters rows whose *key columns* nearly match, e.g. ``Claire Gute`` /
+``claire  gute`` or ``T-Shirt`` / ``T Shirt`` on the same ``order_date``,
+without comparing every pair of rows:
+
+1. Text keys are normalized (case-folded, punctuation dropped, whitespace
+   collapsed) on their distinct values only. Other keys (dates, numbers)
+   must match exactly and act as blocks. Rows equal after normalization
+   form one candidate key; the remaining stages run on those keys, not rows.
+2. Each key's text is cut into character 3-grams and summarized by a
+   MinHash signature. Signatures are split into bands (LSH): keys sharing a
+   band and a block land in one bucket. Within a bucket each key is compared
+   with its ``window`` predecessors only (sorted neighborhood), so large
+   buckets stay linear.
+3. Candidate pairs are verified by the exact Jaccard similarity of their
+   3-grams (at least ``threshold``) and merged into clusters (union-find).
+
+A row whose text keys are all missing is never clustered. Clusters are
+identified by the position of their first row; :func:`near_duplicates`
+labels rows with it or keeps only that first row. The stages are reported
+to a :class:`csv_cleaner.profile.StageProfiler` as ``near_dup_*``.
+"""
+from __future__ import annotations
+import re
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+from .options import DEFAULT_NEAR_DUP_THRESHOLD as DEFAULT_THRESHOLD, NEAR_DUP_ACTIONS
+from .profile import profiled
+
+CLUSTER_COLUMN = "near_dup_cluster"
+DEFAULT_WINDOW = 8
+# 8 bands of 4 rows: a pair at Jaccard 0.8 shares a band with probability ~0.985.
+_BANDS, _ROWS = 8, 4
+_PRIME = (1 << 31) - 1
+_FNV = 0x100000001B3
+# 3-grams hashed (or looked up) per batch: bounds the work arrays.
+_GRAM_BATCH = 1 << 18
+_PUNCT = re.compile(r"[^\w\s]+")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_key(s: pd.Series) -> pd.Series:
+    """Case-fold, drop punctuation and collapse whitespace (``" Claire  GUTE."`` -> ``"claire gute"``)."""
+    s = s.str.casefold().str.replace(_PUNCT, "", regex=True)
+    return s.str.replace(_SPACE, " ", regex=True).str.strip()
+
+
+def _is_text_key(s: pd.Series) -> bool:
+    d = s.dtype
+    return not (is_numeric_dtype(d) or is_bool_dtype(d) or is_datetime64_any_dtype(d))
+
+
+def _text_codes(s: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """``(codes, normalized values)``: equal codes normalize equal; missing/empty values get -1."""
+    codes, uniques = pd.factorize(s)
+    norm = normalize_key(pd.Series(np.asarray(uniques, dtype=object)).astype(str))
+    norm_codes, norm_uniques = pd.factorize(norm)
+    lookup = np.append(norm_codes, -1)
+    out = lookup[codes]
+    empty = np.flatnonzero(np.asarray(norm_uniques, dtype=object) == "")
+    if len(empty):
+        out[np.isin(out, empty)] = -1
+    return out, np.asarray(norm_uniques, dtype=object)
+
+
+def _group_ids(arrays: list) -> np.ndarray:
+    """Id per row of the tuple of ``arrays`` (integer codes), numbered in order of appearance."""
+    if not arrays:
+        return np.zeros(0, dtype=np.int64)
+    frame = pd.DataFrame({i: a for i, a in enumerate(arrays)})
+    return frame.groupby(list(frame.columns), sort=False).ngroup().to_numpy()
+
+
+def _sorted_unique(a: np.ndarray) -> np.ndarray:
+    # Sort-based; much faster than np.unique's hash table on millions of int64.
+    a = np.sort(a)
+    return a[np.concatenate([[True], a[1:] != a[:-1]])] if len(a) else a
+
+
+def _grams(texts: list) -> tuple[np.ndarray, np.ndarray]:
+    """Byte 3-grams of each text (spaces removed, ends padded) as ``(grams, per-text offsets)``."""
+    encoded = [("\x02" + t.replace(" ", "") + "\x03").encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    flat = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+    owner = np.repeat(np.arange(len(encoded)), lengths)
+    grams = (flat[:-2] << 16) | (flat[1:-1] << 8) | flat[2:]
+    keep = owner[:-2] == owner[2:]
+    counts = np.bincount(owner[:-2][keep], minlength=len(encoded))
+    return grams[keep], np.concatenate([[0], np.cumsum(counts)])
+
+
+def _minhash(grams: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """``(texts, bands * rows)`` MinHash signatures; every text must have at least one gram."""
+    rng = np.random.default_rng(0x5EED)
+    k = _BANDS * _ROWS
+    a = rng.integers(1, _PRIME, size=(k, 1), dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=(k, 1), dtype=np.uint64)
+    sig = np.empty((len(offsets) - 1, k), dtype=np.uint32)
+    first = 0
+    while first < len(offsets) - 1:
+        # Whole texts per batch, so each reduceat segment is complete.
+        last = int(np.searchsorted(offsets, offsets[first] + _GRAM_BATCH, side="right")) - 1
+        last = max(last, first + 1)
+        lo, hi = offsets[first], offsets[last]
+        vals = (a * grams[lo:hi].astype(np.uint64)[None, :] + b) % _PRIME
+        sig[first:last] = np.minimum.reduceat(vals, offsets[first:last] - lo, axis=1).T
+        first = last
+    return sig
+
+
+def _candidate_pairs(sig: np.ndarray, block: np.ndarray, window: int) -> np.ndarray:
+    """Distinct ``(i, j)`` pairs sharing a band bucket within ``window`` places of each other."""
+    pairs = []
+    for band in range(_BANDS):
+        # FNV-style mix of the block and the band's rows; a collision only adds a pair to verify.
+        h = block.astype(np.uint64) * np.uint64(_FNV)
+        for r in range(_ROWS):
+            h = (h ^ sig[:, band * _ROWS + r].astype(np.uint64)) * np.uint64(_FNV)
+        order = np.argsort(h, kind="stable")
+        h = h[order]
+        for w in range(1, min(window, len(order) - 1) + 1):
+            same = np.flatnonzero(h[w:] == h[:-w])
+            if len(same):
+                pairs.append(np.stack([order[same], order[same + w]], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1)
+    flat = _sorted_unique(pairs[:, 0] * len(sig) + pairs[:, 1])
+    return np.stack([flat // len(sig), flat % len(sig)], axis=1)
+
+
+def _verify(pairs: np.ndarray, grams: np.ndarray, offsets: np.ndarray, threshold: float) -> np.ndarray:
+    """Mask of ``pairs`` whose distinct 3-grams have a Jaccard similarity of at least ``threshold``."""
+    owner = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+    # Sorted (text, gram) keys: each text's distinct grams are one contiguous run.
+    keys = _sorted_unique((owner << 24) | grams.astype(np.int64))
+    sizes = np.bincount(keys >> 24, minlength=len(offsets) - 1)
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    i, j = pairs[:, 0], pairs[:, 1]
+    small, large = np.minimum(sizes[i], sizes[j]), np.maximum(sizes[i], sizes[j])
+    # Jaccard is at most |small| / |large|.
+    ok = small >= threshold * large
+    cand = np.flatnonzero(ok)
+    ok[:] = False
+    probes = np.cumsum(sizes[i[cand]])
+    pos = 0
+    while pos < len(cand):
+        # Batches of about _GRAM_BATCH probes: each gram of i is looked up among j's.
+        done = probes[pos - 1] if pos else 0
+        end = max(pos + 1, int(np.searchsorted(probes, done + _GRAM_BATCH, side="right")))
+        batch = cand[pos:end]
+        pos = end
+        bi, bj = i[batch], j[batch]
+        lens = sizes[bi]
+        which = np.repeat(np.arange(len(batch)), lens)
+        idx = np.arange(lens.sum()) - np.repeat(np.cumsum(lens) - lens, lens) + starts[bi][which]
+        probe = (bj[which] << 24) | (keys[idx] & 0xFFFFFF)
+        at = np.minimum(np.searchsorted(keys, probe), len(keys) - 1)
+        inter = np.bincount(which, weights=keys[at] == probe, minlength=len(batch))
+        ok[batch] = inter >= threshold * (lens + sizes[bj] - inter)
+    return ok
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def near_duplicate_clusters(df: pd.DataFrame, keys, threshold: float = DEFAULT_THRESHOLD,
+                            window: int = DEFAULT_WINDOW, profiler=None, stats: dict | None = None) -> np.ndarray:
+    """Cluster id per row of ``df`` (the position of the cluster's first row; see the module docstring).
+
+    ``keys`` are the columns compared. ``stats`` (a dict) receives
+    ``clusters`` and ``clustered_rows`` (clusters of two or more rows and
+    the rows in them), ``candidate_pairs`` and ``matched_pairs``.
+    """
+    keys = list(keys)
+    missing = [k for k in keys if k not in df.columns]
+    if missing:
+        raise KeyError(f"cannot match on {', '.join(map(repr, missing))}: no such column")
+    if not 0 < threshold <= 1:
+        raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+    n = len(df)
+    with profiled(profiler, "near_dup_keys", n) as rec:
+        text_keys = [k for k in keys if _is_text_key(df[k])]
+        exact = [pd.factorize(df[k])[0] for k in keys if k not in text_keys]
+        text = [_text_codes(df[k]) for k in text_keys]
+        key_id = _group_ids(exact + [codes for codes, _ in text]) if n else np.zeros(0, dtype=np.int64)
+        m = int(key_id.max()) + 1 if n else 0
+        first_row = np.full(m, n, dtype=np.int64)
+        np.minimum.at(first_row, key_id, np.arange(n))
+        block = _group_ids([a[first_row] for a in exact]) if exact else np.zeros(m, dtype=np.int64)
+        has_text = np.zeros(m, dtype=bool)
+        strings = [""] * m
+        if text:
+            rep_codes = [codes[first_row] for codes, _ in text]
+            has_text = np.any(np.stack(rep_codes) >= 0, axis=0)
+            strings = ["\x1f".join(values[c] if c >= 0 else "" for c, (_, values) in zip(row, text))
+                       for row in zip(*rep_codes)]
+        rec["rows_out"] = m
+    parent = np.arange(m)
+    pairs = np.empty((0, 2), dtype=np.int64)
+    matched = 0
+    lsh = np.flatnonzero(has_text)
+    if len(lsh) > 1:
+        with profiled(profiler, "near_dup_minhash", len(lsh)):
+            grams, offsets = _grams([strings[i] for i in lsh])
+            sig = _minhash(grams, offsets)
+        with profiled(profiler, "near_dup_candidates", len(lsh)) as rec:
+            pairs = _candidate_pairs(sig, block[lsh], window)
+            rec["rows_out"] = len(pairs)
+        with profiled(profiler, "near_dup_verify", len(pairs)) as rec:
+            matches = pairs[_verify(pairs, grams, offsets, threshold)]
+            matched = len(matches)
+            for i, j in lsh[matches].tolist():
+                ri, rj = _find(parent, i), _find(parent, j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+            rec["rows_out"] = matched
+    roots = parent
+    while True:
+        # Pointer jumping: every root is the smallest key of its cluster.
+        up = roots[roots]
+        if np.array_equal(up, roots):
+            break
+        roots = up
+    # A row with no text to compare stays on its own.
+    row_root = np.where(has_text[key_id] | (not text), roots[key_id], m + np.arange(n)) if n else key_id
+    first = np.full(m + n, n, dtype=np.int64)
+    np.minimum.at(first, row_root, np.arange(n))
+    clusters = first[row_root]
+    if stats is not None:
+        sizes = np.bincount(clusters, minlength=n) if n else np.zeros(0, dtype=np.int64)
+        stats.update(clusters=int((sizes > 1).sum()), clustered_rows=int(sizes[sizes > 1].sum()),
+                     candidate_pairs=len(pairs), matched_pairs=matched)
+    return clusters
+
+
+def _apply(df: pd.DataFrame, clusters: np.ndarray, start: int, action: str) -> pd.DataFrame:
+    attrs = dict(df.attrs)
+    if action == "label":
+        df = df.assign(**{CLUSTER_COLUMN: clusters})
+    else:
+        df = df[clusters == np.arange(start, start + len(df))]
+    df.attrs = attrs
+    return df
+
+
+def near_duplicates(df: pd.DataFrame, keys, action: str = "label", threshold: float = DEFAULT_THRESHOLD,
+                    window: int = DEFAULT_WINDOW, profiler=None, stats: dict | None = None) -> pd.DataFrame:
+    """Label near-duplicate rows with ``near_dup_cluster`` or keep the first row of each cluster (``collapse``).
+
+    ``threshold``, ``window``, ``profiler`` and ``stats`` are as for
+    :func:`near_duplicate_clusters`; ``stats`` also receives ``rows_removed``.
+    """
+    if action not in NEAR_DUP_ACTIONS:
+        raise ValueError(f"action must be one of {NEAR_DUP_ACTIONS}, got {action!r}")
+    clusters = near_duplicate_clusters(df, keys, threshold, window, profiler, stats)
+    with profiled(profiler, "near_dup_apply", len(df)) as rec:
+        out = _apply(df, clusters, 0, action)
+        if action == "collapse":
+            out = out.reset_index(drop=True)
+        rec["rows_out"] = len(out)
+    if stats is not None:
+        stats["rows_removed"] = len(df) - len(out)
+    return out
+
+
+def near_duplicates_stream(chunks: Iterable[pd.DataFrame], keys, action: str = "label",
+                           threshold: float = DEFAULT_THRESHOLD, window: int = DEFAULT_WINDOW,
+                           profiler=None, stats: dict | None = None, spill_dir=None) -> Iterator[pd.DataFrame]:
+    """:func:`near_duplicates` over a chunked stream, yielding the chunks in order.
+
+    Clusters span the whole stream, so every chunk is read (and spilled to
+    disk) before the first is returned; only the key columns are held in
+    memory. Missing key columns raise ``KeyError`` here, before any output.
+    """
+    if action not in NEAR_DUP_ACTIONS:
+        raise ValueError(f"action must be one of {NEAR_DUP_ACTIONS}, got {action!r}")
+    keys = list(keys)
+    tmp = tempfile.TemporaryDirectory(prefix="csv-cleaner-", dir=spill_dir)
+    try:
+        spills, parts = [], []
+        for i, chunk in enumerate(chunks):
+            missing = [k for k in keys if k not in chunk.columns]
+            if missing:
+                raise KeyError(f"cannot match on {', '.join(map(repr, missing))}: no such column")
+            spill = Path(tmp.name) / f"{i:08d}.pkl"
+            chunk.to_pickle(spill)
+            spills.append((spill, len(chunk)))
+            parts.append(chunk[keys])
+        frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=keys)
+        del parts
+        clusters = near_duplicate_clusters(frame, keys, threshold, window, profiler, stats)
+    except BaseException:
+        tmp.cleanup()
+        raise
+    return _replay(tmp, spills, clusters, action, profiler, stats)
+
+
+def _replay(tmp, spills, clusters, action, profiler, stats) -> Iterator[pd.DataFrame]:
+    try:
+        start = removed = 0
+        for spill, rows in spills:
+            with profiled(profiler, "near_dup_apply", rows) as rec:
+                chunk = _apply(pd.read_pickle(spill), clusters[start:start + rows], start, action)
+                rec["rows_out"] = len(chunk)
+            start += rows
+            removed += rows - len(chunk)
+            yield chunk
+        if stats is not None:
+            stats["rows_removed"] = removed
+    finally:
+        tmp.cleanup()
@@ -0,0 +1,147 @@
+"""Vectorized parsing of messy numeric text (prices, amounts, quantities).
+
+Handles currency symbols and codes, thousands separators, decimal commas
+(``1.234,50``), accounting negatives (``(12.00)``) and leading/trailing
+minus signs; a minus or parenthesis anywhere else (``12-34``, ``2024-01-05``)
+makes the value a failure. Columns pandas already read as numbers are
+returned untouched.
+
+Distinct values are decoded into a NumPy code-point matrix (one row per
+value) and classified with array operations; the digits are folded into an
+integer mantissa and scaled by a power of ten, which rounds exactly as
+``float()`` would. Only values with more than 15 digits are parsed one by one.
+
+Separator rules, applied per value so chunks of one file always agree:
+
+* both ``.`` and ``,`` present: the last one is the decimal separator;
+* only the preferred decimal (``decimal``, default ``.``): a single
+  occurrence is decimal, several are thousands separators;
+* only the other one: a single occurrence followed by other than three
+  digits is decimal (``1,5``), otherwise thousands (``1,234``).
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# Values treated as missing rather than as parse failures.
+NULL_TOKENS = frozenset(("", "nan", "NaN", "NAN", "None", "none", "null", "NULL", "NA", "N/A", "n/a", "<NA>", "-", "--"))
+# Rows per code-point matrix; bounds the temporaries to a few MB per column.
+_BLOCK_ROWS = 1 << 16
+# Longer values are rare garbage; they get a block of their own width.
+_MAX_WIDTH = 40
+# mantissa / 10**k is correctly rounded (as strtod) while both are exact doubles.
+_MAX_DIGITS = 15
+_POW10 = 10 ** np.arange(_MAX_DIGITS + 1, dtype=np.int64)
+
+_DIGIT_0, _DIGIT_9 = ord("0"), ord("9")
+_DOT, _COMMA, _MINUS, _OPEN, _CLOSE = ord("."), ord(","), ord("-"), ord("("), ord(")")
+_UNICODE_MINUS = ord("\u2212")
+
+
+def _last_index(mask: np.ndarray) -> np.ndarray:
+    w = mask.shape[1]
+    return np.where(mask.any(axis=1), w - 1 - mask[:, ::-1].argmax(axis=1), -1)
+
+
+def _parse_block(values: np.ndarray, decimal: str) -> tuple[np.ndarray, np.ndarray]:
+    """Parse a 1-D ``<U`` array; returns ``(float64 values, has_decimal_separator)``."""
+    n, w = len(values), values.dtype.itemsize // 4
+    if n == 0 or w == 0:
+        return np.full(n, np.nan), np.zeros(n, dtype=bool)
+    m = np.ascontiguousarray(values).view(np.uint32).reshape(n, w)
+    digit = (m >= _DIGIT_0) & (m <= _DIGIT_9)
+    next_digit = np.zeros_like(digit)
+    next_digit[:, :-1] = digit[:, 1:]
+    # A separator only counts when a digit follows it ("Rs. 12" has no decimal).
+    dots = (m == _DOT) & next_digit
+    commas = (m == _COMMA) & next_digit
+    n_dot, n_comma = dots.sum(axis=1), commas.sum(axis=1)
+    last_dot, last_comma = _last_index(dots), _last_index(commas)
+    rows = np.arange(n)
+    # after[i, j]: digits strictly right of position j.
+    cum = digit.cumsum(axis=1, dtype=np.int16)
+    total = cum[:, -1].astype(np.int64)
+    after = total[:, None] - cum
+
+    if decimal == ",":
+        pref_n, pref_last, other_n, other_last = n_comma, last_comma, n_dot, last_dot
+    else:
+        pref_n, pref_last, other_n, other_last = n_dot, last_dot, n_comma, last_comma
+    other_after = after[rows, np.maximum(other_last, 0)]
+    both = (pref_n > 0) & (other_n > 0)
+    dec_pos = np.where(both, np.maximum(pref_last, other_last), -1)
+    dec_pos = np.where(~both & (pref_n == 1), pref_last, dec_pos)
+    dec_pos = np.where(~both & (pref_n == 0) & (other_n == 1) & (other_after != 3), other_last, dec_pos)
+    has_dec = dec_pos >= 0
+    # The decimal separator may appear only once.
+    dec_is_dot = has_dec & (m[rows, np.maximum(dec_pos, 0)] == _DOT)
+    bad = has_dec & (np.where(dec_is_dot, n_dot, n_comma) > 1)
+    scale = np.where(has_dec, after[rows, np.maximum(dec_pos, 0)], 0)
+
+    # A sign is one leading or trailing minus, or parentheses around the whole
+    # number; a minus or parenthesis among the digits ("12-34", "2024-01-05") fails.
+    minus = (m == _MINUS) | (m == _UNICODE_MINUS)
+    opens, closes = m == _OPEN, m == _CLOSE
+    pos = np.arange(w)
+    before = pos < digit.argmax(axis=1)[:, None]
+    beyond = pos > _last_index(digit)[:, None]
+    n_minus, n_open, n_close = minus.sum(axis=1), opens.sum(axis=1), closes.sum(axis=1)
+    outside = ~((minus | opens | closes) & ~(before | beyond)).any(axis=1)
+    wrapped = (n_open == 1) & (n_close == 1) & (opens & before).any(axis=1) & (closes & beyond).any(axis=1)
+    unwrapped = (n_open == 0) & (n_close == 0)
+    signed_ok = outside & (((n_minus == 0) & (unwrapped | wrapped)) | ((n_minus == 1) & unwrapped))
+
+    ok = (total > 0) & ~bad & signed_ok
+    exact = ok & (total <= _MAX_DIGITS)
+    weights = _POW10[np.minimum(after, _MAX_DIGITS)]
+    mantissa = np.where(digit, (m.astype(np.int64) - _DIGIT_0) * weights, 0).sum(axis=1)
+    parsed = np.full(n, np.nan)
+    parsed[exact] = mantissa[exact] / _POW10[scale[exact]].astype(np.float64)
+    for i in np.flatnonzero(ok & ~exact):
+        # Too many digits for the exact fast path: rebuild the string and let float() round.
+        row = m[i]
+        text = "".join(chr(c) for c in row[digit[i]])
+        if has_dec[i]:
+            text = text[:len(text) - scale[i]] + "." + text[len(text) - scale[i]:]
+        parsed[i] = float(text)
+    parsed[ok & ((n_minus == 1) | wrapped)] *= -1
+    parsed += 0.0  # "-0" -> 0.0, as pd.to_numeric gives
+    return parsed, has_dec & ok
+
+
+def _parse_distinct(text: np.ndarray, decimal: str) -> tuple[np.ndarray, np.ndarray]:
+    parsed = np.full(len(text), np.nan)
+    has_dec = np.zeros(len(text), dtype=bool)
+    lengths = np.fromiter(map(len, text), dtype=np.int64, count=len(text))
+    long_ = lengths > _MAX_WIDTH
+    for group in (np.flatnonzero(~long_), np.flatnonzero(long_)):
+        if not len(group):
+            continue
+        values = np.array(text[group].tolist(), dtype=f"<U{max(1, lengths[group].max())}")
+        for lo in range(0, len(group), _BLOCK_ROWS):
+            idx = group[lo:lo + _BLOCK_ROWS]
+            parsed[idx], has_dec[idx] = _parse_block(values[lo:lo + _BLOCK_ROWS], decimal)
+    return parsed, has_dec
+
+
+def parse_numeric(s: pd.Series, decimal: str = ".") -> tuple[pd.Series, int]:
+    """Parse ``s`` to numbers; returns ``(values, failures)``.
+
+    ``failures`` counts non-missing values that could not be parsed. The result
+    is int64 when every value is a whole number written without a decimal
+    separator and nothing is missing (as ``pd.to_numeric`` would give).
+    """
+    if is_numeric_dtype(s.dtype) and not is_bool_dtype(s.dtype):
+        return s, 0
+    codes, uniques = pd.factorize(s)
+    text = pd.Series(np.asarray(uniques, dtype=object)).astype(str).to_numpy()
+    parsed, has_dec = _parse_distinct(text, decimal)
+    failed = np.isnan(parsed)
+    failed[failed] = [v.strip() not in NULL_TOKENS for v in text[failed]]
+    failures = int(np.bincount(codes[codes >= 0], minlength=len(text))[failed].sum())
+
+    values = np.append(parsed, np.nan)[codes]  # code -1 (missing) picks the NaN
+    if len(values) and not np.isnan(values).any() and not has_dec.any() and np.all(np.abs(parsed) < 2 ** 53):
+        return pd.Series(values.astype(np.int64), index=s.index, name=s.name), failures
+    return pd.Series(values, index=s.index, name=s.name), failures
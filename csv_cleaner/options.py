@@ -0,0 +1,35 @@
+"""Option values the command line validates before any data is touched.
+
+This module imports only the standard library: ``csv-cleaner --help``,
+argument errors and missing-file exits never load pandas (or pyarrow, which
+pandas loads when installed). The modules that use these values re-export
+them (``csv_cleaner.output.OUTPUT_FORMATS`` etc.).
+"""
+from __future__ import annotations
+from pathlib import Path
+
+OUTPUT_FORMATS = ("csv", "parquet", "feather")
+FORMAT_NAMES = {"csv": "CSV", "parquet": "Parquet", "feather": "Feather"}
+# Accepted ``compression`` values per format; the first columnar one is the default.
+COMPRESSIONS = {
+    "csv": ("gzip", "bz2", "xz"),
+    "parquet": ("snappy", "zstd", "gzip", "brotli", "lz4", "none"),
+    "feather": ("lz4", "zstd", "uncompressed"),
+}
+ENGINES = ("pandas", "arrow")
+SKIP_MODES = ("mtime", "hash", "off")
+EXECUTORS = ("process", "thread")
+MANIFEST_NAME = "manifest.json"
+DEFAULT_SORT_MEMORY = 256 * 1024 * 1024
+NEAR_DUP_ACTIONS = ("label", "collapse")
+DEFAULT_NEAR_DUP_THRESHOLD = 0.8
+_EXTENSIONS = {".parquet": "parquet", ".pq": "parquet", ".feather": "feather", ".arrow": "feather"}
+
+
+def output_format(path, fmt: str | None = None) -> str:
+    """``fmt`` if given, else the format implied by ``path``'s extension (CSV by default)."""
+    if fmt is not None:
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"output format must be one of {OUTPUT_FORMATS}, got {fmt!r}")
+        return fmt
+    return _EXTENSIONS.get(Path(path).suffix.lower(), "csv")
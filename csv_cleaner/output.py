@@ -0,0 +1,105 @@
+"""Writers (and a reader) for cleaned data: CSV, Parquet and Feather.
+
+The format follows the output file's extension unless given explicitly.
+Parquet and Feather keep the parsed ``order_date`` datetimes and numeric
+dtypes, so downstream jobs (and the Streamlit preview) load the result
+without parsing it again. Streams are written incrementally: one Parquet
+row group or Feather record batch per cleaned chunk.
+
+Parquet and Feather need pyarrow: ``pip install "csv-cleaner-pro[arrow]"``.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable
+import pandas as pd
+from pandas.api.types import infer_dtype
+from .arrow import require_pyarrow, write_csv_arrow
+from .options import COMPRESSIONS, FORMAT_NAMES, OUTPUT_FORMATS, output_format
+from .stream import _CSV_OPENERS, write_csv_stream
+
+_CSV_SUFFIXES = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+
+def _compression(path, fmt: str, compression: str | None) -> str | None:
+    if compression is None:
+        if fmt == "csv":
+            return _CSV_SUFFIXES.get(Path(path).suffix.lower())
+        return COMPRESSIONS[fmt][0]
+    if compression not in COMPRESSIONS[fmt]:
+        raise ValueError(f"{fmt} compression must be one of {COMPRESSIONS[fmt]}, got {compression!r}")
+    return None if compression in ("none", "uncompressed") else compression
+
+
+def _arrow_ready(df: pd.DataFrame) -> pd.DataFrame:
+    # Arrow needs one type per column: text columns holding stray non-strings
+    # (numbers the cleaner left alone) are written as their str().
+    mixed = [c for c in df.columns[df.dtypes == object] if infer_dtype(df[c], skipna=True) not in ("string", "empty")]
+    if not mixed:
+        return df
+    return df.assign(**{c: df[c].where(df[c].isna(), df[c].astype(str)) for c in mixed})
+
+
+def write_frame(df: pd.DataFrame, out_path, fmt: str | None = None, compression: str | None = None,
+                engine: str = "pandas") -> int:
+    """Write a cleaned frame; returns the number of rows written.
+
+    ``engine="arrow"`` writes CSV with Arrow's writer (see :mod:`csv_cleaner.arrow`).
+    """
+    fmt = output_format(out_path, fmt)
+    compression = _compression(out_path, fmt, compression)
+    if fmt == "csv" and engine == "arrow":
+        with _CSV_OPENERS[compression](out_path, "wb") as fh:
+            write_csv_arrow(df, fh)
+    elif fmt == "csv":
+        df.to_csv(out_path, index=False, compression=compression)
+    elif fmt == "parquet":
+        require_pyarrow("Parquet output")
+        _arrow_ready(df).to_parquet(out_path, index=False, compression=compression)
+    else:
+        require_pyarrow("Feather output")
+        _arrow_ready(df).reset_index(drop=True).to_feather(out_path, compression=compression)
+    return len(df)
+
+
+def _open_writer(fmt: str, out_path, schema, compression: str | None):
+    pa, _ = require_pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(out_path, schema, compression=compression or "none")
+    return pa.ipc.new_file(out_path, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+
+
+def write_stream(chunks: Iterable[pd.DataFrame], out_path, fmt: str | None = None,
+                 compression: str | None = None) -> int:
+    """Write cleaned chunks as they arrive; returns the number of rows written."""
+    fmt = output_format(out_path, fmt)
+    compression = _compression(out_path, fmt, compression)
+    if fmt == "csv":
+        return write_csv_stream(chunks, out_path, compression=compression)
+    pa, _ = require_pyarrow(f"{FORMAT_NAMES[fmt]} output")
+    rows, schema, writer = 0, None, None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(_arrow_ready(chunk), schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = _open_writer(fmt, out_path, schema, compression)
+            writer.write_table(table)
+            rows += len(chunk)
+        if writer is None:
+            # Nothing to clean: still leave a valid (empty) file behind.
+            writer = _open_writer(fmt, out_path, pa.schema([]), compression)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def read_frame(path) -> pd.DataFrame:
+    """Load a file written by :func:`write_frame` / :func:`write_stream`."""
+    fmt = output_format(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "feather":
+        return pd.read_feather(path)
+    return pd.read_csv(path, low_memory=False)
@@ -0,0 +1,150 @@
+"""Multi-core cleaning of one CSV file over byte-range partitions.
+
+The file is split at row boundaries (newlines outside quoted fields), each
+partition is parsed and cleaned in a worker process with the same stages as
+:mod:`csv_cleaner.stream`, and the spilled results are replayed in file order
+through the shared global stages, so output matches the serial path exactly.
+"""
+from __future__ import annotations
+import io
+import mmap
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+import pandas as pd
+from .dedupe import DEFAULT_MEMORY_BUDGET
+from .encoding import ascii_compatible
+from .profile import StageProfiler, profiled
+from .stream import _clean_to_spill, _common_dtype, _input_stats, _replay_spills, infer_stream_date_formats
+
+DEFAULT_PARTITION_BYTES = 64 * 1024 * 1024
+_COUNT_BLOCK = 8 * 1024 * 1024
+
+
+def _count_quotes(mm, start: int, end: int) -> int:
+    n = 0
+    for a in range(start, end, _COUNT_BLOCK):
+        n += mm[a:min(a + _COUNT_BLOCK, end)].count(b'"')
+    return n
+
+
+def _next_row_start(mm, pos: int, in_quotes: bool) -> int:
+    """Offset just past the first newline at/after ``pos`` that is outside quotes."""
+    size = len(mm)
+    while pos < size:
+        nl = mm.find(b"\n", pos)
+        if nl == -1:
+            return size
+        in_quotes ^= bool(_count_quotes(mm, pos, nl) & 1)
+        if not in_quotes:
+            return nl + 1
+        pos = nl + 1
+    return size
+
+
+def split_csv(path, partition_bytes: int = DEFAULT_PARTITION_BYTES) -> tuple[int, list[tuple[int, int]]]:
+    """Return ``(header_end, [(start, end), ...])`` byte ranges of whole CSV rows."""
+    if os.path.getsize(path) == 0:
+        return 0, []
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        header_end = _next_row_start(mm, 0, False)
+        ranges = []
+        start = header_end
+        while start < size:
+            target = min(start + partition_bytes, size)
+            in_quotes = bool(_count_quotes(mm, start, target) & 1)
+            end = _next_row_start(mm, target, in_quotes) if target < size else size
+            ranges.append((start, end))
+            start = end
+    return header_end, ranges
+
+
+def _read_range(path, header_end: int, start: int, end: int, dtype, read_kwargs: dict) -> pd.DataFrame:
+    with open(path, "rb") as fh:
+        header = fh.read(header_end)
+        fh.seek(start)
+        body = fh.read(end - start)
+    return pd.read_csv(io.BytesIO(header + body), dtype=dtype or None, low_memory=False, **read_kwargs)
+
+
+def _range_dtypes(path, header_end, start, end, read_kwargs) -> dict:
+    return dict(_read_range(path, header_end, start, end, None, read_kwargs).dtypes)
+
+
+def _clean_range(path, header_end, start, end, dtype, date_formats, categorical, spill, read_kwargs,
+                 allocations=None, headers=None, rules=None) -> dict:
+    # allocations is None when not profiling; else the parent profiler's setting.
+    profiler = None if allocations is None else StageProfiler(allocations=allocations)
+    with profiled(profiler, "read", 0) as rec:
+        chunk = _read_range(path, header_end, start, end, dtype, read_kwargs)
+        rec["rows_in"] = rec["rows_out"] = len(chunk)
+    facts = _clean_to_spill(chunk, spill, dict(date_formats), categorical, profiler, headers, rules)
+    if profiler is not None:
+        facts["profile"] = profiler.rows()
+    return facts
+
+
+def clean_sales_parallel(
+    path,
+    workers: int | None = None,
+    partition_bytes: int = DEFAULT_PARTITION_BYTES,
+    dtype: dict | None = None,
+    date_formats: dict | None = None,
+    categorical: bool = False,
+    dedupe_memory: int = DEFAULT_MEMORY_BUDGET,
+    stats: dict | None = None,
+    profiler=None,
+    headers=None,
+    quality=None,
+    rules=None,
+    **read_kwargs,
+) -> Iterator[pd.DataFrame]:
+    """Clean a CSV file on ``workers`` processes, yielding cleaned chunks in file order.
+
+    Yields the same frames as :func:`csv_cleaner.stream.clean_sales_stream` with
+    one chunk per partition (``dtype``, ``date_formats``, ``categorical``,
+    ``dedupe_memory``, ``stats``, ``profiler``, ``headers``, ``quality`` and ``rules`` as there; worker
+    stages are summed over the workers, so their times add up to CPU rather than wall time).
+    ``read_kwargs`` must not change how rows map to lines (``skiprows``,
+    ``nrows``, ``header`` ...), and the ``encoding`` must be ASCII-compatible.
+    """
+    if not ascii_compatible(read_kwargs.get("encoding") or "utf-8"):
+        raise ValueError(f"byte-range partitions need an ASCII-compatible encoding, got {read_kwargs['encoding']!r}")
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(path)
+    partition_bytes = max(1, min(partition_bytes, -(-size // workers)))
+    header_end, ranges = split_csv(path, partition_bytes)
+    if not ranges:
+        return
+
+    n = len(ranges)
+    spans = list(zip(*ranges))
+    with tempfile.TemporaryDirectory(prefix="csv-cleaner-") as tmp:
+        spills = [Path(tmp) / f"{i:08d}.pkl" for i in range(n)]
+        with ProcessPoolExecutor(max_workers=min(workers, n)) as pool:
+            if dtype is None:
+                with profiled(profiler, "scan", 0):
+                    seen: dict = {}
+                    for dtypes in pool.map(_range_dtypes, [path] * n, [header_end] * n, *spans, [read_kwargs] * n):
+                        for c, d in dtypes.items():
+                            seen.setdefault(c, set()).add(d)
+                    dtype = {c: _common_dtype(ds) for c, ds in seen.items() if len(ds) > 1}
+            with profiled(profiler, "date_inference", 0):
+                date_formats = infer_stream_date_formats(path, dtype, date_formats, headers, rules, **read_kwargs)
+            if stats is not None:
+                stats["date_formats"] = date_formats
+            allocations = None if profiler is None else profiler.allocations
+            facts = list(pool.map(
+                _clean_range, [path] * n, [header_end] * n, *spans,
+                [dtype] * n, [date_formats] * n, [categorical] * n, spills, [read_kwargs] * n, [allocations] * n,
+                [headers] * n, [rules] * n,
+            ))
+        if profiler is not None:
+            for f in facts:
+                profiler.merge(f.pop("profile"))
+        if stats is not None:
+            stats.update(_input_stats(facts))
+        yield from _replay_spills(spills, facts, dedupe_memory, stats, profiler, quality=quality)
@@ -0,0 +1,131 @@
+"""Per-stage instrumentation of the cleaning pipeline.
+
+Pass a :class:`StageProfiler` as ``profiler=`` to
+:func:`csv_cleaner.core.clean_sales_dataframe`, the stream/parallel cleaners
+or ``scripts/clean_sales_data.clean_sales_data`` to record, per stage (and
+per column for the column stages):
+
+* ``wall_s``: wall time;
+* ``rows_in`` / ``rows_out``;
+* ``rss_delta_bytes``: change in resident memory (Linux only, else ``None``);
+* ``alloc_bytes``: with ``allocations=True``, peak bytes allocated above the
+  stage's starting point as seen by :mod:`tracemalloc` (NumPy buffers
+  included), else ``None``;
+* ``coerced``: values that were present before a parse stage and are
+  NaN/NaT after it.
+
+Repeated stages (one per chunk in the stream engine) are summed into one
+record. ``callback`` is called with each finished stage's own measurements.
+Tracing allocations makes stages that build many Python objects (CSV
+writing, row hashing) several times slower, so it is off by default.
+"""
+from __future__ import annotations
+import contextlib
+import os
+import time
+import tracemalloc
+from typing import Callable
+
+# Fields summed when a stage runs more than once.
+_SUMMED = ("calls", "wall_s", "rows_in", "rows_out", "rss_delta_bytes", "coerced")
+
+
+def _rss() -> int | None:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class StageProfiler:
+    """Collects per-stage metrics (see the module docstring)."""
+
+    def __init__(self, callback: Callable[[dict], None] | None = None, allocations: bool = False):
+        self.callback = callback
+        self.allocations = allocations
+        self.records: dict = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows: int, column: str | None = None):
+        """Time the block; it may set ``rows_out`` and ``coerced`` on the yielded dict."""
+        rec = {"stage": name, "column": column, "calls": 1, "rows_in": rows}
+        tracing = self.allocations
+        started = tracing and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        if tracing:
+            tracemalloc.reset_peak()
+            alloc_start = tracemalloc.get_traced_memory()[0]
+        rss = _rss()
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["wall_s"] = time.perf_counter() - t0
+            rec.setdefault("rows_out", rows)
+            rec.setdefault("coerced", 0)
+            after = _rss()
+            rec["rss_delta_bytes"] = None if rss is None or after is None else after - rss
+            rec["alloc_bytes"] = tracemalloc.get_traced_memory()[1] - alloc_start if tracing else None
+            if started:
+                tracemalloc.stop()
+            self.add(rec)
+            if self.callback is not None:
+                self.callback(dict(rec))
+
+    def add(self, rec: dict) -> None:
+        """Fold a finished stage record into the totals."""
+        key = (rec["stage"], rec["column"])
+        total = self.records.get(key)
+        if total is None:
+            self.records[key] = dict(rec)
+            return
+        for f in _SUMMED:
+            if total.get(f) is not None and rec.get(f) is not None:
+                total[f] += rec[f]
+        if rec.get("alloc_bytes") is not None:
+            total["alloc_bytes"] = max(total.get("alloc_bytes") or 0, rec["alloc_bytes"])
+
+    def merge(self, records) -> None:
+        """Add records collected by another profiler (e.g. in a worker process)."""
+        for rec in records:
+            self.add(rec)
+
+    def rows(self) -> list:
+        """Stage records in first-run order."""
+        return [dict(r) for r in self.records.values()]
+
+    def to_dict(self) -> dict:
+        rows = self.rows()
+        return {"total_s": sum(r["wall_s"] for r in rows), "stages": rows}
+
+    def report(self) -> str:
+        """Plain-text table of the stages in run order, with each one's share of the time."""
+        rows = self.rows()
+        total = sum(r["wall_s"] for r in rows) or 1.0
+        lines = [f"{'stage':<28}{'time':>9}{'share':>7}{'rows in':>11}{'rows out':>11}"
+                 f"{'mem delta':>11}{'alloc':>11}{'coerced':>9}"]
+        for r in rows:
+            name = r["stage"] if r["column"] is None else f"{r['stage']}:{r['column']}"
+            lines.append(
+                f"{name[:27]:<28}{r['wall_s']:>8.3f}s{r['wall_s'] / total:>7.0%}{r['rows_in']:>11}{r['rows_out']:>11}"
+                f"{_mb(r['rss_delta_bytes']):>11}{_mb(r['alloc_bytes']):>11}{r['coerced']:>9}"
+            )
+        return "\n".join(lines)
+
+
+def _mb(n) -> str:
+    return "-" if n is None else f"{n / 2**20:.1f}MB"
+
+
+def profiled(profiler: StageProfiler | None, name: str, rows: int, column: str | None = None):
+    """``profiler.stage(...)``, or a no-op context yielding a throwaway dict when ``profiler`` is None."""
+    if profiler is None:
+        return contextlib.nullcontext({})
+    return profiler.stage(name, rows, column)
+
+
+def coerced(before, after) -> int:
+    """Values present in ``before`` that are missing in ``after``."""
+    return int((before.notna().to_numpy() & after.isna().to_numpy()).sum())
@@ -0,0 +1,167 @@
+"""Data-quality profile of the cleaned data, collected while it is cleaned.
+
+Pass a :class:`QualityProfile` as ``quality=`` to
+:func:`csv_cleaner.core.clean_sales_dataframe`, the stream/parallel/incremental
+cleaners or ``scripts/clean_sales_data``. Chunked engines fold in each output
+chunk as it is produced, so the profile costs no extra pass over the file.
+Per output column it holds:
+
+* ``nulls`` and ``null_share``;
+* ``coerced``: values present before a parse stage and missing after it
+  (counted on the input rows, before de-duplication);
+* ``min`` / ``max`` (numbers and dates) and ``mean`` (numbers);
+* ``distinct``: a :class:`HyperLogLog` estimate of distinct non-null values
+  (about 1.6% standard error), identical however the data was chunked.
+
+``sales_formula`` counts, over every input row with all three values present,
+the rows where the source ``sales`` differs from ``quantity * unit_price`` by
+more than ``FORMULA_TOLERANCE``. It is checked in the sales stage, before
+``sales`` is recomputed or filled (:func:`sales_formula`), on the input rows
+(before de-duplication) like ``coerced``.
+"""
+from __future__ import annotations
+import math
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+
+DEFAULT_PRECISION = 12
+# Half a cent: rounding in the source data is not a mismatch.
+FORMULA_TOLERANCE = 0.005
+
+
+def _bit_length(x: np.ndarray) -> np.ndarray:
+    n = np.zeros(x.shape, dtype=np.int64)
+    x = x.copy()
+    for shift in (32, 16, 8, 4, 2, 1):
+        big = x >= np.uint64(1 << shift)
+        n[big] += shift
+        x[big] >>= np.uint64(shift)
+    return n + (x > 0)
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes in ``2**precision`` one-byte registers."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values: pd.Series) -> None:
+        """Add the non-null values of ``values``."""
+        values = values.dropna()
+        if len(values):
+            self.add_hashes(pd.util.hash_pandas_object(values, index=False).to_numpy())
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        p = self.precision
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        index = (hashes >> np.uint64(64 - p)).astype(np.intp)
+        # Position of the first 1 bit in the remaining 64 - p bits.
+        rank = (64 - p + 1) - _bit_length(hashes & np.uint64((1 << (64 - p)) - 1))
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small cardinalities: linear counting is exact-ish where HLL is biased.
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def sales_formula(quantity, price, sales) -> dict:
+    """``{"checked", "mismatched"}`` over the rows with all three present; pass the source ``sales``."""
+    q, p, s = (pd.to_numeric(x, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+               for x in (quantity, price, sales))
+    checked = ~(np.isnan(q) | np.isnan(p) | np.isnan(s))
+    return {"checked": int(checked.sum()),
+            "mismatched": int((np.abs(s - q * p)[checked] > FORMULA_TOLERANCE).sum())}
+
+
+def _scalar(v):
+    if v is None or v is pd.NaT:
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.isoformat()
+    return v.item() if hasattr(v, "item") else v
+
+
+class QualityProfile:
+    """Collects the per-column quality metrics (see the module docstring)."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.rows = 0
+        self.columns: dict = {}
+        self.coerced: dict = {}
+        self.formula = {"checked": 0, "mismatched": 0}
+
+    def add_coerced(self, counts: dict) -> None:
+        """Add per-column coerced-value counts from a parse stage."""
+        for c, n in counts.items():
+            self.coerced[c] = self.coerced.get(c, 0) + int(n)
+
+    def add_formula(self, counts: dict) -> None:
+        """Add ``checked``/``mismatched`` counts from :func:`sales_formula`."""
+        for k in self.formula:
+            self.formula[k] += int(counts.get(k, 0))
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold in a cleaned frame (or one output chunk of it)."""
+        self.rows += len(df)
+        for c in df.columns:
+            s = df[c]
+            acc = self.columns.get(c)
+            if acc is None:
+                acc = self.columns[c] = {"dtype": str(s.dtype), "nulls": 0, "count": 0, "sum": 0.0,
+                                         "min": None, "max": None, "sketch": HyperLogLog(self.precision)}
+            values = s.dropna()
+            acc["nulls"] += len(s) - len(values)
+            numeric = is_numeric_dtype(s.dtype) and not is_bool_dtype(s.dtype)
+            if len(values) and (numeric or is_datetime64_any_dtype(s.dtype)):
+                lo, hi = values.min(), values.max()
+                acc["min"] = lo if acc["min"] is None else min(acc["min"], lo)
+                acc["max"] = hi if acc["max"] is None else max(acc["max"], hi)
+                if numeric:
+                    acc["count"] += len(values)
+                    acc["sum"] += float(values.sum())
+            acc["sketch"].add(values)
+
+    def to_dict(self) -> dict:
+        """JSON-ready profile; columns dropped as all-empty appear with their coerced count only."""
+        columns = {}
+        for c, acc in self.columns.items():
+            columns[c] = {
+                "dtype": acc["dtype"],
+                "nulls": acc["nulls"],
+                "null_share": round(acc["nulls"] / self.rows, 6) if self.rows else 0.0,
+                "coerced": self.coerced.get(c, 0),
+                "distinct": acc["sketch"].count(),
+                "min": _scalar(acc["min"]),
+                "max": _scalar(acc["max"]),
+                "mean": acc["sum"] / acc["count"] if acc["count"] else None,
+            }
+        for c, n in self.coerced.items():
+            if c not in columns:
+                columns[c] = {"dropped": True, "coerced": n}
+        checked, mismatched = self.formula["checked"], self.formula["mismatched"]
+        return {
+            "rows": self.rows,
+            "columns": columns,
+            "sales_formula": {"checked": checked, "mismatched": mismatched,
+                              "share": round(mismatched / checked, 6) if checked else None},
+        }
+
+    def summary(self) -> str:
+        """One line for the CLI: missing cells, coerced values and formula mismatches."""
+        d = self.to_dict()
+        nulls = sum(c.get("nulls", 0) for c in d["columns"].values())
+        coerced = sum(c["coerced"] for c in d["columns"].values())
+        f = d["sales_formula"]
+        formula = f"{f['mismatched']} of {f['checked']} rows" if f["checked"] else "not checked"
+        return f"{d['rows']} rows | {nulls} missing cells | {coerced} values coerced | sales != qty*price: {formula}"
@@ -0,0 +1,156 @@
+"""Malformed CSV lines set aside while the rest of the file is read at full speed.
+
+A line with more fields than the header makes pandas' C parser raise. Re-reading
+the whole file with the python engine and ``on_bad_lines="skip"`` is many times
+slower and loses the lines without a trace. Instead, reads run with
+``on_bad_lines="warn"``: the C parser skips each bad line and reports its
+record number and reason, and :meth:`Quarantine.capture` collects those
+reports. Only a tokenizer error the C parser cannot skip (an unterminated
+quote) re-reads the file with the python engine, which quarantines the same way.
+
+Record numbers count CSV records (the header is 1, blank lines count, a quoted
+field spanning lines does not add records). :meth:`Quarantine.write` scans the
+file once more, only when something was quarantined and only up to the last
+bad record, to recover each line's physical line number and raw text.
+
+The C parser reports skipped lines only through :mod:`warnings`, whose filters
+and hook are process-wide: two captures on different threads would take each
+other's reports. Captures therefore hold a module lock, so quarantining reads
+on a thread pool run one at a time (the rest of the cleaning still overlaps).
+"""
+from __future__ import annotations
+import contextlib
+import csv
+import io
+import re
+import threading
+import warnings
+from pathlib import Path
+from typing import Iterable, Iterator
+import pandas as pd
+from .encoding import FALLBACK_ERRORS, read_csv_sniffed
+from .inputs import open_input
+
+QUARANTINE_COLUMNS = ("record", "line", "reason", "text")
+_SKIPPING = re.compile(r"Skipping line (\d+): ([^\n]+)")
+# The python engine repeats the line number in its reasons.
+_IN_LINE = re.compile(r" in line \d+")
+# Held while capturing (see the module docstring); reentrant for nested captures.
+_CAPTURE_LOCK = threading.RLock()
+
+
+class Quarantine:
+    """Record number -> reason of every line skipped while capturing."""
+
+    def __init__(self):
+        self.reasons: dict[int, str] = {}
+        # Set by read_csv_quarantined: how the source was decoded.
+        self.encoding = "utf-8"
+
+    def __len__(self) -> int:
+        return len(self.reasons)
+
+    @contextlib.contextmanager
+    def capture(self):
+        """Collect the lines skipped by reads with ``on_bad_lines="warn"`` inside this block.
+
+        A record reported twice (files read in several passes) is kept once;
+        other warnings are passed on. Only one thread captures at a time.
+        """
+        with _CAPTURE_LOCK, warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            try:
+                yield self
+            finally:
+                pending = list(caught)
+        for w in pending:
+            found = _SKIPPING.findall(str(w.message)) if issubclass(w.category, pd.errors.ParserWarning) else []
+            for record, reason in found:
+                reason = _IN_LINE.sub("", reason.strip())
+                self.reasons.setdefault(int(record), reason[:1].lower() + reason[1:])
+            if not found:
+                warnings.warn_explicit(w.message, w.category, w.filename, w.lineno)
+
+    def counts(self) -> dict:
+        """Quarantined lines per reason, most frequent first."""
+        counts = {}
+        for reason in self.reasons.values():
+            counts[reason] = counts.get(reason, 0) + 1
+        return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
+
+    def summary(self) -> str:
+        return "; ".join(f"{reason}: {n}" for reason, n in self.counts().items())
+
+    def entries(self, source, encoding: str | None = None) -> list[dict]:
+        """One dict per quarantined record (``QUARANTINE_COLUMNS``), in file order."""
+        if not self.reasons:
+            return []
+        encoding = encoding or self.encoding
+        last = max(self.reasons)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            raw = io.BytesIO(bytes(source))
+        else:
+            raw = open_input(source)
+        found = {}
+        with io.TextIOWrapper(raw, encoding=encoding, errors=FALLBACK_ERRORS, newline="") as text:
+            for record, line, raw_text in _records(text):
+                if record in self.reasons:
+                    found[record] = (line, raw_text.rstrip("\r\n"))
+                if record >= last:
+                    break
+        return [{"record": r, "line": found.get(r, (None, None))[0], "reason": reason,
+                 "text": found.get(r, (None, None))[1]} for r, reason in sorted(self.reasons.items())]
+
+    def write(self, path, source, encoding: str | None = None) -> int:
+        """Write the quarantined lines of ``source`` as CSV to ``path``; returns how many."""
+        rows = self.entries(source, encoding)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            writer = csv.DictWriter(fh, QUARANTINE_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return len(rows)
+
+
+def _records(lines: Iterable[str]) -> Iterator[tuple[int, int, str]]:
+    """``(record number, first physical line, raw text)`` of each CSV record."""
+    consumed = []
+
+    def feed():
+        for line in lines:
+            consumed.append(line)
+            yield line
+
+    reader = csv.reader(feed())
+    record, line = 0, 1
+    while True:
+        try:
+            next(reader)
+        except StopIteration:
+            return
+        except csv.Error:
+            # Unterminated quote: the rest of the file is this record.
+            yield record + 1, line, "".join(consumed)
+            return
+        record += 1
+        yield record, line, "".join(consumed)
+        line += len(consumed)
+        consumed.clear()
+
+
+def read_csv_quarantined(source, quarantine: Quarantine, report: dict | None = None, **read_kwargs) -> pd.DataFrame:
+    """:func:`csv_cleaner.encoding.read_csv_sniffed`, skipping malformed lines into ``quarantine``.
+
+    Stays on the C parser unless it hits a tokenizer error it can't skip; then
+    the file is read with the python engine (see the module docstring).
+    """
+    report = {} if report is None else report
+    try:
+        with quarantine.capture():
+            df = read_csv_sniffed(source, report, on_bad_lines="warn", **read_kwargs)
+    except pd.errors.ParserError:
+        read_kwargs.pop("low_memory", None)
+        with quarantine.capture():
+            df = read_csv_sniffed(source, report, engine="python", on_bad_lines="warn", **read_kwargs)
+    quarantine.encoding = report["encoding"]
+    return df
@@ -0,0 +1,153 @@
+"""Cleaning rules per feed: which cleaned columns each stage applies to.
+
+A rule file is a JSON (or, with PyYAML installed, YAML) object; every key is
+optional and defaults to the built-in rules::
+
+    {
+      "title_case": ["customer_name", "city", "category", "product"],
+      "dates": ["order_date"],
+      "numeric": ["quantity", "unit_price", "price", "amount", "sales"],
+      "strip_text": true,
+      "compute_sales": true,
+      "columns": ["order_id", "customer_name", "quantity", "unit_price", "sales", "order_date"]
+    }
+
+Names are cleaned column names (after header normalization or
+:class:`csv_cleaner.headers.HeaderResolver`). ``strip_text`` trims and
+collapses whitespace in every text column. ``compute_sales`` fills ``sales``
+from quantity x price. ``columns``, when given, keeps only those columns:
+:meth:`CleaningRules.usecols` turns it into ``usecols`` for ``pd.read_csv``,
+so the other columns are never parsed. (Reads that quarantine malformed lines
+drop them after the read instead: with ``usecols`` pandas stops reporting
+lines with too many fields.)
+
+:meth:`CleaningRules.plan` compiles a header row into the per-column steps
+the cleaners run: only columns that are present and have a rule get one.
+Plans are memoized per header tuple, and :func:`load_rules` reuses loaded
+files, so a feed that keeps its layout is compiled once per process
+(``csv-cleaner serve`` keeps that across jobs).
+
+YAML needs PyYAML: ``pip install "csv-cleaner-pro[rules]"``.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+from pathlib import Path
+
+TITLECASE_COLS = ("customer_name", "city", "category", "product")
+DATE_COLS = ("order_date",)
+NUMERIC_COLS = ("quantity", "unit_price", "price", "amount", "sales")
+_LIST_KEYS = ("title_case", "dates", "numeric")
+_FLAG_KEYS = ("strip_text", "compute_sales")
+
+
+def require_yaml(feature: str = "YAML rule files"):
+    """Import PyYAML or raise ImportError with the install hint."""
+    try:
+        import yaml
+    except ImportError as e:
+        raise ImportError(f'{feature} need PyYAML: pip install "csv-cleaner-pro[rules]"') from e
+    return yaml
+
+
+class CleaningRules:
+    """A rule spec plus a memo of compiled plans (see the module docstring)."""
+
+    def __init__(self, title_case=TITLECASE_COLS, dates=DATE_COLS, numeric=NUMERIC_COLS,
+                 strip_text: bool = True, compute_sales: bool = True, columns=None):
+        self.title_case = tuple(title_case)
+        self.dates = tuple(dates)
+        self.numeric = tuple(numeric)
+        both = set(self.dates) & set(self.numeric)
+        if both:
+            raise ValueError(f"columns can't be both dates and numeric: {sorted(both)}")
+        self.strip_text = bool(strip_text)
+        self.compute_sales = bool(compute_sales)
+        self.columns = None if columns is None else tuple(columns)
+        self._memo: dict = {}
+        self.fingerprint = hashlib.blake2b(
+            json.dumps(self.to_dict(), sort_keys=True).encode(), digest_size=8
+        ).hexdigest()
+
+    @classmethod
+    def from_dict(cls, spec: dict, source: str = "rules") -> "CleaningRules":
+        if not isinstance(spec, dict):
+            raise ValueError(f"{source}: expected an object of rules")
+        unknown = set(spec) - {*_LIST_KEYS, *_FLAG_KEYS, "columns"}
+        if unknown:
+            raise ValueError(f"{source}: unknown rule(s) {', '.join(sorted(unknown))}")
+        for key in (*_LIST_KEYS, "columns"):
+            value = spec.get(key)
+            if value is not None and not (isinstance(value, list) and all(isinstance(v, str) for v in value)):
+                raise ValueError(f"{source}: {key} must be a list of column names")
+        for key in _FLAG_KEYS:
+            if key in spec and not isinstance(spec[key], bool):
+                raise ValueError(f"{source}: {key} must be true or false")
+        return cls(**{k: v for k, v in spec.items() if v is not None or k == "columns"})
+
+    @classmethod
+    def from_file(cls, path) -> "CleaningRules":
+        """Load rules from JSON, or YAML for ``.yaml``/``.yml`` files."""
+        text = Path(path).read_text(encoding="utf-8")
+        if Path(path).suffix.lower() in (".yaml", ".yml"):
+            spec = require_yaml().safe_load(text)
+        else:
+            spec = json.loads(text)
+        return cls.from_dict({} if spec is None else spec, str(path))
+
+    def to_dict(self) -> dict:
+        return {"title_case": list(self.title_case), "dates": list(self.dates), "numeric": list(self.numeric),
+                "strip_text": self.strip_text, "compute_sales": self.compute_sales,
+                "columns": None if self.columns is None else list(self.columns)}
+
+    def __repr__(self) -> str:
+        return f"CleaningRules({self.fingerprint})"
+
+    def plan(self, columns) -> dict:
+        """Cleaned column -> ``(title_case, parser)`` for the columns with a rule; memoized per tuple.
+
+        ``parser`` is ``"date"``, ``"numeric"`` or ``None``.
+        """
+        columns = tuple(columns)
+        cached = self._memo.get(columns)
+        if cached is not None:
+            return cached
+        plan = {}
+        for c in columns:
+            title = c in self.title_case
+            parse = "date" if c in self.dates else "numeric" if c in self.numeric else None
+            if title or parse:
+                plan[c] = (title, parse)
+        self._memo[columns] = plan
+        return plan
+
+    def keep(self, columns) -> list:
+        """The cleaned ``columns`` these rules keep, in order."""
+        if self.columns is None:
+            return list(columns)
+        return [c for c in columns if c in self.columns]
+
+    def usecols(self, header, headers=None) -> list | None:
+        """Raw ``header`` names to read (``pd.read_csv(usecols=...)``), or ``None`` for all."""
+        if self.columns is None:
+            return None
+        from .core import _clean_column_names
+        import pandas as pd
+
+        names = _clean_column_names(pd.DataFrame(columns=list(header)), headers).columns
+        return [raw for raw, name in zip(header, names) if name in self.columns]
+
+
+DEFAULT_RULES = CleaningRules()
+_LOADED: dict = {}
+
+
+def load_rules(path) -> CleaningRules:
+    """:meth:`CleaningRules.from_file`, reused while the file is unchanged (plans stay compiled)."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    rules = _LOADED.get(key)
+    if rules is None:
+        rules = _LOADED[key] = CleaningRules.from_file(path)
+    return rules
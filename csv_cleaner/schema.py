@@ -0,0 +1,166 @@
+"""Sample-based schema inference: choose read dtypes before the full read.
+
+A plain ``pd.read_csv`` infers every column over the whole file and keeps
+text as one Python string per row. :func:`infer_schema` instead parses a
+sample taken from the head, middle and tail of the file, cut at row
+boundaries, and classifies each column:
+
+* ``numeric``: plain numbers, read as ``int64``/``float64`` without inference;
+* ``numeric_text``: a numeric column (``CleaningRules.numeric``) holding
+  currency signs or separators, read as text for the numeric parser;
+* ``date``: a date column (``CleaningRules.dates``), read as text. Its formats are
+  inferred as the cleaner would infer them and stored in the schema;
+* ``categorical``: repeating text (at most ``CATEGORY_MAX_RATIO`` distinct
+  values per sampled row), read as ``category`` so the text stages only
+  touch the categories;
+* ``text``: other text, read as ``object``;
+* ``empty`` / ``other``: no hint (all missing in the sample, booleans...).
+
+The hints never change the cleaned output. If a hint does not hold for the
+whole file (e.g. an integer column with a gap after the sample),
+:func:`read_csv_schema` reads the file again without hints.
+
+Schemas are saved as JSON. A recurring feed can reuse a saved schema to skip
+inference; edit its ``usecols`` to drop columns at read time.
+"""
+from __future__ import annotations
+import io
+import json
+import mmap
+import os
+from pathlib import Path
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype
+from .core import DEFAULT_RULES, _clean_column_names
+from .encoding import ascii_compatible
+from .inputs import is_compressed
+from .parallel import _count_quotes, _next_row_start
+from .stream import infer_stream_date_formats
+from .text import CATEGORY_MAX_RATIO
+
+SCHEMA_VERSION = 1
+SAMPLE_BYTES = 256 * 1024
+# Rows read for encodings whose bytes can't be cut at arbitrary offsets.
+SAMPLE_ROWS = 10_000
+_HINTS = {"numeric": None, "numeric_text": "object", "date": "object", "categorical": "category", "text": "object"}
+
+
+def _sample(path, sample_bytes: int, read_kwargs: dict) -> pd.DataFrame:
+    """Rows from the head, middle and tail of ``path`` (all of it when small)."""
+    if is_compressed(path) or not ascii_compatible(read_kwargs.get("encoding") or "utf-8"):
+        return pd.read_csv(path, nrows=3 * SAMPLE_ROWS, low_memory=False, **read_kwargs)
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return pd.read_csv(path, low_memory=False, **read_kwargs)
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            header_end = _next_row_start(mm, 0, False)
+            if size - header_end <= 3 * sample_bytes:
+                data = mm[:]
+            else:
+                parts = [mm[:header_end]]
+                for start in (header_end, (header_end + size - sample_bytes) // 2, size - sample_bytes):
+                    in_quotes = bool(_count_quotes(mm, header_end, start) & 1)
+                    a = _next_row_start(mm, start, in_quotes) if start > header_end else start
+                    b = min(a + sample_bytes, size)
+                    b = _next_row_start(mm, b, bool(_count_quotes(mm, a, b) & 1)) if b < size else size
+                    part = mm[a:b]
+                    parts.append(part if part.endswith(b"\n") else part + b"\n")
+                data = b"".join(parts)
+    buffer_kwargs = {k: v for k, v in read_kwargs.items() if k not in ("memory_map", "compression")}
+    if "on_bad_lines" in buffer_kwargs:
+        # Line numbers within the sample mean nothing: don't report them.
+        buffer_kwargs["on_bad_lines"] = "skip"
+    return pd.read_csv(io.BytesIO(data), low_memory=False, **buffer_kwargs)
+
+
+def _classify(s: pd.Series, name: str, rules=DEFAULT_RULES) -> tuple[str, str | None]:
+    if s.isna().all():
+        return "empty", None
+    if is_bool_dtype(s.dtype):
+        return "other", None
+    if is_integer_dtype(s.dtype) or is_float_dtype(s.dtype):
+        return "numeric", str(s.dtype)
+    if name in rules.dates:
+        return "date", _HINTS["date"]
+    if name in rules.numeric:
+        return "numeric_text", _HINTS["numeric_text"]
+    if s.nunique() <= CATEGORY_MAX_RATIO * s.notna().sum():
+        return "categorical", _HINTS["categorical"]
+    return "text", _HINTS["text"]
+
+
+def infer_schema(path, sample_bytes: int = SAMPLE_BYTES, headers=None, rules=None, **read_kwargs) -> dict:
+    """Classify the columns of ``path`` from a sample (see the module docstring).
+
+    ``headers`` (a :class:`csv_cleaner.headers.HeaderResolver`) and ``rules``
+    (a :class:`csv_cleaner.rules.CleaningRules`) decide which columns count as
+    date/numeric, as they will for the cleaner.
+    """
+    rules = rules or DEFAULT_RULES
+    sample = _sample(path, sample_bytes, read_kwargs)
+    names = _clean_column_names(pd.DataFrame(columns=sample.columns), headers).columns
+    columns = {}
+    for raw, name in zip(sample.columns, names):
+        kind, dtype = _classify(sample[raw], name, rules)
+        columns[raw] = {"kind": kind, "dtype": dtype}
+    date_formats = infer_stream_date_formats(path, headers=headers, rules=rules, **read_kwargs)
+    return {
+        "version": SCHEMA_VERSION,
+        "sample_rows": len(sample),
+        "columns": columns,
+        "usecols": list(columns),
+        "date_formats": {c: list(f) for c, f in date_formats.items()},
+    }
+
+
+def save_schema(schema: dict, path) -> None:
+    Path(path).write_text(json.dumps(schema, indent=2) + "\n", encoding="utf-8")
+
+
+def load_schema(path) -> dict:
+    schema = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(schema, dict) or schema.get("version") != SCHEMA_VERSION or "columns" not in schema:
+        raise ValueError(f"{path}: not a version {SCHEMA_VERSION} schema file")
+    return schema
+
+
+def schema_matches(schema: dict, header) -> bool:
+    """Whether a (saved) schema was made for a file with this header row."""
+    return list(schema["columns"]) == list(header)
+
+
+def date_formats(schema: dict) -> dict:
+    """The schema's date formats, as the cleaners' ``date_formats`` argument."""
+    return {c: tuple(f) for c, f in schema.get("date_formats", {}).items()}
+
+
+def read_hints(schema: dict) -> dict:
+    """``dtype`` (and ``usecols`` when narrowed) keyword arguments for ``pd.read_csv``."""
+    hints = {"dtype": {c: spec["dtype"] for c, spec in schema["columns"].items() if spec["dtype"]}}
+    usecols = schema.get("usecols", list(schema["columns"]))
+    if list(usecols) != list(schema["columns"]):
+        hints["usecols"] = list(usecols)
+        hints["dtype"] = {c: d for c, d in hints["dtype"].items() if c in usecols}
+    return hints
+
+
+def read_csv_schema(path, schema: dict, report: dict | None = None, **read_kwargs) -> pd.DataFrame:
+    """``pd.read_csv`` with the schema's hints, retried without dtypes if the file breaks them.
+
+    ``report`` (a dict) receives ``hints_rejected``: the error, or ``None``.
+    """
+    hints = read_hints(schema)
+    if "usecols" in hints and "usecols" in read_kwargs:
+        keep = set(read_kwargs.pop("usecols"))
+        hints["usecols"] = [c for c in hints["usecols"] if c in keep]
+    try:
+        df = pd.read_csv(path, low_memory=False, **hints, **read_kwargs)
+        rejected = None
+    except (ValueError, TypeError, OverflowError) as e:
+        rejected = str(e).splitlines()[0]
+        hints.pop("dtype")
+        df = pd.read_csv(path, low_memory=False, **hints, **read_kwargs)
+    if report is not None:
+        report["hints_rejected"] = rejected
+    return df
@@ -0,0 +1,130 @@
+"""``csv-cleaner serve``: run many short jobs in one warm interpreter.
+
+Starting Python and importing pandas costs more than cleaning a small file.
+The server pays for that once, then reads jobs as JSON lines, one per line::
+
+    {"id": 7, "args": ["--input", "a.csv", "--output", "a.parquet"]}
+
+(a bare JSON list is taken as ``args``). ``args`` are the usual
+``csv-cleaner`` arguments. Every job gets one JSON line back::
+
+    {"id": 7, "exit": 0, "stdout": "...", "stderr": "...", "wall_s": 0.04}
+
+Jobs come from stdin until EOF, or with ``--socket PATH`` from connections
+to a Unix socket. Jobs run one at a time, in the order they arrive.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import signal
+import socketserver
+import sys
+import time
+import traceback
+from typing import Callable, Iterable
+
+
+def warm_up() -> None:
+    """Import the cleaning modules (and pandas) before the first job arrives."""
+    from . import batch, core, incremental, neardup, output, parallel, quality, schema, sort, stream  # noqa: F401
+
+
+def run_job(job) -> dict:
+    """Run one job (a dict with ``args`` and optional ``id``, or an args list); returns its reply."""
+    from .cli import main as cli_main
+
+    if isinstance(job, list):
+        job = {"args": job}
+    args = job.get("args") if isinstance(job, dict) else None
+    out, err = io.StringIO(), io.StringIO()
+    started = time.perf_counter()
+    if not isinstance(args, list) or not all(isinstance(a, str) for a in args):
+        code = 2
+        err.write('ERROR: a job is {"args": [...]} or a JSON list of csv-cleaner arguments\n')
+    elif args[:1] == ["serve"]:
+        code = 2
+        err.write("ERROR: a job cannot start another server\n")
+    else:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            try:
+                code = cli_main(args)
+            except SystemExit as e:
+                # argparse: usage errors (2) and --help (0)
+                code = e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    reply = {"exit": code, "stdout": out.getvalue(), "stderr": err.getvalue(),
+             "wall_s": round(time.perf_counter() - started, 6)}
+    if isinstance(job, dict) and "id" in job:
+        reply = {"id": job["id"], **reply}
+    return reply
+
+
+def serve_lines(lines: Iterable[str], write: Callable[[str], None]) -> int:
+    """Answer each non-blank JSON line of ``lines`` through ``write``; returns the number of jobs."""
+    jobs = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            reply = {"exit": 2, "stdout": "", "stderr": f"ERROR: not a JSON job: {e}\n", "wall_s": 0.0}
+        else:
+            reply = run_job(job)
+        write(json.dumps(reply) + "\n")
+        jobs += 1
+    return jobs
+
+
+class _JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        def write(text):
+            self.wfile.write(text.encode("utf-8"))
+            self.wfile.flush()
+
+        serve_lines((line.decode("utf-8") for line in self.rfile), write)
+
+
+def serve_socket(path) -> None:
+    """Serve jobs on a Unix socket at ``path`` until interrupted (one connection at a time)."""
+    if os.path.exists(path):
+        os.unlink(path)
+    try:
+        with socketserver.UnixStreamServer(str(path), _JobHandler) as server:
+            server.serve_forever()
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def _write_stdout(text: str) -> None:
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="csv-cleaner serve",
+                                description="Run csv-cleaner jobs (JSON lines) in one warm process.")
+    p.add_argument("--socket", default=None, metavar="PATH",
+                   help="Accept jobs on this Unix socket instead of stdin")
+    args = p.parse_args(argv)
+    if args.socket and not hasattr(socketserver, "UnixStreamServer"):
+        print("ERROR: --socket needs Unix domain sockets; send jobs on stdin instead", file=sys.stderr)
+        return 2
+    warm_up()
+    if args.socket:
+        print(f"Serving csv-cleaner jobs on {args.socket}", file=sys.stderr)
+        # Stop on SIGTERM as on Ctrl-C, removing the socket file.
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            serve_socket(args.socket)
+        except KeyboardInterrupt:
+            pass
+        return 0
+    serve_lines(sys.stdin, _write_stdout)
+    return 0
@@ -0,0 +1,183 @@
+"""Sorting cleaned data by one column when it doesn't fit in memory.
+
+:func:`external_sort` buffers incoming chunks up to ``memory_budget`` bytes,
+sorts each buffer and spills it to disk as a *run*: a sequence of pickled
+blocks of about ``memory_budget / fan_in`` bytes each. The runs are then
+k-way merged while the output is written, holding one block per run. When
+there are more than ``fan_in`` runs, consecutive groups of runs are first
+merged into longer runs, so the merge never holds more than ``fan_in``
+blocks.
+
+The result is ordered as ``df.sort_values(by, kind="stable")`` would order
+the whole data (:func:`sort_frame`): ties keep their input order and missing
+keys (NaT/NaN) come last. Chunks must share dtypes, as the chunks of the
+stream engines do.
+"""
+from __future__ import annotations
+import itertools
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_float_dtype, is_integer_dtype
+from .options import DEFAULT_SORT_MEMORY
+from .profile import profiled
+
+DEFAULT_FAN_IN = 16
+
+
+def sort_frame(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Stable in-memory sort, missing values last; the order :func:`external_sort` gives."""
+    return df.sort_values(by, kind="stable", na_position="last").reset_index(drop=True)
+
+
+def _merge_keys(s: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """``(missing, value)`` arrays that order ``s`` like ``sort_values(na_position="last")``."""
+    missing = s.isna().to_numpy()
+    if is_datetime64_any_dtype(s.dtype):
+        if getattr(s.dtype, "tz", None) is not None:
+            s = s.dt.tz_convert(None)
+        value = s.to_numpy(dtype="datetime64[ns]").view("int64")
+    elif isinstance(s.dtype, pd.CategoricalDtype):
+        value = s.cat.codes.to_numpy()
+    elif is_integer_dtype(s.dtype) or is_bool_dtype(s.dtype):
+        value = s.to_numpy(dtype="int64", na_value=0)
+    elif is_float_dtype(s.dtype):
+        value = s.to_numpy(dtype="float64", na_value=0.0)
+    else:
+        value = s.to_numpy(dtype=object)
+    return missing, np.where(missing, 0 if value.dtype != object else "", value)
+
+
+class _Cursor:
+    """Read position in one run: the current block and its merge keys."""
+
+    def __init__(self, blocks: list, by: str):
+        self.blocks = list(blocks)
+        self.by = by
+        self.frame = None
+        self.advance()
+
+    def advance(self):
+        """Load the next block (``frame`` is ``None`` once the run is exhausted)."""
+        self.frame = None
+        if self.blocks:
+            path = self.blocks.pop(0)
+            self.frame = pd.read_pickle(path)
+            path.unlink()
+            self.missing, self.value = _merge_keys(self.frame[self.by])
+            self.pos = 0
+
+    def last(self) -> tuple:
+        return bool(self.missing[-1]), self.value[-1]
+
+    def count(self, bound: tuple, inclusive: bool) -> int:
+        """Rows from ``pos`` on whose key is below (or equal to) ``bound``."""
+        missing, value = self.missing[self.pos:], self.value[self.pos:]
+        tie = (missing == bound[0]) & ((value <= bound[1]) if inclusive else (value < bound[1]))
+        return int(np.count_nonzero((missing < bound[0]) | tie))
+
+    def take(self, n: int) -> pd.DataFrame:
+        out = self.frame.iloc[self.pos:self.pos + n]
+        self.pos += n
+        return out
+
+
+def _write_blocks(frames: Iterable[pd.DataFrame], prefix: Path, block_rows: int) -> list:
+    """Pickle ``frames`` (in order) as blocks of ``block_rows`` rows; returns their paths."""
+    paths, pending, rows = [], [], 0
+    for frame in itertools.chain(frames, [None]):
+        if frame is not None:
+            pending.append(frame)
+            rows += len(frame)
+        while rows >= block_rows or (frame is None and rows):
+            block = pd.concat(pending) if len(pending) > 1 else pending[0]
+            path = prefix.with_name(f"{prefix.name}_{len(paths):06d}.pkl")
+            block.iloc[:block_rows].to_pickle(path)
+            paths.append(path)
+            rest = block.iloc[block_rows:]
+            pending, rows = ([rest], len(rest)) if len(rest) else ([], 0)
+    return paths
+
+
+def _merge(runs: list, by: str) -> Iterator[pd.DataFrame]:
+    """k-way merge of sorted runs; ties come out in run order."""
+    cursors = [c for c in (_Cursor(blocks, by) for blocks in runs) if c.frame is not None]
+    while cursors:
+        # Rows at or below the smallest last key of any loaded block are final:
+        # every row not loaded yet sorts after them (ties by run order).
+        bound, at = min(((c.last(), i) for i, c in enumerate(cursors)), key=lambda t: (*t[0], t[1]))
+        pieces = []
+        for i, c in enumerate(cursors):
+            n = len(c.frame) - c.pos if i == at else c.count(bound, inclusive=i < at)
+            if n:
+                pieces.append(c.take(n))
+            if c.pos == len(c.frame):
+                c.advance()
+        cursors = [c for c in cursors if c.frame is not None]
+        piece = pd.concat(pieces) if len(pieces) > 1 else pieces[0]
+        yield piece.sort_values(by, kind="stable", na_position="last") if len(pieces) > 1 else piece
+
+
+def external_sort(
+    chunks: Iterable[pd.DataFrame],
+    by: str = "order_date",
+    memory_budget: int = DEFAULT_SORT_MEMORY,
+    work_dir=None,
+    fan_in: int = DEFAULT_FAN_IN,
+    profiler=None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the rows of ``chunks`` sorted by ``by`` (see the module docstring).
+
+    Runs are spilled under ``work_dir`` (default: the system temp dir). The
+    sort itself briefly needs about twice ``memory_budget`` (buffer plus its
+    sorted copy). Output chunks carry the first input chunk's ``attrs`` and a
+    running RangeIndex. ``profiler`` records the ``sort`` (spill) and
+    ``merge`` stages.
+    """
+    with tempfile.TemporaryDirectory(prefix="csv-cleaner-sort-", dir=work_dir) as tmp:
+        runs, buffer, held, empty, block_rows = [], [], 0, None, None
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                if empty is None:
+                    if by not in chunk.columns:
+                        raise KeyError(f"cannot sort by {by!r}: no such column")
+                    empty = chunk.iloc[:0]
+                buffer.append(chunk)
+                held += int(chunk.memory_usage(deep=True).sum())
+                if held < memory_budget:
+                    continue
+            if not buffer:
+                break
+            rows = sum(len(b) for b in buffer)
+            with profiled(profiler, "sort", rows):
+                frame = pd.concat(buffer) if len(buffer) > 1 else buffer[0]
+                buffer = []
+                frame = frame.sort_values(by, kind="stable", na_position="last")
+                if block_rows is None:
+                    block_rows = max(1, rows * memory_budget // (fan_in * max(held, 1)))
+                runs.append(_write_blocks([frame], Path(tmp) / f"run{len(runs):06d}", block_rows))
+                del frame
+            held = 0
+        level = 0
+        while len(runs) > fan_in:
+            level += 1
+            runs = [_write_blocks(_merge(group, by), Path(tmp) / f"merge{level}_{g:06d}", block_rows)
+                    for g, group in enumerate(runs[i:i + fan_in] for i in range(0, len(runs), fan_in))]
+        start = 0
+        merged = iter(_merge(runs, by))
+        while True:
+            with profiled(profiler, "merge", 0) as rec:
+                chunk = next(merged, None)
+                rec["rows_in"] = rec["rows_out"] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            chunk = chunk.reset_index(drop=True)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            chunk.attrs = dict(empty.attrs)
+            yield chunk
+        if not start and empty is not None:
+            # No rows: still hand the writer the columns (CSV header, schema).
+            yield empty
@@ -0,0 +1,272 @@
+"""Chunked (bounded-memory) variant of :func:`csv_cleaner.core.clean_sales_dataframe`.
+
+Row-local stages run chunk by chunk. The global stages need whole-file
+knowledge, so the stream works in three passes:
+
+1. a parse-only scan pins the dtype of columns whose inferred dtype drifts
+   between chunks (what a single ``read_csv`` would have inferred);
+2. each chunk is cleaned and spilled to a temporary pickle while per-column
+   facts are collected (dtypes, non-null, date-only);
+3. spilled chunks are re-read, cast to the common dtype, stripped of
+   all-empty columns and de-duplicated against every earlier row with the
+   exact, disk-spilling :class:`~csv_cleaner.dedupe.HashDeduper` (row hashes
+   are taken in pass 2, so only candidate duplicates are compared here).
+
+Output matches the in-memory path while only one chunk is held at a time.
+"""
+from __future__ import annotations
+import bz2
+import gzip
+import itertools
+import lzma
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_datetime64_any_dtype, is_numeric_dtype
+from .core import DEFAULT_RULES, _clean_column_names, _clean_rows, _strip_object_cols
+from .dates import DEFAULT_SAMPLE_SIZE, date_sample, infer_date_formats
+from .dedupe import DEFAULT_MEMORY_BUDGET, HashDeduper, row_hashes
+from .profile import profiled
+
+DEFAULT_CHUNKSIZE = 100_000
+# DataFrame.attrs key carrying the whole-file strftime format per datetime column.
+DATE_FORMATS_ATTR = "csv_date_formats"
+_CSV_OPENERS = {None: open, "gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+
+
+def _common_dtype(dtypes):
+    dtypes = list(dict.fromkeys(dtypes))
+    if len(dtypes) == 1:
+        return dtypes[0]
+    if all(isinstance(d, pd.CategoricalDtype) for d in dtypes):
+        # Union in chunk order, i.e. order of first appearance in the file.
+        cats = np.concatenate([np.asarray(d.categories, dtype=object) for d in dtypes])
+        return pd.CategoricalDtype(pd.unique(cats))
+    if all(is_numeric_dtype(d) and not is_bool_dtype(d) for d in dtypes):
+        return np.dtype("float64")
+    return np.dtype("object")
+
+
+def scan_dtypes(path, chunksize: int = DEFAULT_CHUNKSIZE, **read_kwargs) -> dict:
+    """Return ``{column: dtype}`` for columns whose dtype differs between chunks."""
+    seen: dict = {}
+    for chunk in pd.read_csv(path, chunksize=chunksize, **read_kwargs):
+        for c, d in chunk.dtypes.items():
+            seen.setdefault(c, set()).add(d)
+    return {c: _common_dtype(ds) for c, ds in seen.items() if len(ds) > 1}
+
+
+def infer_stream_date_formats(path, dtype=None, formats=None, headers=None, rules=None, **read_kwargs) -> dict:
+    """Infer date formats from the head of the file, as the in-memory path would.
+
+    The whole-column path samples the first distinct values of each date
+    column; reading just enough leading chunks to collect the same sample keeps
+    every chunk (or partition) parsing with identical formats.
+    """
+    formats = dict(formats or {})
+    rules = rules or DEFAULT_RULES
+    header = pd.read_csv(path, nrows=0, **read_kwargs).columns
+    # The header was read through any usecols; the sample reads only date columns.
+    read_kwargs.pop("usecols", None)
+    raw = [r for r, c in zip(header, _clean_column_names(pd.DataFrame(columns=header), headers).columns)
+           if c in rules.dates and c not in formats]
+    if not raw:
+        return formats
+    dtype = {c: d for c, d in (dtype or {}).items() if c in raw}
+    samples: dict = {}
+    for chunk in pd.read_csv(path, chunksize=DEFAULT_CHUNKSIZE, usecols=raw, dtype=dtype or None, **read_kwargs):
+        chunk = _clean_column_names(chunk, headers)
+        if rules.strip_text:
+            chunk = _strip_object_cols(chunk)
+        for c in chunk.columns[chunk.dtypes == object]:
+            samples[c] = date_sample(samples.get(c, []) + chunk[c].tolist())
+        if all(len(samples.get(c, ())) >= DEFAULT_SAMPLE_SIZE for c in chunk.columns):
+            break
+    for c, sample in samples.items():
+        if sample:
+            formats[c] = infer_date_formats(sample)
+    return formats
+
+
+def _clean_to_spill(chunk: pd.DataFrame, spill: Path, date_formats: dict, categorical: bool = False,
+                    profiler=None, headers=None, rules=None) -> dict:
+    """Clean one chunk, pickle it to ``spill`` and return the facts pass 3 needs."""
+    failures: dict = {}
+    coercions: dict = {}
+    formula: dict = {}
+    chunk = _clean_rows(chunk, date_formats=date_formats, categorical=categorical, numeric_failures=failures,
+                        profiler=profiler, headers=headers, coercions=coercions, rules=rules, formula=formula)
+    dates_only = {}
+    for c in chunk.columns:
+        if is_datetime64_any_dtype(chunk[c]):
+            v = chunk[c].dropna()
+            dates_only[c] = bool((v == v.dt.normalize()).all())
+    with profiled(profiler, "spill", len(chunk)):
+        chunk.to_pickle(spill)
+    with profiled(profiler, "hash", len(chunk)):
+        hashes = row_hashes(chunk)
+    return {
+        "columns": list(chunk.columns),
+        "dtypes": dict(chunk.dtypes),
+        "nonnull": set(chunk.columns[chunk.notna().any().to_numpy()]),
+        "dates_only": dates_only,
+        "hashes": hashes,
+        "numeric_failures": failures,
+        "coerced": coercions,
+        "formula": formula,
+    }
+
+
+def csv_date_formats(df: pd.DataFrame) -> dict:
+    """``{column: strftime format}`` writing each datetime column of ``df`` as one ``to_csv`` call would.
+
+    Set it as ``df.attrs[DATE_FORMATS_ATTR]`` before splitting a frame into
+    chunks for :func:`write_csv_stream`, so every chunk formats alike.
+    """
+    formats = {}
+    for c in df.columns:
+        if is_datetime64_any_dtype(df[c]):
+            v = df[c].dropna()
+            formats[c] = "%Y-%m-%d" if (v == v.dt.normalize()).all() else "%Y-%m-%d %H:%M:%S"
+    return formats
+
+
+def _input_stats(facts: list) -> dict:
+    """``rows_in`` and summed ``numeric_failures`` over the cleaned chunks."""
+    failures: dict = {}
+    for f in facts:
+        for c, n in f["numeric_failures"].items():
+            failures[c] = failures.get(c, 0) + n
+    return {"rows_in": sum(len(f["hashes"]) for f in facts), "numeric_failures": failures}
+
+
+def _replay_spills(spills: list, facts: list, dedupe_memory: int = DEFAULT_MEMORY_BUDGET,
+                   stats: dict | None = None, profiler=None, keep_spills: bool = False,
+                   work_dir=None, quality=None) -> Iterator[pd.DataFrame]:
+    """Re-read spilled chunks in order, applying the whole-file global stages.
+
+    Spills are deleted once read unless ``keep_spills``; the deduper's own
+    spill files go to ``work_dir`` (default: next to the first spill).
+    ``quality`` is updated with each output chunk.
+    """
+    if not spills:
+        return
+    dtypes: dict = {}
+    nonnull: set = set()
+    dates_only: dict = {}
+    deduper = HashDeduper(memory_budget=dedupe_memory, spill_dir=work_dir or spills[0].parent)
+    for f in facts:
+        deduper.add(f.pop("hashes"))
+        if quality is not None:
+            quality.add_coerced(f["coerced"])
+            quality.add_formula(f["formula"])
+        for c, d in f["dtypes"].items():
+            dtypes.setdefault(c, set()).add(d)
+        nonnull |= f["nonnull"]
+        for c, only in f["dates_only"].items():
+            dates_only[c] = dates_only.get(c, True) and only
+    keep = [c for c in facts[0]["columns"] if c in nonnull]
+    casts = {c: _common_dtype(dtypes[c]) for c in keep}
+    casts = {c: d for c, d in casts.items() if any(x != d for x in dtypes[c])}
+    date_formats = {
+        c: "%Y-%m-%d" if only else "%Y-%m-%d %H:%M:%S" for c, only in dates_only.items() if c in keep
+    }
+    deduper.finish()
+    start = 0
+    with deduper:
+        for spill in spills:
+            with profiled(profiler, "replay", 0) as rec:
+                chunk = pd.read_pickle(spill)[keep]
+                if not keep_spills:
+                    spill.unlink()
+                if casts:
+                    chunk = chunk.astype(casts)
+                rec["rows_in"] = rec["rows_out"] = len(chunk)
+            with profiled(profiler, "dedupe", len(chunk)) as rec:
+                chunk = deduper.filter(chunk)
+                rec["rows_out"] = len(chunk)
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            start += len(chunk)
+            chunk.attrs[DATE_FORMATS_ATTR] = date_formats
+            if quality is not None:
+                with profiled(profiler, "quality", len(chunk)):
+                    quality.update(chunk)
+            yield chunk
+    if stats is not None:
+        stats["rows_out"] = start
+        stats["duplicates_dropped"] = deduper.dropped
+
+
+def clean_sales_stream(
+    path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    dtype: dict | None = None,
+    date_formats: dict | None = None,
+    categorical: bool = False,
+    dedupe_memory: int = DEFAULT_MEMORY_BUDGET,
+    stats: dict | None = None,
+    profiler=None,
+    headers=None,
+    quality=None,
+    rules=None,
+    **read_kwargs,
+) -> Iterator[pd.DataFrame]:
+    """Clean a CSV file chunk by chunk, yielding cleaned DataFrames in file order.
+
+    ``dtype`` skips the scan pass when the caller already knows the pinned
+    dtypes (e.g. from a previous :func:`scan_dtypes` on the same feed), and
+    ``date_formats`` (column -> strptime formats) skips date inference.
+    ``categorical`` is passed to :func:`csv_cleaner.core.clean_sales_dataframe`;
+    text columns categorical in every chunk stay ``category`` (union of values).
+    ``dedupe_memory`` caps the bytes of row hashes kept in memory before they
+    spill to disk. If ``stats`` is a dict it receives ``date_formats`` up
+    front and ``rows_in``, ``numeric_failures`` (column -> unparsable values),
+    ``rows_out`` and ``duplicates_dropped`` once the stream is exhausted.
+    ``profiler`` (a :class:`csv_cleaner.profile.StageProfiler`) sums each
+    stage over the chunks. ``headers``, ``quality`` and ``rules`` are as for
+    ``clean_sales_dataframe``; ``quality`` is complete once the stream is exhausted.
+    """
+    if dtype is None:
+        with profiled(profiler, "scan", 0):
+            dtype = scan_dtypes(path, chunksize=chunksize, **read_kwargs)
+    with profiled(profiler, "date_inference", 0):
+        date_formats = infer_stream_date_formats(path, dtype, date_formats, headers, rules, **read_kwargs)
+    if stats is not None:
+        stats["date_formats"] = date_formats
+
+    with tempfile.TemporaryDirectory(prefix="csv-cleaner-") as tmp:
+        spills, facts = [], []
+        reader = iter(pd.read_csv(path, chunksize=chunksize, dtype=dtype or None, **read_kwargs))
+        for i in itertools.count():
+            with profiled(profiler, "read", 0) as rec:
+                chunk = next(reader, None)
+                rec["rows_in"] = rec["rows_out"] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            spill = Path(tmp) / f"{i:08d}.pkl"
+            facts.append(_clean_to_spill(chunk, spill, date_formats, categorical, profiler, headers, rules))
+            spills.append(spill)
+        if stats is not None:
+            stats.update(_input_stats(facts))
+        yield from _replay_spills(spills, facts, dedupe_memory, stats, profiler, quality=quality)
+
+
+def write_csv_stream(chunks: Iterable[pd.DataFrame], out_path, compression: str | None = None) -> int:
+    """Append cleaned chunks to one CSV file; returns the number of rows written.
+
+    ``compression`` is ``"gzip"``, ``"bz2"``, ``"xz"`` or ``None``.
+    """
+    rows = 0
+    header = True
+    opener = _CSV_OPENERS[compression]
+    with opener(out_path, "wt", encoding="utf-8", newline="") as fh:
+        for chunk in chunks:
+            formats = chunk.attrs.get(DATE_FORMATS_ATTR, {})
+            if formats:
+                chunk = chunk.assign(**{c: chunk[c].dt.strftime(f) for c, f in formats.items()})
+            chunk.to_csv(fh, index=False, header=header)
+            header = False
+            rows += len(chunk)
+    return rows
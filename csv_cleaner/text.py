@@ -0,0 +1,58 @@
+"""Text normalization applied to distinct values only.
+
+Sales feeds repeat a few dozen cities, categories, segments and ship modes
+across millions of rows. :func:`map_unique` factorizes a column, runs the
+string transform over the distinct values once and maps the codes back,
+optionally returning a ``category`` column so the strings are never
+materialized per row.
+
+Results match applying the transform to ``s.astype(str)`` row by row
+(missing values become ``"nan"``/``"None"`` exactly as ``astype(str)`` does).
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+
+# Emit category only when distinct values are at most this share of rows.
+CATEGORY_MAX_RATIO = 0.5
+# Columns whose head is (nearly) all distinct skip the factorize round trip.
+_PROBE_ROWS = 10_000
+_DISTINCT_PROBE_RATIO = 0.9
+
+
+def strip_collapse(u: pd.Series) -> pd.Series:
+    return u.str.strip().str.replace(r"\s+", " ", regex=True)
+
+
+def strip_title(u: pd.Series) -> pd.Series:
+    return u.str.strip().str.title()
+
+
+def map_codes(s: pd.Series, func) -> tuple[np.ndarray, pd.Index]:
+    """``func(s.astype(str))`` as ``(codes, categories)``, computed on distinct values."""
+    codes, uniques = pd.factorize(s)
+    values = func(pd.Series(np.asarray(uniques, dtype=object)).astype(str)).to_numpy(dtype=object)
+    nulls = codes < 0
+    if nulls.any():
+        # NaN/None become "nan"/"None" under astype(str); give each its own slot.
+        null_codes, null_uniques = pd.factorize(s[nulls].astype(object).map(str))
+        values = np.concatenate([values, func(pd.Series(null_uniques, dtype=object)).to_numpy(dtype=object)])
+        codes = codes.copy()
+        codes[nulls] = len(uniques) + null_codes
+    # Distinct inputs can normalize to the same output (" Mumbai" / "Mumbai").
+    out_codes, categories = pd.factorize(values)
+    return out_codes[codes], pd.Index(categories, dtype=object)
+
+
+def map_unique(s: pd.Series, func, categorical: bool = False) -> pd.Series:
+    """Return ``func(s.astype(str))`` computed on the distinct values of ``s``."""
+    if not categorical and len(s) > _PROBE_ROWS:
+        head = s.iloc[:_PROBE_ROWS]
+        if head.nunique(dropna=False) > _DISTINCT_PROBE_RATIO * _PROBE_ROWS:
+            return func(s.astype(str))
+    codes, categories = map_codes(s, func)
+    if categorical and len(categories) <= CATEGORY_MAX_RATIO * len(s):
+        data = pd.Categorical.from_codes(codes, categories=categories)
+    else:
+        data = np.asarray(categories, dtype=object).take(codes)
+    return pd.Series(data, index=s.index, name=s.name)
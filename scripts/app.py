@@ -6,9 +6,12 @@ import sys
 import streamlit as st
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
+import hashlib
+import io
+import tempfile
 import traceback
 import importlib.util
+import inspect
 import typing
 
 # Ensure the scripts/ folder is on sys.path so imports like `import clean_sales_data`
@@ -26,12 +29,32 @@ if str(SCRIPTS_DIR) not in sys.path:
 THIS_FILE = Path(__file__).resolve()
 SCRIPTS_DIR = THIS_FILE.parent
 PROJECT_ROOT = SCRIPTS_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from csv_cleaner.arrow import require_pyarrow
+from csv_cleaner.incremental import cleaner_fingerprint
+from csv_cleaner.output import read_frame, write_frame
+from csv_cleaner.profile import StageProfiler
+from csv_cleaner.quality import QualityProfile
+from csv_cleaner.quarantine import Quarantine, read_csv_quarantined
+
+# Saved copies (and a custom cleaner's artifacts) are Parquet when pyarrow is
+# installed, so they load back with dtypes intact instead of re-parsing CSV.
+try:
+    require_pyarrow()
+    CLEANED_EXT = "parquet"
+except ImportError:
+    CLEANED_EXT = "csv"
+DOWNLOAD_FORMATS = ("csv", "parquet") if CLEANED_EXT == "parquet" else ("csv",)
 
-# Useful paths (create if missing)
-DATA_RAW = PROJECT_ROOT / "data" / "raw"
+# Optional copies of cleaned uploads go here
 DATA_CLEANED = PROJECT_ROOT / "data" / "cleaned"
-DATA_RAW.mkdir(parents=True, exist_ok=True)
-DATA_CLEANED.mkdir(parents=True, exist_ok=True)
+
+# Uploads larger than this first get a preview: their first PREVIEW_ROWS rows,
+# cleaned on their own, shown while the whole upload is cleaned.
+PREVIEW_ABOVE_BYTES = 5 * 2**20
+PREVIEW_ROWS = 1_000
 
 # Banner (optional)
 BANNER_PATH = PROJECT_ROOT / "banner.png"
@@ -44,11 +67,13 @@ BANNER_PATH = PROJECT_ROOT / "banner.png"
 # If your actual function has a different name or signature, update the `CLEANER_FUNC_NAME`.
 CLEANER_MODULE_NAME = "clean_sales_data"
 CLEANER_FUNC_NAME = "clean_sales_data"
+# In-memory variant (bytes or DataFrame in, DataFrame out); optional for custom cleaners.
+CLEANER_FRAME_FUNC_NAME = "clean_sales_frame"
 
 
-def load_cleaner_module() -> typing.Callable:
+def load_cleaner_module(func_name: str = CLEANER_FUNC_NAME) -> typing.Callable:
     """
-    Attempt to import clean_sales_data.clean_sales_data.
+    Attempt to import clean_sales_data.<func_name> (clean_sales_data by default).
     Fallback: load module from file PROJECT_ROOT/clean_sales_data.py
     Returns the callable function.
     Raises ImportError/AttributeError if not found.
@@ -56,7 +81,7 @@ def load_cleaner_module() -> typing.Callable:
     # 1) Try normal import
     try:
         mod = importlib.import_module(CLEANER_MODULE_NAME)
-        func = getattr(mod, CLEANER_FUNC_NAME)
+        func = getattr(mod, func_name)
         return func
     except Exception:
         # 2) Fallback: look for file in project root and scripts folder
@@ -72,28 +97,102 @@ def load_cleaner_module() -> typing.Callable:
                     loader = spec.loader
                     assert loader is not None
                     loader.exec_module(module)
-                    func = getattr(module, CLEANER_FUNC_NAME)
+                    func = getattr(module, func_name)
                     return func
                 except Exception as e:
-                    raise ImportError(f"Found {p} but failed to load function '{CLEANER_FUNC_NAME}': {e}") from e
+                    raise ImportError(f"Found {p} but failed to load function '{func_name}': {e}") from e
 
         # If we reach here, raise helpful error
         raise ImportError(
             f"Could not import module '{CLEANER_MODULE_NAME}' or find it at {possible_paths}. "
             "Make sure clean_sales_data.py exists in the project root or scripts/ and defines "
-            f"a function named '{CLEANER_FUNC_NAME}(input_path, output_path)'."
+            f"a function named '{func_name}(input_path, output_path)'."
         )
 
 
+def _cleaner_version(clean_func) -> str:
+    """csv_cleaner's fingerprint plus the cleaner module's source: editing either invalidates cached results."""
+    source = Path(inspect.getsourcefile(clean_func)).read_bytes()
+    return hashlib.blake2b(cleaner_fingerprint().encode() + source, digest_size=16).hexdigest()
+
+
+# Streamlit reruns this script on every click: the cleaner is imported and its
+# version hashed once per server instead. A failed import isn't cached, so a
+# fixed cleaner is picked up on the next rerun.
+@st.cache_resource(show_spinner=False)
+def _load_cleaner():
+    """(clean_sales_data, clean_sales_frame or None, version)."""
+    clean_func = load_cleaner_module()
+    try:
+        frame_func = load_cleaner_module(CLEANER_FRAME_FUNC_NAME)
+    except Exception:
+        frame_func = None
+    return clean_func, frame_func, _cleaner_version(clean_func)
+
+
 # Lazily load the cleaning function so Streamlit starts even if import has issues
 try:
-    clean_sales_data = load_cleaner_module()
+    clean_sales_data, clean_sales_frame, CLEANER_VERSION = _load_cleaner()
 except Exception as e:
-    clean_sales_data = None
+    clean_sales_data = clean_sales_frame = CLEANER_VERSION = None
     CLEANER_IMPORT_ERROR = str(e)
 else:
     CLEANER_IMPORT_ERROR = None
 
+
+# ---------------------------
+# Cached cleaning
+# ---------------------------
+# Keyed on (upload hash, cleaner version): Streamlit reruns the whole script on
+# every click, and these make a rerun for the same upload cost nothing. The
+# bytes are passed as "_data" so Streamlit doesn't hash them a second time.
+@st.cache_data(show_spinner=False, max_entries=8)
+def clean_upload(digest: str, version: str, _data: bytes):
+    """Cleaned frame, stage timings, quality profile (see csv_cleaner.quality) and quarantined lines of one upload."""
+    profiler = StageProfiler()
+    quality = QualityProfile()
+    quarantine = Quarantine()
+    if clean_sales_frame is not None and "quarantine" in inspect.signature(clean_sales_frame).parameters:
+        df = clean_sales_frame(_data, profiler=profiler, quality=quality, quarantine=quarantine)
+    elif clean_sales_frame is not None and "quality" in inspect.signature(clean_sales_frame).parameters:
+        df = clean_sales_frame(_data, profiler=profiler, quality=quality)
+    elif clean_sales_frame is not None:
+        df = clean_sales_frame(_data, profiler=profiler)
+    else:
+        # Custom cleaners without an in-memory variant go through temp files.
+        with tempfile.TemporaryDirectory(prefix="csv-cleaner-app-") as tmp:
+            raw_path, cleaned_path = Path(tmp) / "upload.csv", Path(tmp) / f"cleaned.{CLEANED_EXT}"
+            raw_path.write_bytes(_data)
+            if "profiler" in inspect.signature(clean_sales_data).parameters:
+                clean_sales_data(input_path=raw_path, output_path=cleaned_path, profiler=profiler)
+            else:
+                clean_sales_data(input_path=raw_path, output_path=cleaned_path)
+            df = read_frame(cleaned_path)
+    if not quality.rows:
+        # The cleaner doesn't fill the profile itself: one pass over its output.
+        quality.update(df)
+    return df, profiler.rows(), quality.to_dict(), quarantine.entries(_data)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def clean_upload_head(digest: str, version: str, _data: bytes):
+    """The first PREVIEW_ROWS rows of an upload, cleaned on their own.
+
+    Read like the full clean: malformed lines are skipped (quarantined), not fatal.
+    """
+    return clean_sales_frame(read_csv_quarantined(_data, Quarantine(), nrows=PREVIEW_ROWS))
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def download_bytes(digest: str, version: str, fmt: str, _df: pd.DataFrame) -> bytes:
+    """The cleaned upload as CSV or Parquet bytes, built once per upload and format."""
+    if fmt == "csv":
+        return _df.to_csv(index=False).encode("utf-8")
+    buffer = io.BytesIO()
+    write_frame(_df, buffer, fmt, "snappy")
+    return buffer.getvalue()
+
+
 # ---------------------------
 # Streamlit UI
 # ---------------------------
@@ -106,7 +205,7 @@ with col_left:
     st.subheader("Upload → Clean → Preview → Download")
     st.markdown(
         "A small UI wrapper around your cleaning logic (`clean_sales_data.py`). "
-        "This app writes uploaded files to `data/raw/` and cleaned files to `data/cleaned/`."
+        "Uploads are cleaned in memory and cached, so reruns and downloads don't clean them again."
     )
 with col_right:
     if BANNER_PATH.exists():
@@ -141,7 +240,7 @@ with st.sidebar:
 # File uploader area
 st.markdown("## Upload CSV")
 uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"], accept_multiple_files=False)
-force_overwrite = st.checkbox("Overwrite existing cleaned file if name collides", value=True)
+save_copy = st.checkbox(f"Also save the cleaned file to `data/cleaned/` ({CLEANED_EXT})", value=False)
 run_button = st.button("Clean & Preview")
 
 # Helper: show friendly error box
@@ -151,109 +250,122 @@ def _show_import_error():
         st.text(CLEANER_IMPORT_ERROR)
 
 
-# Main run block
+# The upload's hash names its cached results; remembering which upload was
+# cleaned keeps the results on screen across reruns (e.g. download clicks).
+upload_bytes = uploaded_file.getvalue() if uploaded_file is not None else None
+upload_digest = hashlib.blake2b(upload_bytes, digest_size=16).hexdigest() if upload_bytes is not None else None
+
 if run_button:
     if clean_sales_data is None:
         _show_import_error()
+    elif uploaded_file is None:
+        st.warning("Please upload a CSV file first.")
     else:
-        if uploaded_file is None:
-            st.warning("Please upload a CSV file first.")
-        else:
-            try:
-                ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                raw_fname = f"uploaded_{ts}.csv"
-                cleaned_fname = f"uploaded_cleaned_{ts}.csv"
-
-                raw_path = DATA_RAW / raw_fname
-                cleaned_path = DATA_CLEANED / cleaned_fname
-
-                # Save uploaded bytes to disk (Streamlit gives an UploadedFile object)
-                with open(raw_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-
-                st.info(f"Saved uploaded file to `{raw_path}`. Running cleaner...")
+        st.session_state["cleaned_upload"] = upload_digest
 
-                # Call the cleaner function. Many implementations accept (input_path, output_path).
-                # If your function has a different signature, adjust accordingly.
-                # We convert Path to str just to be compatible.
-                # pass Path objects so cleaner code that uses .parent/.exists() works
-                clean_sales_data(input_path=raw_path, output_path=cleaned_path)
-
-
-                # Load cleaned CSV into DataFrame for preview
-                df_clean = pd.read_csv(cleaned_path)
-
-                st.success("✅ Cleaning completed successfully.")
-                # Metrics row
-                m1, m2, m3 = st.columns([1, 1, 1])
-                with m1:
-                    st.metric("Rows", f"{df_clean.shape[0]}")
-                with m2:
-                    st.metric("Columns", f"{df_clean.shape[1]}")
-                with m3:
-                    missing_total = int(df_clean.isna().sum().sum())
-                    st.metric("Total missing cells", f"{missing_total}")
-
-                # Two-column layout: preview + summary
-                left_col, right_col = st.columns([3, 1])
-                with left_col:
-                    st.markdown("### Preview (first 10 rows)")
-                    st.dataframe(df_clean.head(10), use_container_width=True)
-                    st.markdown("### Sample validation (first 5 rows)")
-                    # Show a tiny validation: sales == quantity * unit_price if those columns exist
-                    if {"quantity", "unit_price", "sales"}.issubset(set(map(str.lower, df_clean.columns))):
-                        # Normalize column case-sensitively — attempt common names
-                        # This tries to find exact columns (case-insensitive)
-                        cols_lower_map = {c.lower(): c for c in df_clean.columns}
-                        qcol = cols_lower_map.get("quantity")
-                        upcol = cols_lower_map.get("unit_price")
-                        scol = cols_lower_map.get("sales")
-                        # compute difference
-                        try:
-                            sample = df_clean[[qcol, upcol, scol]].head(5).copy()
-                            sample["calc_sales"] = (sample[qcol] * sample[upcol]).round(2)
-                            sample["sales_diff"] = (sample[scol].round(2) - sample["calc_sales"]).round(2)
-                            st.dataframe(sample)
-                        except Exception:
-                            st.info("Could not run quick formula check (unexpected column types).")
-                    else:
-                        st.info("Formula check skipped (quantity/unit_price/sales columns not present).")
-
-                with right_col:
-                    st.markdown("### Summary stats")
-                    numeric_df = df_clean.select_dtypes(include="number")
-                    if not numeric_df.empty:
-                        st.dataframe(numeric_df.describe().transpose())
-                    else:
-                        st.info("No numeric columns to summarize.")
-
-                    st.markdown("### Missing values")
-                    miss = df_clean.isna().sum().to_frame("missing_count")
-                    miss["missing_pct"] = (miss["missing_count"] / len(df_clean) * 100).round(2)
-                    st.dataframe(miss.sort_values("missing_count", ascending=False))
-
-                    st.markdown("### Quick actions")
-                    # Download button (generates fresh bytes)
-                    csv_bytes = df_clean.to_csv(index=False).encode("utf-8")
-                    st.download_button(
-                        label="📥 Download cleaned CSV",
-                        data=csv_bytes,
-                        file_name=f"cleaned_sales_{ts}.csv",
-                        mime="text/csv",
-                    )
-                    st.write(f"Saved cleaned file at `{cleaned_path}`.")
-
-            except Exception as exc:
-                st.error("❌ Cleaning failed — see traceback below.")
-                st.text(traceback.format_exc())
-                st.markdown("**Hints / next steps**")
-                st.write(
-                    """
+# Main run block
+if upload_digest is not None and clean_sales_data is not None and st.session_state.get("cleaned_upload") == upload_digest:
+    try:
+        # Large uploads: clean and show their head first, then the whole file
+        head_slot = st.empty()
+        if clean_sales_frame is not None and len(upload_bytes) > PREVIEW_ABOVE_BYTES:
+            try:
+                head = clean_upload_head(upload_digest, CLEANER_VERSION, upload_bytes)
+            except Exception:
+                # The preview is a courtesy: the full clean below reports any real failure.
+                head = None
+            if head is not None:
+                with head_slot.container():
+                    st.info(f"Preview of the first {PREVIEW_ROWS:,} rows; cleaning the whole upload...")
+                    st.dataframe(head.head(10), use_container_width=True)
+        with st.spinner("Cleaning..."):
+            df_clean, timings_rows, quality, quarantined = clean_upload(upload_digest, CLEANER_VERSION, upload_bytes)
+        head_slot.empty()
+        name = f"cleaned_sales_{upload_digest[:12]}"
+
+        st.success("✅ Cleaning completed successfully.")
+        if quarantined:
+            st.warning(f"{len(quarantined)} malformed lines were set aside instead of being cleaned.")
+            with st.expander("Quarantined lines"):
+                st.dataframe(pd.DataFrame(quarantined), use_container_width=True)
+        # Metrics row
+        m1, m2, m3 = st.columns([1, 1, 1])
+        with m1:
+            st.metric("Rows", f"{df_clean.shape[0]}")
+        with m2:
+            st.metric("Columns", f"{df_clean.shape[1]}")
+        with m3:
+            missing_total = sum(c.get("nulls", 0) for c in quality["columns"].values())
+            st.metric("Total missing cells", f"{missing_total}")
+
+        # Two-column layout: preview + summary
+        left_col, right_col = st.columns([3, 1])
+        with left_col:
+            st.markdown("### Preview (first 10 rows)")
+            st.dataframe(df_clean.head(10), use_container_width=True)
+            st.markdown("### Formula check (all rows)")
+            # source sales == quantity * unit_price, counted over every input row before sales is recomputed
+            formula = quality["sales_formula"]
+            if formula["checked"]:
+                st.metric("Source rows where sales != quantity × unit_price",
+                          f"{formula['mismatched']} of {formula['checked']}",
+                          f"{formula['share']:.2%}", delta_color="inverse")
+            else:
+                st.info("Formula check skipped (quantity/unit_price/sales columns not present).")
+
+        with right_col:
+            profile = pd.DataFrame.from_dict(quality["columns"], orient="index")
+            st.markdown("### Summary stats")
+            summary = profile[profile["mean"].notna()] if "mean" in profile else profile.iloc[:0]
+            if not summary.empty:
+                st.dataframe(summary[["min", "max", "mean", "distinct"]])
+            else:
+                st.info("No numeric columns to summarize.")
+
+            st.markdown("### Missing values")
+            if "nulls" in profile:
+                miss = profile[profile["nulls"].notna()][["nulls", "null_share", "coerced"]]
+                miss = miss.rename(columns={"nulls": "missing_count"})
+                miss["missing_pct"] = (miss.pop("null_share") * 100).round(2)
+                st.dataframe(miss.sort_values("missing_count", ascending=False))
+
+            st.markdown("### Quick actions")
+            # Download bytes are only built when asked for (then cached per format)
+            fmt = st.radio("Download format", DOWNLOAD_FORMATS, horizontal=True)
+            if st.button("Prepare download"):
+                st.session_state["download"] = (upload_digest, fmt)
+            if st.session_state.get("download") == (upload_digest, fmt):
+                st.download_button(
+                    label=f"📥 Download cleaned {fmt.upper() if fmt == 'csv' else fmt.title()}",
+                    data=download_bytes(upload_digest, CLEANER_VERSION, fmt, df_clean),
+                    file_name=f"{name}.{fmt}",
+                    mime="text/csv" if fmt == "csv" else "application/octet-stream",
+                )
+            if save_copy:
+                cleaned_path = DATA_CLEANED / f"{name}.{CLEANED_EXT}"
+                if not cleaned_path.exists():
+                    DATA_CLEANED.mkdir(parents=True, exist_ok=True)
+                    write_frame(df_clean, cleaned_path)
+                st.write(f"Saved cleaned file at `{cleaned_path}`.")
+
+        if timings_rows:
+            with st.expander("⏱️ Stage timings", expanded=False):
+                timings = pd.DataFrame(timings_rows).set_index("stage")
+                timings["rss_delta_mb"] = (timings["rss_delta_bytes"] / 2**20).round(1)
+                st.bar_chart(timings["wall_s"])
+                st.dataframe(timings[["wall_s", "rows_in", "rows_out", "rss_delta_mb", "coerced"]])
+
+    except Exception as exc:
+        st.error("❌ Cleaning failed — see traceback below.")
+        st.text(traceback.format_exc())
+        st.markdown("**Hints / next steps**")
+        st.write(
+            """
 - Make sure your CSV headers are what the cleaner expects (open the CSV in a text editor or Excel).  
 - If you see an ImportError about the cleaner, ensure `clean_sales_data.py` exists and defines `clean_sales_data(input_path, output_path)`.  
 - For encoding errors, re-save CSV as UTF-8 and try again.
 """
-                )
+        )
 
 # Footer
 st.markdown("---")
@@ -9,127 +9,124 @@ User_ID, Cust_name, Product_ID, Orders, Amount, age_group, etc.
 
 import pandas as pd
 from pathlib import Path
-import re
-import io
+import sys
+
+# Make the csv_cleaner package importable when this file runs as a script.
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from csv_cleaner.dates import parse_date_column
+from csv_cleaner.headers import DEFAULT_ALIASES, HeaderResolver
+from csv_cleaner.numeric import parse_numeric
+from csv_cleaner.output import write_frame, write_stream
+from csv_cleaner.profile import coerced, profiled
+from csv_cleaner.quality import sales_formula
+from csv_cleaner.quarantine import Quarantine, read_csv_quarantined
+from csv_cleaner.rules import CleaningRules
+from csv_cleaner.sort import DEFAULT_SORT_MEMORY, external_sort, sort_frame
+from csv_cleaner.stream import DATE_FORMATS_ATTR, csv_date_formats
+from csv_cleaner.text import map_unique, strip_collapse, strip_title
 
 # Default file paths (when running standalone)
 RAW_PATH = Path("data/raw/sales_dirty.csv")
 CLEAN_PATH = Path("data/cleaned/sales_cleaned_final.csv")
 
+# Extended header map (canonical -> variants); resolved once per header layout
+HEADER_MAP = DEFAULT_ALIASES
+HEADER_RESOLVER = HeaderResolver(HEADER_MAP)
+# Which canonical columns are title-cased, parsed as numbers or as dates;
+# other text is left as read. A feed's rule file replaces these.
+SCRIPT_RULES = CleaningRules(
+    title_case=["customer_id", "customer_name", "product", "city", "category",
+                "marital_status", "age_group", "occupation", "gender", "zone"],
+    numeric=["quantity", "unit_price", "sales", "amount", "orders"],
+    dates=["order_date"],
+    strip_text=False,
+)
+# Rows per slice handed to the external sort.
+SORT_SLICE_ROWS = 100_000
 
-def _read_csv_with_fallback(path):
-    """Try multiple encodings and parsing engines; fall back to replacement decode."""
-    encodings = ["utf-8", "utf-8-sig", "latin1", "cp1252"]
-    for enc in encodings:
-        try:
-            return pd.read_csv(path, encoding=enc)
-        except Exception:
-            try:
-                return pd.read_csv(path, encoding=enc, engine="python", on_bad_lines="skip")
-            except Exception:
-                continue
-    # Final fallback
-    with open(path, "rb") as fh:
-        raw = fh.read()
-    text = raw.decode("utf-8", errors="replace")
-    return pd.read_csv(io.StringIO(text))
 
+def _read_csv_with_fallback(source, quarantine):
+    """Sniff the encoding once and parse once; malformed lines go to quarantine (see csv_cleaner.quarantine)."""
+    report = {}
+    df = read_csv_quarantined(source, quarantine, report)
+    note = f", {report['stragglers']} stray bytes decoded as cp1252" if report["stragglers"] else ""
+    print(f"Encoding: {report['encoding']} ({report['detected_by']}){note}")
+    if len(quarantine):
+        print(f"Quarantined {len(quarantine)} malformed lines ({quarantine.summary()})")
+    return df
 
-def _normalize_header(h: str) -> str:
-    if h is None:
-        return ""
-    h = str(h).strip().lower()
-    h = re.sub(r"[^\w]+", "_", h)
-    h = re.sub(r"_+", "_", h).strip("_")
-    return h
 
+def quarantine_path_for(input_path, output_path):
+    """Default quarantine file: the input's name next to the output, e.g. cleaned/sales.quarantine.csv."""
+    return Path(output_path).with_name(Path(input_path).name.split(".")[0] + ".quarantine.csv")
 
-def clean_sales_data(input_path=RAW_PATH, output_path=CLEAN_PATH):
-    """Reads a raw CSV, cleans it robustly, and writes a cleaned CSV."""
 
-    input_path = Path(input_path)
-    df = _read_csv_with_fallback(input_path)
-
-    # Normalize headers (to snake-like tokens)
-    df.columns = [_normalize_header(c) for c in df.columns]
-
-    # Extended header map (canonical -> variants)
-    header_map = {
-        # core customer/id/name mappings
-        "customer_id": ["user_id", "user_id", "customer_id", "cust_id", "custid"],
-        "customer_name": ["cust_name", "custname", "customer", "customer_name", "client", "name"],
-        # dates
-        "order_date": [
-            "order_date", "orderdate", "date", "invoice_date", "purchase_date", "transaction_date"
-        ],
-        # quantities / order counts
-        "quantity": [
-            "quantity", "qty", "orders", "order_count", "qty_ordered", "quantityordered",
-            "quantity_ordered", "no_of_items", "units", "item_count", "quantity_purchased"
-        ],
-        # unit price variants
-        "unit_price": [
-            "unit_price", "unitprice", "price", "unit_cost", "priceeach", "price_each",
-            "price_per_unit", "price_per_item", "selling_price", "mrp", "priceperunit"
-        ],
-        # total/sales amount variants
-        "sales": [
-            "sales", "sales_amount", "salesvalue", "total", "amount", "revenue", "total_amount",
-            "totalamount", "invoice_amount", "amount_paid", "total_price", "order_amount", "grand_total",
-            "amount"  # Diwali uses "Amount"
-        ],
-        # product & category
-        "product": ["product", "product_id", "product_id", "product_name", "item", "sku", "productcode"],
-        "category": ["category", "cat", "type", "product_category", "productcategory"],
-        # geography / other text fields
-        "city": ["city", "town", "region", "state", "location"],
-        "marital_status": ["marital_status", "maritalstatus", "marital", "married_status"],
-        "age_group": ["age_group", "age_group_1", "agegroup", "age_group1", "age_group.1"],
-        "occupation": ["occupation", "job", "profession"],
-        "gender": ["gender", "sex"],
-        "zone": ["zone", "region_zone", "geozone"],
-    }
-
-    # reverse lookup: variant -> canonical
-    reverse_map = {v: k for k, vs in header_map.items() for v in vs}
-
-    # rename matching columns
-    new_cols = {}
-    for c in df.columns:
-        if c in reverse_map:
-            new_cols[c] = reverse_map[c]
-    if new_cols:
-        df = df.rename(columns=new_cols)
-
-    # Ensure canonical columns exist
-    for col in header_map.keys():
-        if col not in df.columns:
-            df[col] = pd.NA
+def _slices(df, rows=SORT_SLICE_ROWS):
+    # Holds the only reference to the frame once the caller drops its own,
+    # so the frame is freed as soon as the last slice has been spilled.
+    for start in range(0, len(df), rows):
+        yield df.iloc[start:start + rows]
+
+
+def _timed_writes(chunks, profiler):
+    # Each chunk's "write" stage runs from its yield until the writer asks for
+    # the next one, so the time spent producing chunks is not counted in it.
+    for chunk in chunks:
+        with profiled(profiler, "write", len(chunk)):
+            yield chunk
+
+
+def _clean_frame(df, date_formats=None, profiler=None, headers=None, quality=None, rules=None):
+    """Runs every cleaning stage but the final sort; returns (df, report).
+
+    report holds rows_in, duplicates_dropped, date_formats (the ones used
+    for order_date) and numeric_failures (column -> unparsable values).
+    quality, if given, gets the coerced counts, the sales formula check of the
+    source rows and the deduplicated frame.
+    rules: the csv_cleaner.rules.CleaningRules to apply; SCRIPT_RULES by default.
+    """
+    rules = rules or SCRIPT_RULES
+    coercions = {}
+    counting = profiler is not None or quality is not None
+    # Normalize headers (to snake-like tokens) and map aliases onto canonical names
+    with profiled(profiler, "headers", len(df)):
+        resolver = headers or HEADER_RESOLVER
+        df.columns = resolver.rename(df.columns)
+        if rules.columns is not None:
+            df = df.drop(columns=df.columns.difference(rules.keep(df.columns)))
+
+        # Ensure canonical columns exist
+        for col in rules.keep(resolver.aliases.keys()):
+            if col not in df.columns:
+                df[col] = pd.NA
+        # Compiled once per header layout: the columns each stage below touches
+        plan = rules.plan(df.columns)
 
     # Basic missing-value handling
-    if "customer_name" in df.columns:
-        df["customer_name"] = df["customer_name"].fillna("Unknown")
-    if "order_date" in df.columns:
-        df["order_date"] = df["order_date"].fillna(pd.NA)
-
-    # Safe text normalization (handles Series, DataFrame-like selections)
-    text_cols = [
-        "customer_id", "customer_name", "product", "city", "category",
-        "marital_status", "age_group", "occupation", "gender", "zone"
-    ]
-
-    def _normalize_series_like(obj, out_col_prefix=None):
-        if isinstance(obj, pd.DataFrame):
-            for i in range(obj.shape[1]):
-                col_label = obj.columns[i]
-                series = obj.iloc[:, i]
-                target_name = col_label if isinstance(col_label, (str, int)) else f"{out_col_prefix}_{i}"
-                df[target_name] = series.astype(str).str.strip().str.title()
-        else:
-            df[out_col_prefix] = obj.astype(str).str.strip().str.title()
+    with profiled(profiler, "text", len(df)):
+        if "customer_name" in df.columns:
+            df["customer_name"] = df["customer_name"].fillna("Unknown")
+        if "order_date" in df.columns:
+            df["order_date"] = df["order_date"].fillna(pd.NA)
+
+        # Safe text normalization (handles Series, DataFrame-like selections)
+        text_cols = [c for c in rules.title_case if c in plan]
+
+        def _normalize_series_like(obj, out_col_prefix=None):
+            if isinstance(obj, pd.DataFrame):
+                for i in range(obj.shape[1]):
+                    col_label = obj.columns[i]
+                    series = obj.iloc[:, i]
+                    target_name = col_label if isinstance(col_label, (str, int)) else f"{out_col_prefix}_{i}"
+                    df[target_name] = map_unique(series, strip_title)
+            else:
+                # strip/title only the distinct values (a few dozen cities, categories...)
+                df[out_col_prefix] = map_unique(obj, strip_title)
 
-    for col in text_cols:
-        if col in df.columns:
+        for col in text_cols:
             try:
                 series_like = df[col]
                 _normalize_series_like(series_like, out_col_prefix=col)
@@ -137,80 +134,205 @@ def clean_sales_data(input_path=RAW_PATH, output_path=CLEAN_PATH):
                 for c in df.columns:
                     try:
                         if df[c].dtype == object or pd.api.types.is_string_dtype(df[c]):
-                            df[c] = df[c].astype(str).str.strip().str.title()
+                            df[c] = map_unique(df[c], strip_title)
                     except Exception:
                         df[c] = df[c].astype(str).apply(lambda x: str(x).strip().title())
                 break
-        else:
-            df[col] = pd.NA
+        for col in rules.keep(rules.title_case):
+            if col not in df.columns:
+                df[col] = pd.NA
+        if rules.strip_text:
+            for c in df.columns:
+                if c not in text_cols and df[c].dtype == object:
+                    df[c] = map_unique(df[c], strip_collapse)
 
     # Numeric cleaning (quantity, unit_price, sales)
-    numeric_candidates = ["quantity", "unit_price", "sales", "amount", "orders"]
-    for col in numeric_candidates:
-        if col in df.columns:
-            # remove non-numeric characters (keeps dot and minus)
-            df[col] = df[col].astype(str).str.replace(r"[^0-9.\-]", "", regex=True)
-            df[col] = pd.to_numeric(df[col], errors="coerce")
-
-    # Convert quantity-like to nullable integer if possible
-    if "quantity" in df.columns:
-        try:
-            if pd.api.types.is_float_dtype(df["quantity"]):
-                non_null = df["quantity"].dropna()
-                if len(non_null) > 0 and non_null.apply(float.is_integer).all():
-                    df["quantity"] = df["quantity"].astype("Int64")
-        except Exception:
-            pass
-
-    # Handle cases where 'orders' or 'amount' mapped but canonical names expected are 'quantity'/'sales'
-    # If 'orders' exists and canonical 'quantity' is empty, copy it
-    if "orders" in df.columns and ("quantity" not in df.columns or df["quantity"].isna().all()):
-        df["quantity"] = df["orders"]
-
-    if "amount" in df.columns and ("sales" not in df.columns or df["sales"].isna().all()):
-        df["sales"] = df["amount"]
+    with profiled(profiler, "numeric", len(df)) as rec:
+        numeric_failures = {}
+        for col in [c for c in rules.numeric if c in plan]:
+            # currency symbols, thousands separators, decimal commas, (negatives)
+            before = df[col]
+            df[col], failed = parse_numeric(before)
+            if counting:
+                coercions[col] = coerced(before, df[col])
+                rec["coerced"] = rec.get("coerced", 0) + coercions[col]
+            if failed:
+                numeric_failures[col] = failed
+
+        # Convert quantity-like to nullable integer if possible
+        if "quantity" in df.columns:
+            try:
+                if pd.api.types.is_float_dtype(df["quantity"]):
+                    non_null = df["quantity"].dropna()
+                    if len(non_null) > 0 and non_null.apply(float.is_integer).all():
+                        df["quantity"] = df["quantity"].astype("Int64")
+            except Exception:
+                pass
+
+        # Handle cases where 'orders' or 'amount' mapped but canonical names expected are 'quantity'/'sales'
+        # If 'orders' exists and canonical 'quantity' is empty, copy it
+        if "orders" in df.columns and ("quantity" not in df.columns or df["quantity"].isna().all()):
+            df["quantity"] = df["orders"]
+
+        if "amount" in df.columns and ("sales" not in df.columns or df["sales"].isna().all()):
+            df["sales"] = df["amount"]
 
     # Recompute sales from quantity * unit_price if both available
-    if {"quantity", "unit_price"}.issubset(df.columns):
-        try:
-            df["unit_price"] = pd.to_numeric(df["unit_price"], errors="coerce")
-            df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
-            df["sales"] = df["quantity"] * df["unit_price"]
-        except Exception:
-            def _safe_mul(a, b):
-                try:
-                    return float(a) * float(b)
-                except Exception:
-                    return pd.NA
-            df["sales"] = [_safe_mul(q, p) for q, p in zip(df["quantity"], df["unit_price"])]
-
-    # Date parsing with simple dayfirst heuristic (DD/MM/YYYY detection)
-    if "order_date" in df.columns:
-        df["order_date_parsed"] = pd.to_datetime(df["order_date"], errors="coerce", dayfirst=False)
-        total_rows = len(df)
-        nat_count = df["order_date_parsed"].isna().sum()
-        raw_sample = df["order_date"].astype(str).dropna().head(200).astype(str).tolist()
-        contains_slash = any("/" in s for s in raw_sample)
-        if (total_rows > 0) and (nat_count / max(1, total_rows) > 0.2) and contains_slash:
-            df["order_date_parsed"] = pd.to_datetime(df["order_date"], errors="coerce", dayfirst=True)
-        df["order_date"] = df["order_date_parsed"]
-        df.drop(columns=["order_date_parsed"], inplace=True)
-
-    # Deduplicate and sort (best-effort)
-    df.drop_duplicates(inplace=True)
+    with profiled(profiler, "sales", len(df)):
+        if quality is not None and {"quantity", "unit_price", "sales"}.issubset(df.columns):
+            # Checked on the source sales, before it is overwritten below.
+            quality.add_formula(sales_formula(df["quantity"], df["unit_price"], df["sales"]))
+        if rules.compute_sales and {"quantity", "unit_price"}.issubset(df.columns):
+            try:
+                df["unit_price"] = pd.to_numeric(df["unit_price"], errors="coerce")
+                df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
+                df["sales"] = df["quantity"] * df["unit_price"]
+            except Exception:
+                def _safe_mul(a, b):
+                    try:
+                        return float(a) * float(b)
+                    except Exception:
+                        return pd.NA
+                df["sales"] = [_safe_mul(q, p) for q, p in zip(df["quantity"], df["unit_price"])]
+
+    # Date parsing: formats (and day/month order) inferred once from a sample
+    with profiled(profiler, "dates", len(df)) as rec:
+        order_date_formats = None
+        for col in [c for c in rules.dates if c in plan]:
+            raw_dates = df[col].astype(object).where(df[col].notna(), None)
+            df[col], used = parse_date_column(raw_dates, date_formats if col == "order_date" else None)
+            if col == "order_date":
+                order_date_formats = used
+            if counting:
+                coercions[col] = coerced(raw_dates, df[col])
+                rec["coerced"] = rec.get("coerced", 0) + coercions[col]
+        if rules.columns is not None:
+            # orders/amount copies and sales may have added columns the rules drop
+            df = df.drop(columns=df.columns.difference(rules.keep(df.columns)))
+
+    # Deduplicate (the order_date sort is left to the caller). The frame is already
+    # in memory, so drop_duplicates is the fast path here; HashDeduper is for streams.
+    with profiled(profiler, "dedupe", len(df)) as rec:
+        rows_before = len(df)
+        df = df.drop_duplicates(ignore_index=True)
+        rec["rows_out"] = len(df)
+    if quality is not None:
+        with profiled(profiler, "quality", len(df)):
+            quality.add_coerced(coercions)
+            quality.update(df)
+    return df, {"rows_in": rows_before, "duplicates_dropped": rows_before - len(df),
+                "date_formats": order_date_formats, "numeric_failures": numeric_failures}
+
+
+def _sort_by_date(df):
+    """Sorts by order_date (best-effort: left in place if the column won't sort)."""
+    try:
+        return sort_frame(df, "order_date")
+    except Exception:
+        return df.reset_index(drop=True)
+
+
+def clean_sales_frame(data, date_formats=None, profiler=None, headers=None, stats=None, quality=None,
+                      quarantine=None, rules=None):
+    """Cleans CSV data in memory; returns the cleaned DataFrame, sorted by order_date.
+
+    data: the raw CSV as bytes or a binary file object (e.g. a Streamlit
+    upload), or an already parsed DataFrame (left unchanged).
+    date_formats, profiler, headers, quality, rules: as for clean_sales_data.
+    stats: optional dict receiving rows_in, rows_out, duplicates_dropped,
+    date_formats, numeric_failures and quarantined (malformed lines skipped).
+    quarantine: optional csv_cleaner.quarantine.Quarantine receiving those
+    lines (its entries(data) gives their line numbers and text).
+    """
+    quarantine = Quarantine() if quarantine is None else quarantine
+    with profiled(profiler, "read", 0) as rec:
+        if isinstance(data, pd.DataFrame):
+            df = data.copy()
+        else:
+            df = _read_csv_with_fallback(data.read() if hasattr(data, "read") else data, quarantine)
+        rec["rows_in"] = rec["rows_out"] = len(df)
+    df, report = _clean_frame(df, date_formats, profiler, headers, quality, rules)
     if "order_date" in df.columns:
-        try:
-            df = df.sort_values("order_date").reset_index(drop=True)
-        except Exception:
-            df = df.reset_index(drop=True)
+        with profiled(profiler, "sort", len(df)):
+            df = _sort_by_date(df)
+    if stats is not None:
+        stats.update(report, rows_out=len(df), quarantined=len(quarantine))
+    return df
+
+
+def clean_sales_data(input_path=RAW_PATH, output_path=CLEAN_PATH, date_formats=None,
+                     output_format=None, compression=None, profiler=None, headers=None,
+                     sort_memory=DEFAULT_SORT_MEMORY, quality=None, quarantine_path=None, rules=None):
+    """Reads a raw CSV, cleans it robustly, and writes the cleaned data.
+
+    date_formats: optional strptime formats for order_date (e.g. the ones a
+    previous run printed); inferred from the data when omitted.
+    output_format: "csv", "parquet" or "feather"; taken from the output_path
+    extension when omitted. compression: codec for that format (see
+    csv_cleaner.output.COMPRESSIONS).
+    profiler: optional csv_cleaner.profile.StageProfiler recording time, rows,
+    memory and coerced values per stage.
+    headers: optional csv_cleaner.headers.HeaderResolver (e.g. loaded from an
+    alias file); HEADER_RESOLVER by default.
+    sort_memory: bytes; a cleaned frame larger than this is sorted by
+    order_date with csv_cleaner.sort.external_sort while it is written,
+    instead of in memory (same order: stable, missing dates last). This
+    bounds the sort, not the run: the file is still read, cleaned and
+    de-duplicated as one frame, so peak memory is that frame plus about
+    twice sort_memory while the first runs are spilled. Only the csv-cleaner
+    --chunksize path streams.
+    quality: optional csv_cleaner.quality.QualityProfile filled with nulls,
+    coerced values, min/max/mean and distinct counts of the cleaned data.
+    quarantine_path: where malformed lines (skipped by the reader) are written
+    with their line numbers and reasons; quarantine_path_for(input_path,
+    output_path) by default. Only written when there are any.
+    rules: optional csv_cleaner.rules.CleaningRules (e.g. load_rules(path) for
+    a feed) naming the title-case, numeric and date columns; SCRIPT_RULES by
+    default. Columns outside rules.columns, when set, are dropped right after
+    the header step. (They are still read: with usecols, pandas no longer
+    reports lines with too many fields, which the quarantine relies on.)
+    Returns {"rows_in", "rows_out", "duplicates_dropped", "quarantined"}.
+    """
+
+    input_path = Path(input_path)
+    quarantine = Quarantine()
+    with profiled(profiler, "read", 0) as rec:
+        df = _read_csv_with_fallback(input_path, quarantine)
+        rec["rows_in"] = rec["rows_out"] = len(df)
+    if len(quarantine):
+        quarantine_path = Path(quarantine_path or quarantine_path_for(input_path, output_path))
+        quarantine.write(quarantine_path, input_path)
+        print(f"Quarantined lines written to: {quarantine_path}")
+
+    df, report = _clean_frame(df, date_formats, profiler, headers, quality, rules)
+    rows_out, n_cols = df.shape
+    external = "order_date" in df.columns and df.memory_usage(deep=True).sum() > sort_memory
+    if "order_date" in df.columns and not external:
+        with profiled(profiler, "sort", rows_out):
+            df = _sort_by_date(df)
 
-    # Save cleaned CSV
+    # Save cleaned CSV (sorting on the way out when the frame is over sort_memory)
     output_path = Path(output_path)
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(output_path, index=False)
+    if external:
+        df.attrs[DATE_FORMATS_ATTR] = csv_date_formats(df)
+        chunks = external_sort(_slices(df), "order_date", sort_memory, profiler=profiler)
+        del df
+        # external_sort records its own sort/merge stages; "write" is only the writer's time.
+        write_stream(_timed_writes(chunks, profiler), output_path, output_format, compression)
+    else:
+        with profiled(profiler, "write", rows_out):
+            write_frame(df, output_path, output_format, compression)
 
     print(f"✅ Cleaned file saved successfully at:\n{output_path.resolve()}")
-    print(f"Rows: {df.shape[0]} | Columns: {df.shape[1]}")
+    print(f"Rows: {rows_out} | Columns: {n_cols} | Duplicates removed: {report['duplicates_dropped']}")
+    if report["date_formats"]:
+        print(f"Date formats: {', '.join(report['date_formats'])}")
+    if report["numeric_failures"]:
+        print("Unparsable numbers (set to empty): "
+              + ", ".join(f"{c}={n}" for c, n in report["numeric_failures"].items()))
+    return {"rows_in": report["rows_in"], "rows_out": rows_out, "duplicates_dropped": report["duplicates_dropped"],
+            "quarantined": len(quarantine)}
 
 
 if __name__ == "__main__":
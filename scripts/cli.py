@@ -1,13 +1,69 @@
 # scripts/cli.py
 import argparse
+import functools
+import json
+from pathlib import Path
+from csv_cleaner.batch import EXECUTORS, MANIFEST_NAME, SKIP_MODES, batch_config, plan_batch, run_batch
+from csv_cleaner.output import OUTPUT_FORMATS
+from csv_cleaner.quality import QualityProfile
+from csv_cleaner.rules import load_rules
+from scripts import clean_sales_data as cleaner
 from scripts.clean_sales_data import clean_sales_data
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument("-i","--input", default="data/raw/sales_dirty.csv")
     p.add_argument("-o","--output", default="data/cleaned/sales_cleaned_final.csv")
+    p.add_argument("--output-format", choices=OUTPUT_FORMATS, default=None)
+    p.add_argument("--compression", default=None)
+    p.add_argument("--sort-memory", type=int, default=None, metavar="MB",
+                   help="sort by order_date on disk (external merge sort) when the cleaned data exceeds this")
+    p.add_argument("--quality-json", default=None, metavar="PATH",
+                   help="write a data-quality profile of the cleaned data as JSON")
+    p.add_argument("--quarantine", default=None, metavar="PATH",
+                   help="where malformed lines go (default: <input name>.quarantine.csv next to the output)")
+    p.add_argument("--rules", default=None, metavar="PATH",
+                   help="JSON/YAML cleaning rules (title_case, numeric, dates, columns...) replacing the built-in ones")
+    p.add_argument("--input-dir", default=None, help="clean every --glob match here into --output-dir")
+    p.add_argument("--glob", default="*.csv")
+    p.add_argument("--output-dir", default=None)
+    p.add_argument("--jobs", type=int, default=None)
+    p.add_argument("--executor", choices=EXECUTORS, default="process")
+    p.add_argument("--skip-unchanged", choices=SKIP_MODES, default="mtime")
+    p.add_argument("--manifest", default=None)
     args = p.parse_args()
-    clean_sales_data(input_path=args.input, output_path=args.output)
+    sort_memory = {} if args.sort_memory is None else {"sort_memory": args.sort_memory * 2**20}
+    try:
+        rules = load_rules(args.rules) if args.rules else None
+    except (OSError, ValueError, ImportError) as e:
+        p.error(f"--rules: {e}")
+    if args.input_dir or args.output_dir:
+        if not args.input_dir or not args.output_dir:
+            p.error("batch mode needs both --input-dir and --output-dir")
+        if args.quality_json or args.quarantine:
+            p.error("--quality-json and --quarantine apply to a single file")
+        fmt = args.output_format or "csv"
+        pairs = plan_batch(args.input_dir, args.output_dir, args.glob, fmt, args.compression)
+        manifest = Path(args.manifest or Path(args.output_dir) / MANIFEST_NAME)
+        config = batch_config(fmt, args.compression, rules, Path(cleaner.__file__).read_bytes())
+        records = run_batch(pairs, functools.partial(clean_sales_data, output_format=fmt, compression=args.compression,
+                                                  rules=rules, **sort_memory),
+                            workers=args.jobs, executor=args.executor, skip=args.skip_unchanged,
+                            manifest=manifest, config=config)
+        failed = [r for r in records if r["status"] == "error"]
+        for r in failed:
+            print(f"❌ {r['input']}: {r['error']}")
+        skipped = sum(r["status"] == "skipped" for r in records)
+        quarantined = sum(r.get("quarantined") or 0 for r in records)
+        print(f"Batch: {len(records)} files | {len(records) - skipped - len(failed)} cleaned | "
+              f"{skipped} up to date | {len(failed)} failed | {quarantined} lines quarantined | manifest: {manifest}")
+        return 1 if failed else 0
+    quality = QualityProfile() if args.quality_json else None
+    clean_sales_data(input_path=args.input, output_path=args.output,
+                     output_format=args.output_format, compression=args.compression, quality=quality,
+                     quarantine_path=args.quarantine, rules=rules, **sort_memory)
+    if quality is not None:
+        Path(args.quality_json).write_text(json.dumps(quality.to_dict(), indent=2) + "\n")
+        print(f"Quality: {quality.summary()}")
 if __name__=="__main__":
-    main()
-
+    raise SystemExit(main())
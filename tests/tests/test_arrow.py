@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+from csv_cleaner.core import clean_sales_dataframe
+
+pa = pytest.importorskip("pyarrow")
+from csv_cleaner.arrow import read_csv_arrow, write_csv_arrow  # noqa: E402
+
+def test_arrow_engine_matches_pandas_engine(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(
+        "Customer Name,City,Order Date,Quantity,Unit Price\n"
+        "  alice   smith ,mumbai ,2024-01-05,2,\"$1,000.50\"\n"
+        "bob,  new  delhi,2024-01-06,1,15\n"
+        "  alice   smith ,mumbai ,2024-01-05,2,\"$1,000.50\"\n"
+    )
+    df = read_csv_arrow(src)
+    out = clean_sales_dataframe(df, engine="arrow")
+    assert isinstance(out["customer_name"].dtype, pd.ArrowDtype)
+    assert isinstance(out["unit_price"].dtype, pd.ArrowDtype)
+    write_csv_arrow(out, tmp_path / "arrow.csv")
+    clean_sales_dataframe(pd.read_csv(src)).to_csv(tmp_path / "pandas.csv", index=False)
+    # Arrow writes whole floats without ".0", so compare values, not dtypes.
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / "arrow.csv"), pd.read_csv(tmp_path / "pandas.csv"),
+                                  check_dtype=False)
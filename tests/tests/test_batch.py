@@ -0,0 +1,60 @@
+import json
+import os
+from pathlib import Path
+import pandas as pd
+from csv_cleaner.batch import output_name, plan_batch, run_batch
+
+def _inputs(root):
+    (root / "sub").mkdir(parents=True)
+    (root / "a.csv").write_text("Customer Name,Quantity\n alice ,1\n bob ,2\n bob ,2\n")
+    (root / "sub" / "b.csv").write_text("Customer Name,Quantity\n carol ,3\n")
+    (root / "broken.csv").write_text('Customer Name,Quantity\n"unterminated,1\n')
+
+def test_batch_survives_failures_and_writes_manifest(tmp_path):
+    _inputs(tmp_path / "in")
+    pairs = plan_batch(tmp_path / "in", tmp_path / "out", "**/*.csv", "parquet")
+    assert [d.relative_to(tmp_path / "out").as_posix() for _, d in pairs] == ["a.parquet", "broken.parquet",
+                                                                             "sub/b.parquet"]
+    pairs = plan_batch(tmp_path / "in", tmp_path / "out", "**/*.csv")
+    records = run_batch(pairs, workers=2, executor="thread", manifest=tmp_path / "out" / "manifest.json")
+    assert [r["status"] for r in records] == ["ok", "error", "ok"]
+    assert records[0]["rows_in"] == 3 and records[0]["rows_out"] == 2
+    assert "ParserError" in records[1]["error"] and not (tmp_path / "out" / "broken.csv").exists()
+    assert pd.read_csv(tmp_path / "out" / "sub" / "b.csv")["customer_name"].tolist() == ["Carol"]
+    manifest = json.loads((tmp_path / "out" / "manifest.json").read_text())
+    assert (manifest["ok"], manifest["error"]) == (2, 1)
+    assert [p.name for p in (tmp_path / "out").iterdir() if p.name.startswith(".tmp")] == []
+
+def test_batch_skips_up_to_date_outputs(tmp_path):
+    _inputs(tmp_path / "in")
+    (tmp_path / "in" / "broken.csv").unlink()
+    pairs = plan_batch(tmp_path / "in", tmp_path / "out", "**/*.csv")
+    manifest = tmp_path / "manifest.json"
+    for skip in ("mtime", "hash"):
+        run_batch(pairs, executor="thread", skip=skip, manifest=manifest, config="v1")
+        assert [r["status"] for r in run_batch(pairs, executor="thread", skip=skip, manifest=manifest,
+                                               config="v1")] == ["skipped", "skipped"]
+    os.utime(tmp_path / "in" / "a.csv")
+    records = run_batch(pairs, executor="thread", skip="hash", manifest=manifest, config="v1")
+    assert [r["status"] for r in records] == ["skipped", "skipped"] and records[0]["rows_out"] == 2
+    records = run_batch(pairs, executor="thread", skip="hash", manifest=manifest, config="v2")
+    assert [r["status"] for r in records] == ["ok", "ok"]
+    assert output_name("x/y.txt", "csv", "gzip").as_posix() == "x/y.csv.gz"
+
+def _clean_or_die(src, dst):
+    if src.name == "broken.csv":
+        dst.write_text("partial")
+        os._exit(1)
+    dst.write_text(src.read_text())
+    return {"rows_out": 1}
+
+def test_dead_worker_fails_only_its_own_file(tmp_path):
+    _inputs(tmp_path / "in")
+    for i in range(5):
+        (tmp_path / "in" / f"c{i}.csv").write_text("Customer Name\nx\n")
+    pairs = plan_batch(tmp_path / "in", tmp_path / "out", "**/*.csv")
+    records = run_batch(pairs, _clean_or_die, workers=2, executor="process")
+    failed = [Path(r["input"]).name for r in records if r["status"] == "error"]
+    assert failed == ["broken.csv"] and "BrokenProcessPool" in records[1]["error"]
+    assert sum(r["status"] == "ok" for r in records) == len(pairs) - 1
+    assert [p.name for p in (tmp_path / "out").iterdir() if p.name.startswith(".tmp")] == []
@@ -0,0 +1,16 @@
+import pandas as pd
+from benchmarks.bench_cleaners import SEEDS, compare, make_synthetic, run_case
+
+def test_synthetic_file_is_dirty_and_cleanable(tmp_path):
+    path = make_synthetic(SEEDS[2], 2_500, tmp_path / "s.csv")
+    raw = pd.read_csv(path, dtype=str)
+    assert len(raw) == 2_500 and raw.duplicated().any()
+    assert raw["Total Amount"].str.contains(r"\$|USD").any()
+    assert raw["Date"].str.contains("/").any() and raw["Date"].str.contains("-").any()
+    result = run_case("core", path)
+    assert result["rows"] == 2_500 and {"read", "dedupe", "write"} <= set(result["stages"])
+
+def test_compare_flags_slower_stages_only():
+    base = {"c": {"wall_s": 2.0, "rows_per_s": 1000, "peak_rss_mb": 100.0, "stages": {"read": 1.0, "text": 0.01}}}
+    now = {"c": {"wall_s": 2.1, "rows_per_s": 950, "peak_rss_mb": 101.0, "stages": {"read": 1.6, "text": 0.03}}}
+    assert compare(now, base) == ["c: stage read 1.600s vs 1.000s baseline"]
@@ -0,0 +1,21 @@
+import pandas as pd
+from csv_cleaner.dates import infer_date_formats, parse_date_column
+
+def test_day_month_order_comes_from_unambiguous_values():
+    # Superstore-style column: dd/mm/yyyy plus ambiguous d/m/yy values.
+    s = pd.Series(["15/04/2018", "8/11/17", "22/11/2016", "8/11/17", None, "nan"], dtype=object)
+    out, formats = parse_date_column(s)
+    assert formats == ("%d/%m/%Y", "%d/%m/%y")
+    assert out.tolist()[:4] == [pd.Timestamp(x) for x in ("2018-04-15", "2017-11-08", "2016-11-22", "2017-11-08")]
+    assert out.iloc[4:].isna().all()
+
+def test_known_formats_skip_inference_and_leftovers_fall_back():
+    s = pd.Series(["2024-01-14", "05-31-24", "March 3, 2024", "bad-date"], dtype=object)
+    out, formats = parse_date_column(s, formats=("%Y-%m-%d",))
+    assert formats == ("%Y-%m-%d",)
+    assert out.tolist()[:3] == [pd.Timestamp(x) for x in ("2024-01-14", "2024-05-31", "2024-03-03")]
+    assert pd.isna(out.iloc[3])
+
+def test_infer_handles_times_and_mixed_layouts():
+    assert infer_date_formats(["2/24/2003 0:00", "5/7/2003 13:05"]) == ("%m/%d/%Y %H:%M",)
+    assert infer_date_formats(["2024-01-14", "05-31-24", "06-12-24"]) == ("%m-%d-%y", "%Y-%m-%d")
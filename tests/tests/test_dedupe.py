@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+from csv_cleaner.dedupe import HashDeduper
+
+def _chunks():
+    df = pd.DataFrame({
+        "name": ["a", "b", "a", None, "c", None, "b", "d", "a"],
+        "qty": [1, 2, 1, np.nan, 3, np.nan, 2.0, 4, 1],
+    })
+    return [df.iloc[i:i + 2] for i in range(0, len(df), 2)], df
+
+def _run(dd, chunks, hashes=None):
+    for i, chunk in enumerate(chunks):
+        dd.add(chunk if hashes is None else hashes[i])
+    dd.finish()
+    return pd.concat([dd.filter(c) for c in chunks])
+
+def test_matches_drop_duplicates_and_spills_to_disk(tmp_path):
+    chunks, df = _chunks()
+    with HashDeduper(memory_budget=32, spill_dir=tmp_path, partitions=4) as dd:
+        out = _run(dd, chunks)
+        assert dd.spilled
+    pd.testing.assert_frame_equal(out, df.drop_duplicates())
+    assert dd.dropped == len(df) - len(out) == 4
+
+def test_hash_collisions_are_verified():
+    chunks, df = _chunks()
+    colliding = [np.zeros(len(c), dtype=np.uint64) for c in chunks]
+    dd = HashDeduper()
+    out = _run(dd, chunks, hashes=colliding)
+    pd.testing.assert_frame_equal(out, df.drop_duplicates())
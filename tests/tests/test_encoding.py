@@ -0,0 +1,26 @@
+from csv_cleaner.encoding import read_csv_sniffed, sniff_encoding
+
+def test_sniff_bom_utf8_and_single_byte(tmp_path):
+    text = "city,amount\nMünchen,1\nKöln,2\n"
+    for name, data, enc in [
+        ("bom.csv", text.encode("utf-8-sig"), "utf-8-sig"),
+        ("u16.csv", text.encode("utf-16"), "utf-16"),
+        ("u8.csv", text.encode("utf-8"), "utf-8"),
+        ("w.csv", ("city,amount\n" + "Köln,2\n" * 50 + "São Paulo,3\n").encode("cp1252"), "cp1252"),
+    ]:
+        (tmp_path / name).write_bytes(data)
+        assert sniff_encoding(tmp_path / name)[0] == enc
+        assert "Köln" in read_csv_sniffed(tmp_path / name)["city"].tolist()
+        # Uploads arrive as bytes, without a file behind them.
+        assert sniff_encoding(data)[0] == enc and "Köln" in read_csv_sniffed(data)["city"].tolist()
+
+def test_stragglers_decoded_in_one_parse(tmp_path):
+    src = tmp_path / "mixed.csv"
+    # A UTF-8 file with one row pasted from a cp1252 source, between the samples.
+    src.write_bytes("city,amount\n".encode() + "München,1\n".encode() * 10_000
+                    + "Berguvsvägen,2\n".encode("cp1252") + "Zürich,3\n".encode() * 10_000)
+    assert sniff_encoding(src, sample_bytes=1024) == ("utf-8", "UTF-8 sample")
+    report = {}
+    df = read_csv_sniffed(src, report)
+    assert report["stragglers"] == 1
+    assert df["city"].iloc[9_999:10_002].tolist() == ["München", "Berguvsvägen", "Zürich"]
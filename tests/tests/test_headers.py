@@ -0,0 +1,24 @@
+import json
+import pandas as pd
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.headers import HeaderResolver
+
+def test_resolver_scores_and_keeps_canonical_names_unique():
+    r = HeaderResolver()
+    res = r.resolve(["City", "State", "Unit Price ($)", "Quantiy", "Sub-Category", "SalesAmount", "price unit usd"])
+    assert list(res.mapping.values()) == ["city", "state", "unit_price", "quantity", "sub_category", "sales",
+                                          "price_unit_usd"]
+    assert res.methods == {"City": "exact", "Unit Price ($)": "exact", "Quantiy": "fuzzy", "SalesAmount": "compact"}
+    assert 0.9 <= res.scores["Quantiy"] < 1
+    assert r.match("price unit usd") == ("unit_price", 0.9, "tokens")
+    assert r.match("MSRP") == (None, 0.0, None)
+    assert r.resolve(("City", "State", "Unit Price ($)", "Quantiy", "Sub-Category", "SalesAmount",
+                      "price unit usd")) is res
+
+def test_alias_file_feeds_core(tmp_path):
+    aliases = tmp_path / "aliases.json"
+    aliases.write_text(json.dumps({"customer_name": ["Kunde"], "order_date": ["Bestelldatum"]}))
+    df = pd.DataFrame({"Kunde": [" alice "], "Bestelldatum": ["2024-01-02"], "Unit Price ($)": ["$2"], "Qty": [3]})
+    out = clean_sales_dataframe(df, headers=HeaderResolver.from_file(aliases))
+    assert list(out.columns) == ["customer_name", "order_date", "unit_price", "quantity", "sales"]
+    assert out.loc[0, "customer_name"] == "Alice" and out.loc[0, "sales"] == 6
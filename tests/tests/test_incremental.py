@@ -0,0 +1,38 @@
+from csv_cleaner import incremental
+from csv_cleaner.incremental import ChunkCache, clean_sales_incremental
+from csv_cleaner.stream import clean_sales_stream, write_csv_stream
+
+def _rows(start, stop):
+    return [f"  cust {i % 11} ,item {i % 5},{i % 3},\"${i % 9},{i % 10}00.50\",2024-0{1 + i % 9}-1{i % 10}"
+            for i in range(start, stop)]
+
+def _write(path, rows):
+    path.write_text("\n".join(["Customer Name,Product,Quantity,Unit Price,Order Date"] + rows) + "\n")
+    return path
+
+def test_appended_rows_reuse_cached_chunks(tmp_path):
+    src, cache = _write(tmp_path / "in.csv", _rows(0, 80)), tmp_path / "cache"
+    first = {}
+    write_csv_stream(clean_sales_incremental(src, cache, chunk_bytes=400, stats=first), tmp_path / "a.csv")
+    assert first["chunks_reused"] == 0 and first["chunks"] > 3
+
+    _write(src, _rows(0, 80) + _rows(0, 10) + _rows(80, 100))
+    stats = {}
+    out, ref = tmp_path / "b.csv", tmp_path / "ref.csv"
+    write_csv_stream(clean_sales_incremental(src, cache, chunk_bytes=400, stats=stats), out)
+    write_csv_stream(clean_sales_stream(src, chunksize=25), ref)
+    assert out.read_bytes() == ref.read_bytes()
+    assert stats["duplicates_dropped"] == 10
+    assert stats["chunks_reused"] >= first["chunks"] - 1 and stats["chunks_reused"] < stats["chunks"]
+
+def test_rule_change_invalidates_and_cache_stays_bounded(tmp_path, monkeypatch):
+    src, cache = _write(tmp_path / "in.csv", _rows(0, 80)), tmp_path / "cache"
+    list(clean_sales_incremental(src, cache, chunk_bytes=400))
+    monkeypatch.setattr(incremental, "cleaner_fingerprint", lambda: "rules v2")
+    stats = {}
+    list(clean_sales_incremental(src, cache, chunk_bytes=400, stats=stats))
+    assert stats["chunks_reused"] == 0
+
+    bound = ChunkCache(cache).size() // 3
+    list(clean_sales_incremental(src, cache, chunk_bytes=400, max_cache_bytes=bound))
+    assert 0 < ChunkCache(cache).size() <= bound
@@ -0,0 +1,33 @@
+import bz2
+import gzip
+import pandas as pd
+import pytest
+from csv_cleaner.batch import output_name
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.encoding import read_csv_sniffed, sniff_encoding
+from csv_cleaner.inputs import input_read_kwargs
+from csv_cleaner.stream import clean_sales_stream
+
+ROWS = "Order Date,City,Unit Price,Quantity\n" + "".join(f"2024-01-0{1 + i % 9},K\xf6ln {i % 3},\"$1,00{i % 10}\",{i}\n"
+                                                        for i in range(200))
+
+def test_compressed_inputs_read_like_the_plain_file(tmp_path):
+    plain = tmp_path / "in.csv"
+    plain.write_bytes(ROWS.encode("cp1252"))
+    (tmp_path / "in.csv.gz").write_bytes(gzip.compress(plain.read_bytes()))
+    (tmp_path / "in.csv.bz2").write_bytes(bz2.compress(plain.read_bytes()))
+    assert input_read_kwargs(plain) == {"memory_map": True}
+    expected = read_csv_sniffed(plain)
+    for name in ("in.csv.gz", "in.csv.bz2"):
+        assert sniff_encoding(tmp_path / name)[0] == sniff_encoding(plain)[0]
+        pd.testing.assert_frame_equal(read_csv_sniffed(tmp_path / name), expected)
+    streamed = pd.concat(clean_sales_stream(tmp_path / "in.csv.gz", chunksize=50, encoding="cp1252",
+                                            **input_read_kwargs(tmp_path / "in.csv.gz")), ignore_index=True)
+    pd.testing.assert_frame_equal(streamed, clean_sales_dataframe(expected), check_categorical=False)
+    assert output_name("x/in.csv.gz", "csv", None).as_posix() == "x/in.csv"
+
+def test_zstd_input(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    (tmp_path / "in.csv").write_text(ROWS, encoding="utf-8")
+    (tmp_path / "in.csv.zst").write_bytes(zstandard.ZstdCompressor().compress(ROWS.encode("utf-8")))
+    pd.testing.assert_frame_equal(read_csv_sniffed(tmp_path / "in.csv.zst"), read_csv_sniffed(tmp_path / "in.csv"))
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from csv_cleaner.neardup import near_duplicate_clusters, near_duplicates, near_duplicates_stream
+from csv_cleaner.profile import StageProfiler
+
+def _frame():
+    return pd.DataFrame({
+        "customer_name": ["Claire Gute", "claire  gute", "Darrin Van Huff", "Sean O'Donnell", None,
+                          "Sean ODonnell", "Claire Gute", "Brosina Hoffman"],
+        "product": ["T-Shirt", "T Shirt", "Chair", "Desk", "Desk", "Desk.", "T-Shirt", "Chair"],
+        "order_date": pd.to_datetime(["2024-01-01"] * 3 + ["2024-02-01"] * 4 + ["2024-01-01"]),
+    })
+
+def test_clusters_normalized_text_within_exact_blocks():
+    stats = {}
+    profiler = StageProfiler()
+    clusters = near_duplicate_clusters(_frame(), ["customer_name", "product", "order_date"],
+                                       profiler=profiler, stats=stats)
+    # The last Claire Gute is on another date; the row without a name stays alone.
+    assert clusters.tolist() == [0, 0, 2, 3, 4, 3, 6, 7]
+    assert stats["clusters"] == 2 and stats["clustered_rows"] == 4
+    assert {r["stage"] for r in profiler.records.values()} >= {"near_dup_keys", "near_dup_verify"}
+
+def test_collapse_keeps_first_row_and_stream_matches():
+    df = _frame()
+    keys = ["customer_name", "product"]
+    out = near_duplicates(df, keys, action="collapse")
+    assert out["product"].tolist() == ["T-Shirt", "Chair", "Desk", "Desk", "Chair"]
+    assert out["customer_name"].isna().tolist() == [False, False, False, True, False]
+    chunks = [df.iloc[i:i + 3] for i in range(0, len(df), 3)]
+    stats = {}
+    streamed = pd.concat(near_duplicates_stream(chunks, keys, action="collapse", stats=stats))
+    pd.testing.assert_frame_equal(streamed.reset_index(drop=True), out)
+    assert stats["rows_removed"] == len(df) - len(out)
+    labelled = pd.concat(near_duplicates_stream(chunks, keys))
+    assert labelled["near_dup_cluster"].tolist() == near_duplicate_clusters(df, keys).tolist()
+
+def test_scales_without_matching_distinct_names():
+    rng = np.random.default_rng(3)
+    letters = rng.choice(list("abcdefghijklmnopqrstuvwxyz"), size=(20_000, 14))
+    names = [f"{''.join(row[:6])} {''.join(row[6:])}" for row in letters]
+    df = pd.DataFrame({"customer_name": names + [n.upper() + "." for n in names[:100]]})
+    stats = {}
+    clusters = near_duplicate_clusters(df, ["customer_name"], threshold=0.95, stats=stats)
+    assert (clusters[-100:] == np.arange(100)).all()
+    assert stats["clusters"] == 100 and stats["clustered_rows"] == 200
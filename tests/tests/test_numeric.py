@@ -0,0 +1,25 @@
+import pandas as pd
+from csv_cleaner.numeric import parse_numeric
+
+def test_currency_separators_and_negatives():
+    s = pd.Series(["$1,234.50", "(12.00)", "1.234,50", "€ 3,5", "Rs. 1,200", "-7", "abc", "nan", None, "1,234"],
+                  dtype=object)
+    out, failures = parse_numeric(s)
+    assert out.tolist()[:6] == [1234.5, -12.0, 1234.5, 3.5, 1200.0, -7.0]
+    assert out.iloc[6:9].isna().all() and out.iloc[9] == 1234.0
+    assert failures == 1
+
+def test_integers_stay_int_and_numeric_columns_pass_through():
+    out, _ = parse_numeric(pd.Series(["1", " 2 ", "3"]))
+    assert out.dtype == "int64" and out.tolist() == [1, 2, 3]
+    floats = pd.Series([1e-05, 2.5])
+    assert parse_numeric(floats)[0] is floats
+    assert parse_numeric(pd.Series(["1,234", "1.234"]), decimal=",")[0].tolist() == [1.234, 1234.0]
+
+def test_signs_only_lead_trail_or_wrap():
+    s = pd.Series(["-$5", "5-", "−3", "($1,200.00)", "12-34", "10 - 20", "1(2)", "2024-01-05", "--5", "(5",
+                   "5)", "-(5)", "-", "--"], dtype=object)
+    out, failures = parse_numeric(s)
+    assert out.tolist()[:4] == [-5.0, -5.0, -3.0, -1200.0]
+    assert out.iloc[4:].isna().all()
+    assert failures == 8
@@ -0,0 +1,29 @@
+import gzip
+import pandas as pd
+import pytest
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.output import output_format, read_frame, write_frame, write_stream
+from csv_cleaner.stream import clean_sales_stream
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+def _raw(tmp_path):
+    src = tmp_path / "in.csv"
+    rows = [f"c{i % 7},2024-01-{i % 28 + 1:02d},{i % 5 + 1},\"${i},000.50\"" for i in range(50)]
+    src.write_text("customer_name,order_date,quantity,unit_price\n" + "\n".join(rows) + "\n")
+    return src
+
+def test_format_follows_extension():
+    assert output_format("x.parquet") == "parquet" and output_format("x.feather") == "feather"
+    assert output_format("x.csv.gz") == "csv" and output_format("x.out", "parquet") == "parquet"
+
+def test_streamed_columnar_output_matches_in_memory(tmp_path):
+    src = _raw(tmp_path)
+    expected = clean_sales_dataframe(pd.read_csv(src))
+    for name in ("s.parquet", "s.feather"):
+        assert write_stream(clean_sales_stream(src, chunksize=10), tmp_path / name) == len(expected)
+        pd.testing.assert_frame_equal(read_frame(tmp_path / name), expected)
+    assert pq.ParquetFile(tmp_path / "s.parquet").num_row_groups == 5
+    write_frame(expected, tmp_path / "m.csv.gz")
+    with gzip.open(tmp_path / "m.csv.gz", "rt") as fh:
+        assert fh.readline().startswith("customer_name,order_date")
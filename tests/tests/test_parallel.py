@@ -0,0 +1,29 @@
+import io
+import pandas as pd
+from csv_cleaner.parallel import clean_sales_parallel, split_csv
+from csv_cleaner.stream import clean_sales_stream, write_csv_stream
+
+def _dirty_csv(path):
+    rows = ["Customer Name,Product,Quantity,Unit Price,Order Date,Empty"]
+    for i in range(60):
+        note = '"multi\nline, ""quoted"" product"' if i % 7 == 0 else f"item {i % 5}"
+        price = f'"${i % 9},{i % 10}00.50"' if i % 4 == 0 else str(i % 9)
+        rows.append(f"  cust {i % 11} ,{note},{i % 3},{price},2024-0{1 + i % 9}-1{i % 10},")
+    path.write_text("\n".join(rows) + "\n")
+    return path
+
+def test_split_csv_cuts_only_between_rows(tmp_path):
+    src = _dirty_csv(tmp_path / "in.csv")
+    header_end, ranges = split_csv(src, partition_bytes=64)
+    data = src.read_bytes()
+    assert len(ranges) > 5
+    assert ranges[0][0] == header_end and ranges[-1][1] == len(data)
+    parts = [pd.read_csv(io.BytesIO(data[:header_end] + data[a:b]), dtype=str) for a, b in ranges]
+    pd.testing.assert_frame_equal(pd.concat(parts, ignore_index=True), pd.read_csv(src, dtype=str))
+
+def test_parallel_matches_serial_stream(tmp_path):
+    src = _dirty_csv(tmp_path / "in.csv")
+    serial, parallel = tmp_path / "serial.csv", tmp_path / "parallel.csv"
+    write_csv_stream(clean_sales_stream(src, chunksize=10), serial)
+    write_csv_stream(clean_sales_parallel(src, workers=2, partition_bytes=300), parallel)
+    assert parallel.read_bytes() == serial.read_bytes()
@@ -0,0 +1,33 @@
+import pandas as pd
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.profile import StageProfiler
+from csv_cleaner.stream import clean_sales_stream
+
+def _records(profiler):
+    return {(r["stage"], r["column"]): r for r in profiler.rows()}
+
+def test_stages_rows_and_coerced_values():
+    df = pd.DataFrame({
+        "Order Date": ["2025-01-01", "not a date", "2025-01-01"],
+        "Unit Price": ["$10", "ten", "$10"],
+        "Quantity": [1, 2, 1],
+    })
+    seen = []
+    profiler = StageProfiler(callback=seen.append, allocations=True)
+    clean_sales_dataframe(df, profiler=profiler)
+    recs = _records(profiler)
+    assert recs[("date", "order_date")]["coerced"] == 1
+    assert recs[("numeric", "unit_price")]["coerced"] == 1
+    assert recs[("dedupe", None)]["rows_in"] == 3 and recs[("dedupe", None)]["rows_out"] == 2
+    assert recs[("dedupe", None)]["alloc_bytes"] is not None
+    assert [r["stage"] for r in seen][-1] == "dedupe" and len(seen) == len(recs)
+
+def test_stream_stages_are_summed_over_chunks(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("customer_name,quantity\n" + "".join(f"c{i % 3},{i % 2}\n" for i in range(25)))
+    profiler = StageProfiler()
+    list(clean_sales_stream(src, chunksize=10, profiler=profiler))
+    recs = _records(profiler)
+    assert recs[("text", "customer_name")]["calls"] == 3
+    assert recs[("read", None)]["rows_in"] == 25
+    assert recs[("dedupe", None)]["rows_out"] == 6
@@ -0,0 +1,67 @@
+import io
+import numpy as np
+import pandas as pd
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.quality import HyperLogLog, QualityProfile
+from csv_cleaner.stream import clean_sales_stream
+from scripts.clean_sales_data import clean_sales_frame
+
+def test_hyperloglog_estimates_and_merges():
+    a, b = HyperLogLog(), HyperLogLog()
+    a.add(pd.Series(np.arange(60_000)))
+    b.add(pd.Series(np.arange(40_000, 100_000)))
+    assert abs(a.count() - 60_000) / 60_000 < 0.05
+    a.merge(b)
+    assert abs(a.count() - 100_000) / 100_000 < 0.05
+    small = HyperLogLog()
+    small.add(pd.Series(["x", "y", "z", "x", None]))
+    assert small.count() == 3
+
+def test_profile_counts_nulls_coerced_and_formula(tmp_path):
+    src = tmp_path / "in.csv"
+    pd.DataFrame({
+        "Quantity": ["2", "3", "oops", "4", "2"],
+        "Unit Price": ["10", "$5.00", "7", "2.5", "10"],
+        "Sales": ["20", "99", "", "10", "20"],
+        "City": ["Pune", " pune", "Lima", "Oslo", "Pune"],
+    }).to_csv(src, index=False)
+    quality = QualityProfile()
+    clean_sales_dataframe(pd.read_csv(src, dtype=str), quality=quality)
+    d = quality.to_dict()
+    assert d["rows"] == 4
+    assert d["columns"]["quantity"]["coerced"] == 1
+    assert d["columns"]["quantity"]["nulls"] == 1
+    assert d["columns"]["city"]["distinct"] == 3
+    assert d["columns"]["unit_price"]["min"] == 2.5 and d["columns"]["unit_price"]["max"] == 10
+    # Source rows, before dedupe: 3 * 5 != 99; the row without a quantity isn't checked.
+    assert d["sales_formula"] == {"checked": 4, "mismatched": 1, "share": 0.25}
+
+def test_formula_checks_source_sales_not_recomputed():
+    raw = b"Quantity,Unit Price,Sales\n2,3,999\n1,4,\n5,2,10\n"
+    for clean in (lambda q: clean_sales_frame(raw, quality=q),
+                  lambda q: clean_sales_dataframe(pd.read_csv(io.BytesIO(raw)), quality=q)):
+        quality = QualityProfile()
+        clean(quality)
+        # The empty source sales is filled (or recomputed) but not counted as checked.
+        assert quality.to_dict()["sales_formula"] == {"checked": 2, "mismatched": 1, "share": 0.5}
+
+def test_stream_profile_matches_in_memory(tmp_path):
+    src = tmp_path / "in.csv"
+    rng = np.random.default_rng(3)
+    n = 3_000
+    pd.DataFrame({
+        "order_date": pd.Series(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 90, n), unit="D"))
+        .dt.strftime("%Y-%m-%d"),
+        "quantity": rng.integers(1, 9, n),
+        "unit_price": rng.choice([9.99, 20.0, None], n),
+        "city": rng.choice(["Pune", "Oslo", "Lima"], n),
+    }).to_csv(src, index=False)
+    in_memory, streamed = QualityProfile(), QualityProfile()
+    clean_sales_dataframe(pd.read_csv(src), quality=in_memory)
+    list(clean_sales_stream(src, chunksize=250, quality=streamed))
+    a, b = in_memory.to_dict(), streamed.to_dict()
+    for col in a["columns"].values():
+        col["mean"] = col["mean"] and round(col["mean"], 9)
+    for col in b["columns"].values():
+        col["mean"] = col["mean"] and round(col["mean"], 9)
+    assert a == b
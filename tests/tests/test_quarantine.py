@@ -0,0 +1,52 @@
+import threading
+import pandas as pd
+from csv_cleaner.quarantine import Quarantine, read_csv_quarantined
+from scripts.clean_sales_data import clean_sales_data
+
+def test_bad_lines_are_quarantined_with_line_numbers():
+    data = b'a,b,c\n1,2,3\n"x\ny",8,9\n\n4,5,6,7\n10,11,12\n13,14,15,16,17\n'
+    q = Quarantine()
+    df = read_csv_quarantined(data, q)
+    assert df["a"].tolist() == ["1", "x\ny", "10"]
+    assert q.counts() == {"expected 3 fields, saw 4": 1, "expected 3 fields, saw 5": 1}
+    entries = q.entries(data)
+    # Records count the quoted line break once; lines are physical.
+    assert [(e["record"], e["line"], e["text"]) for e in entries] == [(5, 6, "4,5,6,7"), (7, 8, "13,14,15,16,17")]
+
+def test_unterminated_quote_falls_back_per_line():
+    q = Quarantine()
+    df = read_csv_quarantined(b'a,b,c\n1,2,3\n4,5,6,7\n"open,1,2\n3,3,3\n', q)
+    assert df.values.tolist() == [[1, 2, 3]]
+    assert [e["text"] for e in q.entries(b'a,b,c\n1,2,3\n4,5,6,7\n"open,1,2\n3,3,3\n')] == [
+        "4,5,6,7", '"open,1,2\n3,3,3']
+
+def test_script_cleaner_writes_quarantine_file(tmp_path):
+    src = tmp_path / "sales.csv"
+    src.write_text("Order ID,Quantity,Unit Price\n1,2,3.5\n2,1,1,oops\n3,4,2\n")
+    result = clean_sales_data(src, tmp_path / "out" / "sales.csv")
+    assert result["rows_out"] == 2 and result["quarantined"] == 1
+    quarantined = pd.read_csv(tmp_path / "out" / "sales.quarantine.csv")
+    assert quarantined.to_dict("records") == [
+        {"record": 3, "line": 3, "reason": "expected 3 fields, saw 4", "text": "2,1,1,oops"}]
+
+def test_concurrent_reads_keep_their_own_bad_lines():
+    def data(bad_every):
+        rows = [f"{i},{i},{i},x" if i % bad_every == 0 else f"{i},{i},{i}" for i in range(1, 20_001)]
+        return ("a,b,c\n" + "\n".join(rows) + "\n").encode()
+
+    sources = {7: data(7), 11: data(11)}
+    results = {}
+
+    def read(key):
+        for attempt in range(5):
+            q = Quarantine()
+            df = read_csv_quarantined(sources[key], q)
+            results[key, attempt] = (len(q), len(df))
+
+    threads = [threading.Thread(target=read, args=(k,)) for k in sources]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for (key, _), (quarantined, rows) in results.items():
+        assert quarantined == 20_000 // key and rows == 20_000 - quarantined
@@ -0,0 +1,52 @@
+import io
+import pandas as pd
+import pytest
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.rules import CleaningRules, load_rules
+from csv_cleaner.stream import clean_sales_stream
+from scripts.clean_sales_data import clean_sales_frame
+
+RAW = "Order ID,City,Notes,Quantity,Unit Price,Order Date\n1, delhi ,x,2,$3.50,2024-01-02\n2,PUNE,y,1,4,2024-01-03\n"
+
+def test_rules_pick_columns_and_stages():
+    rules = CleaningRules(title_case=["city"], numeric=["quantity"], columns=["order_id", "city", "quantity",
+                                                                                "unit_price", "order_date"])
+    assert rules.plan(("city", "quantity", "notes")) == {"city": (True, None), "quantity": (False, "numeric")}
+    assert rules.plan(("city", "quantity", "notes")) is rules.plan(["city", "quantity", "notes"])
+    assert rules.usecols(["Order ID", "City", "Notes", "Quantity", "Unit Price", "Order Date"]) == [
+        "Order ID", "City", "Quantity", "Unit Price", "Order Date"]
+    df = clean_sales_dataframe(pd.read_csv(io.StringIO(RAW)), rules=rules)
+    # unit_price has no numeric rule here, so sales is not computed from its text
+    assert list(df.columns) == ["order_id", "city", "quantity", "unit_price", "order_date"]
+    assert df["city"].tolist() == ["Delhi", "Pune"] and df["unit_price"].tolist() == ["$3.50", "4"]
+    fractional = pd.read_csv(io.StringIO(RAW.replace(",2,$3.50", ",2.5,$3.50")))
+    assert "sales" not in clean_sales_dataframe(fractional, rules=rules).columns
+    priced = CleaningRules(numeric=["quantity", "unit_price"], columns=rules.columns + ("sales",))
+    assert clean_sales_dataframe(pd.read_csv(io.StringIO(RAW)), rules=priced)["sales"].tolist() == [7.0, 4.0]
+
+def test_stream_reads_only_kept_columns(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(RAW)
+    rules = CleaningRules(columns=["order_id", "quantity", "unit_price", "order_date"], compute_sales=False)
+    usecols = rules.usecols(pd.read_csv(src, nrows=0).columns)
+    streamed = pd.concat(clean_sales_stream(src, chunksize=1, rules=rules, usecols=usecols), ignore_index=True)
+    expected = clean_sales_dataframe(pd.read_csv(src), rules=rules)
+    pd.testing.assert_frame_equal(streamed, expected)
+    assert list(expected.columns) == ["order_id", "quantity", "unit_price", "order_date"]
+
+def test_rule_files_are_validated_and_reused(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('{"title_case": ["city"], "strip_text": false}')
+    assert load_rules(path) is load_rules(path)
+    assert load_rules(path).to_dict()["strip_text"] is False
+    with pytest.raises(ValueError, match="unknown rule"):
+        CleaningRules.from_dict({"titlecase": ["city"]})
+    with pytest.raises(ValueError, match="both dates and numeric"):
+        CleaningRules(dates=["order_date"], numeric=["order_date"])
+
+def test_script_cleaner_takes_rules():
+    rules = CleaningRules(title_case=["city"], numeric=["quantity", "unit_price"], dates=["order_date"],
+                          columns=["city", "quantity", "unit_price", "sales", "order_date"])
+    df = clean_sales_frame(RAW.encode(), rules=rules)
+    assert list(df.columns) == ["city", "quantity", "unit_price", "order_date", "sales"]
+    assert df["sales"].tolist() == [7.0, 4.0]
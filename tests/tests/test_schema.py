@@ -0,0 +1,33 @@
+import pandas as pd
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.schema import date_formats, infer_schema, load_schema, read_csv_schema, save_schema
+
+def _feed(path, rows=600, gap_at=None):
+    lines = ["Order Date,City,Customer Name,Unit Price,Quantity,Note"]
+    for i in range(rows):
+        qty = "" if i == gap_at else str(i % 4)
+        lines.append(f"2024-0{1 + i % 9}-1{i % 10}, city {i % 3} ,cust {i},\"${i % 7},00{i % 10}.5\",{qty},")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def test_schema_hints_keep_output_and_compact_dtypes(tmp_path):
+    src = _feed(tmp_path / "in.csv")
+    schema = infer_schema(src, sample_bytes=2048)
+    kinds = {c: spec["kind"] for c, spec in schema["columns"].items()}
+    assert kinds == {"Order Date": "date", "City": "categorical", "Customer Name": "text",
+                     "Unit Price": "numeric_text", "Quantity": "numeric", "Note": "empty"}
+    assert schema["sample_rows"] < 600 and date_formats(schema) == {"order_date": ("%Y-%m-%d",)}
+    save_schema(schema, tmp_path / "schema.json")
+    report = {}
+    hinted = read_csv_schema(src, load_schema(tmp_path / "schema.json"), report)
+    assert report["hints_rejected"] is None and isinstance(hinted["City"].dtype, pd.CategoricalDtype)
+    expected = clean_sales_dataframe(pd.read_csv(src, low_memory=False))
+    pd.testing.assert_frame_equal(clean_sales_dataframe(hinted, date_formats=date_formats(schema)), expected)
+
+def test_hints_the_file_breaks_are_dropped(tmp_path):
+    src = _feed(tmp_path / "in.csv", gap_at=150)
+    schema = infer_schema(src, sample_bytes=2048)
+    assert schema["columns"]["Quantity"]["dtype"] == "int64"
+    report = {}
+    df = read_csv_schema(src, schema, report)
+    assert report["hints_rejected"] and df["Quantity"].dtype == "float64"
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from csv_cleaner.serve import serve_lines
+
+ROOT = Path(__file__).resolve().parents[2]
+
+def test_usage_errors_and_missing_inputs_skip_pandas(tmp_path):
+    code = (
+        "import sys\n"
+        "from csv_cleaner.cli import main\n"
+        f"assert main(['--input', {str(tmp_path / 'missing.csv')!r}, '--output', 'out.csv']) == 2\n"
+        "try:\n"
+        "    main(['--chunksize', '0'])\n"
+        "except SystemExit as e:\n"
+        "    assert e.code == 2\n"
+        "assert 'pandas' not in sys.modules, 'pandas was imported'\n"
+    )
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_serve_lines_runs_jobs_in_process(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("Order Date,Quantity,Unit Price\n2024-01-02,2,3.5\n2024-01-02,2,3.5\n")
+    jobs = [
+        json.dumps({"id": "a", "args": ["--input", str(src), "--output", str(tmp_path / "out.csv")]}),
+        "",
+        json.dumps(["--input", str(tmp_path / "missing.csv"), "--output", str(tmp_path / "x.csv")]),
+        "not json",
+        json.dumps({"id": 3, "args": ["--chunksize", "0"]}),
+    ]
+    replies = []
+    assert serve_lines(jobs, replies.append) == 4
+    replies = [json.loads(r) for r in replies]
+    assert replies[0]["id"] == "a" and replies[0]["exit"] == 0 and "Cleaned CSV" in replies[0]["stdout"]
+    assert (tmp_path / "out.csv").read_text().splitlines()[1:] == ["2024-01-02,2,3.5,7.0"]
+    assert replies[1]["exit"] == 2 and "not found" in replies[1]["stderr"]
+    assert replies[2]["exit"] == 2 and "not a JSON job" in replies[2]["stderr"]
+    assert replies[3] == {**replies[3], "id": 3, "exit": 2}
+    assert "--chunksize must be a positive integer" in replies[3]["stderr"]
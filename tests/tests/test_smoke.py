@@ -20,3 +20,17 @@ def test_smoke_clean_sales_dataframe():
     # sales computed where possible
     assert "sales" in out.columns
     assert out["sales"].notna().any()
+
+def test_inplace_matches_copying_path():
+    df = pd.DataFrame({
+        "Customer Name": ["  alice   smith ", "bob", "  alice   smith "],
+        "Order Date": ["2025-01-01 ", " 2025-01-02", "2025-01-01 "],
+        "Unit Price": [" $1,000.50", "15", " $1,000.50"],
+        "Quantity": ["2", "1", "2"],
+    })
+    expected = clean_sales_dataframe(df)
+    assert df.columns[0] == "Customer Name"  # the copying path leaves the input alone
+    out = clean_sales_dataframe(df, inplace=True)
+    pd.testing.assert_frame_equal(out, expected)
+    assert out["customer_name"].tolist() == ["Alice Smith", "Bob"]
+    assert out["sales"].tolist() == [2001.0, 15.0]
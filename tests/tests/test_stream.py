@@ -0,0 +1,35 @@
+import pandas as pd
+from pathlib import Path
+from csv_cleaner.core import clean_sales_dataframe
+from csv_cleaner.stream import clean_sales_stream, write_csv_stream
+
+DATA = Path(__file__).resolve().parents[2] / "data" / "raw"
+
+def _full_csv(src, dst):
+    clean_sales_dataframe(pd.read_csv(src, low_memory=False)).to_csv(dst, index=False)
+    return dst.read_bytes()
+
+def test_stream_matches_in_memory_output(tmp_path):
+    src = DATA / "sales_dirty.csv"
+    expected = _full_csv(src, tmp_path / "full.csv")
+    for chunksize in (7, 50, 1000):
+        out = tmp_path / f"chunked_{chunksize}.csv"
+        write_csv_stream(clean_sales_stream(src, chunksize=chunksize), out)
+        assert out.read_bytes() == expected
+
+def test_stream_handles_cross_chunk_duplicates_empty_cols_and_dtype_drift(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text(
+        "Customer Name,Postal Code,Notes,Quantity,Unit Price,Order Date\n"
+        "alice,42420,,2,10,2024-01-05\n"
+        "bob,,,3,$5.50,2024-01-06 10:30:00\n"
+        "alice,42420,,2,10,2024-01-05\n"
+        "carol,A1B 2C3,,x,7,2024-01-07\n"
+    )
+    expected = _full_csv(src, tmp_path / "full.csv")
+    chunks = list(clean_sales_stream(src, chunksize=1))
+    assert "notes" not in chunks[0].columns
+    assert sum(len(c) for c in chunks) == 3
+    out = tmp_path / "chunked.csv"
+    write_csv_stream(iter(chunks), out)
+    assert out.read_bytes() == expected
@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+from csv_cleaner.text import map_unique, strip_collapse, strip_title
+
+def test_map_unique_matches_rowwise_transform():
+    s = pd.Series([" mumbai", "Mumbai ", None, np.nan, pd.NA, "new   delhi", "mumbai"] * 3, dtype=object)
+    for func in (strip_collapse, strip_title):
+        expected = func(s.astype(str))
+        pd.testing.assert_series_equal(map_unique(s, func), expected)
+        out = map_unique(s, func, categorical=True)
+        assert isinstance(out.dtype, pd.CategoricalDtype)
+        pd.testing.assert_series_equal(out.astype(object), expected)
+
+def test_high_cardinality_stays_object():
+    s = pd.Series([f"item {i}" for i in range(10)], dtype=object)
+    assert map_unique(s, strip_title, categorical=True).dtype == object